@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the fallback scraper's HTML parser backends
+
+Runs every installed backend over a corpus of saved SERPs (loose .html files
+and/or pages from serp_archive/), timing parse and AI Overview extraction, and
+checks extraction parity against html.parser with one select_one per
+selector (the original behaviour): the same selector must match and the
+extracted text must be identical (ignoring whitespace runs). Backends are
+timed with the single-pass SelectorMatcher that extract_ai_overview uses;
+the per-selector baseline is reported alongside as 'html.parser/select'.
+
+The fastest backend passing parity is recorded in serp_parser.json (see
+serp_parsers.PARSER_CHOICE_PATH) and becomes get_parser_backend()'s default;
+--no-save only reports. Exits non-zero when no backend passes parity, or
+with --no-save when the default backend fails it.
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from serp_archive import SerpArchiveReader, find_archives
+from serp_parsers import (AI_OVERVIEW_MATCHER, AI_OVERVIEW_SELECTORS, PARSER_CHOICE_PATH, PARSER_PREFERENCE,
+                          available_backends, get_parser_backend, save_parser_choice)
+
+REFERENCE_BACKEND = 'html.parser'
+
+
+def load_corpus(corpus_dir=None, archive_dir=None, limit=None):
+    """Return a list of (name, html) pairs"""
+    pages = []
+    if corpus_dir and Path(corpus_dir).is_dir():
+        for path in sorted(Path(corpus_dir).glob("*.html")):
+            pages.append((path.name, path.read_text(encoding='utf-8', errors='replace')))
+    if archive_dir:
+        for archive_path in find_archives(archive_dir):
+            reader = SerpArchiveReader(archive_path)
+            for entry, html in reader.iter_pages():
+                if entry.get('kind', 'serp') == 'serp':
+                    pages.append((f"{reader.run_id}:{entry['term']}", html))
+    if limit:
+        pages = pages[:limit]
+    return pages
+
+
+def extract(backend, document, selectors):
+    """First matching selector and its text, one select_first per selector"""
+    for selector in selectors:
+        node = backend.select_first(document, selector)
+        if node is not None:
+            return selector, backend.node_text(node)
+    return None, None
+
+
+def extract_single_pass(backend, document, selectors):
+    """Same result as extract(), via the single-walk matcher used by extract_ai_overview"""
+    index, node = AI_OVERVIEW_MATCHER.best_match(backend, document)
+    if node is None:
+        return None, None
+    return selectors[index], backend.node_text(node)
+
+
+def _normalize(text):
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def benchmark_backend(name, pages, selectors, repeat=3, extractor=extract_single_pass):
+    """Time one backend; returns (stats, extractions keyed by page name)"""
+    backend = get_parser_backend(name)
+    parse_times = []
+    extract_times = []
+    extractions = {}
+
+    for page_name, html in pages:
+        content = html.encode('utf-8')
+        parse_runs = []
+        extract_runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            document = backend.parse(content)
+            parsed = time.perf_counter()
+            result = extractor(backend, document, selectors)
+            parse_runs.append(parsed - start)
+            extract_runs.append(time.perf_counter() - parsed)
+        parse_times.append(min(parse_runs))
+        extract_times.append(min(extract_runs))
+        extractions[page_name] = result
+
+    stats = {
+        'backend': name,
+        'pages': len(pages),
+        'parse_ms': statistics.mean(parse_times) * 1000 if pages else 0.0,
+        'extract_ms': statistics.mean(extract_times) * 1000 if pages else 0.0,
+        'total_s': sum(parse_times) + sum(extract_times),
+    }
+    return stats, extractions
+
+
+def check_parity(reference, candidate):
+    """Page names whose extraction differs from the reference backend"""
+    mismatches = []
+    for page_name, (ref_selector, ref_text) in reference.items():
+        selector, text = candidate.get(page_name, (None, None))
+        if selector != ref_selector or _normalize(text) != _normalize(ref_text):
+            mismatches.append(page_name)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on saved SERPs")
+    parser.add_argument('--corpus', default="serp_fixtures", help="Folder of saved SERP .html files")
+    parser.add_argument('--archive-dir', default="serp_archive", help="SERP archive folder (empty to skip)")
+    parser.add_argument('--limit', type=int, default=None, help="Use at most this many pages")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing repeats per page (best is kept)")
+    parser.add_argument('--backends', nargs='*', default=None, help=f"Subset of: {', '.join(PARSER_PREFERENCE)}")
+    parser.add_argument('--no-save', action='store_true', help="Report only; don't make the winner the default")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.archive_dir or None, args.limit)
+    if not pages:
+        print(f"No saved SERPs found in '{args.corpus}' or '{args.archive_dir}'")
+        return 1
+
+    installed = available_backends()
+    if REFERENCE_BACKEND not in installed:
+        print(f"The reference backend '{REFERENCE_BACKEND}' (bs4) is required for parity checks")
+        return 1
+    names = [name for name in (args.backends or installed) if name in installed]
+    if REFERENCE_BACKEND not in names:
+        names.append(REFERENCE_BACKEND)
+
+    print(f"Benchmarking {len(names)} backends over {len(pages)} pages "
+          f"({sum(len(html) for _, html in pages) / 1024 / 1024:.1f} MiB)\n")
+
+    baseline = f"{REFERENCE_BACKEND}/select"
+    results = {baseline: benchmark_backend(REFERENCE_BACKEND, pages, AI_OVERVIEW_SELECTORS, args.repeat, extract)}
+    for name in names:
+        results[name] = benchmark_backend(name, pages, AI_OVERVIEW_SELECTORS, args.repeat)
+
+    reference_stats, reference = results[baseline]
+    print(f"{'Backend':<20}{'Parse ms':>10}{'Extract ms':>12}{'Total s':>10}{'Speedup':>10}  Parity")
+    print("-" * 72)
+    passing = []
+    for name in sorted(results, key=lambda n: results[n][0]['total_s']):
+        stats, extractions = results[name]
+        mismatches = check_parity(reference, extractions)
+        speedup = reference_stats['total_s'] / stats['total_s'] if stats['total_s'] else 0.0
+        parity = "ok" if not mismatches else f"{len(mismatches)} mismatches"
+        print(f"{name:<20}{stats['parse_ms']:>10.2f}{stats['extract_ms']:>12.2f}"
+              f"{stats['total_s']:>10.2f}{speedup:>9.1f}x  {parity}")
+        for page_name in mismatches[:5]:
+            print(f"    differs on: {page_name}")
+        if not mismatches and name != baseline:
+            passing.append(name)
+
+    if not passing:
+        print("\nNo backend matches the html.parser baseline on this corpus")
+        return 1
+
+    print(f"\nFastest backend passing parity: {passing[0]}")
+    if not args.no_save:
+        save_parser_choice(passing[0], pages=len(pages), measured=datetime.now().isoformat(timespec='seconds'),
+                           total_s={name: round(results[name][0]['total_s'], 4) for name in passing})
+        print(f"Default backend set to '{passing[0]}' ({PARSER_CHOICE_PATH})")
+
+    default = get_parser_backend().name
+    print(f"Current default backend: {default}")
+    if default not in passing:
+        print(f"WARNING: default backend '{default}' fails parity - set SERP_PARSER={passing[0]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the Playwright scrapers against the local fixture server
+
+Each GoogleAIOverviewScraper variant runs its normal run_analysis() over the
+terms in serp_fixtures/manifest.json, with every browser request served by
+FixtureServer instead of the live site. Reported per variant:
+
+  * terms/minute over the whole run
+  * per-phase latency (p50/p90/p99/total) from result['timings'] where the
+    variant records them, otherwise the per-term total
+  * peak RSS of this process and the browsers it started, sampled by
+    resource_monitor.ResourceMonitor (psutil or /proc, otherwise this process
+    only); with --trace-python also the peak Python heap (tracemalloc, which
+    slows every allocation and so lowers the measured throughput)
+  * detections matching the manifest, so a faster run can't hide a regression
+
+The bundled corpus is synthetic (hand-written pages of a few KB, see
+fixture_server.py), so compare variants with it rather than quoting its
+absolute throughput; every report names the corpus it was measured on.
+
+The scrapers' human-like pauses are scaled by --sleep-scale (0 skips them);
+time.time()/monotonic() inside the scraper still advance by the full pause so
+backoff and retry logic behaves as in a real run. The browsers are started as
+configured by each variant, some headful, so use xvfb-run on a machine
+without a display. Each variant runs in its own temporary directory.
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import retry_queue
+from fixture_server import FIXTURE_DIR, FixtureServer
+from phase_timer import PhaseStats
+from resource_monitor import MB, ResourceMonitor
+
+VARIANTS = {
+    'international': 'google_ai_playwright_international',
+    'rate_limit': 'google_ai_playwright_rate_limit',
+    'optimized': 'google_ai_playwright_optimized',
+    '20250526': 'google_ai_playwright20250526',
+}
+
+
+class WarpedTime:
+    """Stand-in for the time module inside a scraper module: sleeps are scaled, clocks keep full time"""
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.skipped = 0.0
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        time.sleep(seconds * self.scale)
+        self.skipped += seconds * (1 - self.scale)
+
+    def time(self):
+        return time.time() + self.skipped
+
+    def monotonic(self):
+        return time.monotonic() + self.skipped
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def peak_memory(monitor):
+    """(peak RSS of this process plus its browsers, peak Python heap or None) from a stopped ResourceMonitor"""
+    samples = monitor.samples
+    peak_rss = max(s.python_rss + (s.browser_rss or 0) for s in samples)
+    heaps = [s.heap_peak for s in samples if s.heap_peak is not None]
+    return peak_rss, max(heaps) if heaps else None
+
+
+def instrument(scraper, server, stats):
+    """Route the scraper's browser contexts to the fixture server and time every search attempt"""
+    setup_browser_context = scraper.setup_browser_context
+    search_and_screenshot = scraper.search_and_screenshot
+
+    def routed_setup(playwright, proxy=None):
+        opened = setup_browser_context(playwright, proxy)
+        server.install(opened[1])
+        return opened
+
+    def timed_search(*args, **kwargs):
+        start = time.perf_counter()
+        result = search_and_screenshot(*args, **kwargs)
+        timings = (result or {}).get('timings') or {'total': round(time.perf_counter() - start, 3)}
+        stats.add(timings)
+        return result
+
+    scraper.setup_browser_context = routed_setup
+    scraper.search_and_screenshot = timed_search
+
+
+def score(results, server):
+    """Count results agreeing with the manifest's ai_overview flag"""
+    correct = errors = 0
+    for result in results:
+        expected = server.expected(result['search_term'])
+        if result.get('error'):
+            errors += 1
+        elif expected is not None and result['has_ai_overview'] == expected['ai_overview']:
+            correct += 1
+    return correct, errors
+
+
+def run_variant(name, server, terms, sleep_scale=0.0, quiet=True, trace_python=False):
+    module = importlib.import_module(VARIANTS[name])
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench_{name}_"))
+    csv_path = workdir / "terms.csv"
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Search term'])
+        writer.writerows([term] for term in terms)
+
+    warp = WarpedTime(sleep_scale)
+    patched = [module, retry_queue]
+    originals = [m.time for m in patched]
+    stats = PhaseStats()
+    # No ceiling: the benchmark only samples, recycling is left to the scraper's own monitor
+    monitor = ResourceMonitor(ceiling_mb=None, interval=0.5, trace_python=trace_python)
+    cwd = os.getcwd()
+
+    os.chdir(workdir)
+    for m in patched:
+        m.time = warp
+    monitor.start()
+    try:
+        scraper = module.GoogleAIOverviewScraper(csv_file=str(csv_path), output_dir=str(workdir / "screenshots"))
+        instrument(scraper, server, stats)
+        start = time.perf_counter()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            scraper.run_analysis()
+        elapsed = time.perf_counter() - start
+    finally:
+        monitor.stop()
+        for m, original in zip(patched, originals):
+            m.time = original
+        os.chdir(cwd)
+
+    correct, errors = score(scraper.results, server)
+    peak_rss, heap_peak = peak_memory(monitor)
+    return {
+        'variant': name,
+        'corpus': server.corpus_note(),
+        'terms': len(scraper.results),
+        'elapsed_s': round(elapsed, 2),
+        'terms_per_minute': round(len(scraper.results) / elapsed * 60, 2) if elapsed else 0.0,
+        'correct': correct,
+        'errors': errors,
+        'attempts': stats.attempts,
+        'mean_attempt_s': round(statistics.mean(stats.samples['total']), 3) if stats.attempts else None,
+        'peak_rss_mb': round(peak_rss / MB, 1),
+        'rss_scope': 'process tree' if monitor.samples[-1].browser_rss is not None else 'this process',
+        'python_heap_peak_mb': round(heap_peak / MB, 2) if heap_peak is not None else None,
+        'phases': {phase: values for phase, values in stats.samples.items()},
+        'phase_summary': stats.summary_lines(),
+        'workdir': str(workdir),
+    }
+
+
+def format_heap(heap_mb):
+    return f"{heap_mb:.1f}MB" if heap_mb is not None else "off"
+
+
+def print_report(reports):
+    if reports:
+        print(f"\nMeasured on the {reports[0]['corpus']}")
+    print(f"\n{'Variant':<15}{'terms':>6}{'terms/min':>11}{'correct':>9}{'errors':>8}{'peak RSS':>11}{'py heap':>10}")
+    for report in reports:
+        print(f"{report['variant']:<15}{report['terms']:>6}{report['terms_per_minute']:>11.2f}"
+              f"{report['correct']:>6}/{report['terms']:<2}{report['errors']:>8}"
+              f"{report['peak_rss_mb']:>9.0f}MB{format_heap(report['python_heap_peak_mb']):>10}")
+    for report in reports:
+        print(f"\n{report['variant']} ({report['attempts']} search attempts, {report['elapsed_s']}s, "
+              f"RSS: {report['rss_scope']})")
+        for line in report['phase_summary']:
+            print(f"  {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Playwright scrapers against the local fixture server")
+    parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS), default=sorted(VARIANTS))
+    parser.add_argument('--fixtures', default=str(FIXTURE_DIR))
+    parser.add_argument('--terms', nargs='+', help="Subset of manifest terms (default: all)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument('--sleep-scale', type=float, default=0.0,
+                        help="Factor applied to the scrapers' human-like pauses (1 = real pacing)")
+    parser.add_argument('--json', help="Also write the reports to this file")
+    parser.add_argument('--verbose', action='store_true', help="Show the scrapers' own output")
+    parser.add_argument('--trace-python', action='store_true',
+                        help="Also record the peak Python heap with tracemalloc (slows the scrapers down)")
+    args = parser.parse_args()
+
+    reports = []
+    for name in args.variants:
+        # A fresh server per variant so blocked_requests counters start over
+        with FixtureServer(args.fixtures, latency=args.latency, jitter=args.jitter) as server:
+            terms = args.terms or list(server.manifest['terms'])
+            print(f"Running {name} over {len(terms)} fixture terms at {server.url}...")
+            reports.append(run_variant(name, server, terms, args.sleep_scale, quiet=not args.verbose,
+                                       trace_python=args.trace_python))
+
+    print_report(reports)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReports saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
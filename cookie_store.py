@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+In-memory cookie cache per proxy identity, persisted to one compact JSON store
+
+Cookies are kept in memory (captured whenever a browser context is closed)
+and only written to disk every N terms and at the end of a run. A flush holds
+an exclusive lock on a sidecar .lock file while it re-reads, merges and
+replaces the store, so concurrent workers keep each other's identities; the
+new store is written to a temp file and renamed over the old one, so readers
+never see a half-written file. Without fcntl (Windows) only the rename is
+atomic.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class CookieStore:
+    def __init__(self, store_path="cookies/cookie_store.json", flush_every=10, legacy_dir=None):
+        self.store_path = Path(store_path)
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = max(1, flush_every)
+        self.legacy_dir = Path(legacy_dir) if legacy_dir else None
+        self._lock = threading.Lock()
+        self._cache = None
+        self._dirty = set()
+        self._terms_since_flush = 0
+        self.lock_path = self.store_path.with_name(self.store_path.name + ".lock")
+
+    def _read_store(self):
+        """Read the on-disk store, tolerating a missing or unreadable file"""
+        try:
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"  Error reading cookie store {self.store_path}: {e}")
+            return {}
+
+    def _ensure_loaded(self):
+        if self._cache is None:
+            self._cache = self._read_store()
+
+    def _load_legacy(self, identity):
+        """Pick up cookies written by the old one-file-per-proxy layout"""
+        if not self.legacy_dir:
+            return None
+        legacy_file = self.legacy_dir / f"{identity}.json"
+        if not legacy_file.exists():
+            return None
+        try:
+            with open(legacy_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, identity):
+        """Cookies cached for an identity, or an empty list"""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._cache.get(identity)
+            if entry is None:
+                legacy_cookies = self._load_legacy(identity)
+                if legacy_cookies is None:
+                    return []
+                entry = {'cookies': legacy_cookies, 'updated': time.time()}
+                self._cache[identity] = entry
+                self._dirty.add(identity)
+            return list(entry['cookies'])
+
+    def put(self, identity, cookies):
+        """Replace the cached cookies for an identity without touching disk"""
+        with self._lock:
+            self._ensure_loaded()
+            self._cache[identity] = {'cookies': cookies, 'updated': time.time()}
+            self._dirty.add(identity)
+
+    def capture(self, context, identity):
+        """Snapshot a browser context's cookies into the cache"""
+        cookies = context.cookies()
+        self.put(identity, cookies)
+        return cookies
+
+    def term_completed(self):
+        """Count a finished term; returns True when a flush is due"""
+        with self._lock:
+            self._terms_since_flush += 1
+            return self._terms_since_flush >= self.flush_every
+
+    @contextmanager
+    def _store_lock(self):
+        """Exclusive inter-process lock around a read-merge-replace of the store"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def flush(self):
+        """Atomically merge dirty identities into the on-disk store"""
+        with self._lock:
+            self._terms_since_flush = 0
+            if not self._dirty:
+                return 0
+            with self._store_lock():
+                merged = self._write_merged()
+
+            flushed = len(self._dirty)
+            self._cache = merged
+            self._dirty.clear()
+            return flushed
+
+    def _write_merged(self):
+        """Merge dirty identities over the current file and replace it; caller holds both locks"""
+        # Re-read so identities flushed by other workers are kept
+        merged = self._read_store()
+        for identity in self._dirty:
+            current = merged.get(identity)
+            ours = self._cache[identity]
+            if current is None or current.get('updated', 0) <= ours['updated']:
+                merged[identity] = ours
+
+        fd, temp_path = tempfile.mkstemp(
+            prefix=f".{self.store_path.name}.", suffix=".tmp", dir=self.store_path.parent
+        )
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.store_path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        return merged
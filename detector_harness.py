@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency regression harness for every AI Overview detector
+
+Runs each detector implementation over the labelled fixture corpus
+(serp_fixtures/manifest.json, served by FixtureServer) and reports per
+detector: precision, recall, mean and p99 detection time, and the number of
+browser round trips (IPC calls) per page. With the bundled synthetic corpus
+the times track DOM work on small pages, not on real 0.5-1 MB SERPs; the
+report names the corpus it was measured on.
+
+  international, rate_limit,   detect_ai_overview(page) of the Playwright
+  optimized, 20250526          scrapers, in a headless Chromium
+  selenium, selenium_advanced  find_ai_overview_element(_advanced)(driver),
+                               in a headless Chrome
+  http_fallback                AI_OVERVIEW_MATCHER over the served HTML, no
+                               browser (what the fallback scraper sees)
+
+Results are compared with a baseline JSON (--baseline). The exit status is 1
+when a detector's precision or recall drops by more than
+--accuracy-tolerance, or its mean or p99 time grows by more than
+--latency-tolerance (a fraction), so the harness can gate CI. --save-baseline
+records the current numbers.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+import benchmark_scrapers
+from benchmark_scrapers import WarpedTime
+from fixture_server import FIXTURE_DIR, FixtureServer
+from phase_timer import percentile
+from serp_parsers import AI_OVERVIEW_MATCHER, get_parser_backend
+
+PLAYWRIGHT_DETECTORS = dict(benchmark_scrapers.VARIANTS)
+SELENIUM_DETECTORS = {
+    'selenium': ('google_ai_overview', 'find_ai_overview_element'),
+    'selenium_advanced': ('google_ai_overview_advanced', 'find_ai_overview_element_advanced'),
+}
+ALL_DETECTORS = list(PLAYWRIGHT_DETECTORS) + list(SELENIUM_DETECTORS) + ['http_fallback']
+
+
+def load_samples(server):
+    """(name, url path, label) for every labelled page in the corpus"""
+    samples = []
+    for term, spec in server.manifest['terms'].items():
+        if spec.get('blocked_requests'):
+            continue  # Its first load is the block page, which is covered below
+        samples.append((term, '/search?' + urllib.parse.urlencode({'q': term}), spec['ai_overview']))
+    block_path = '/sorry/index?' + urllib.parse.urlencode({'continue': '/search?q=blocked'})
+    samples.append(('block page', block_path, False))
+    return samples
+
+
+class CallCounter:
+    """Wraps Playwright objects and counts method calls on them; each one is a round trip to the browser"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def wrap(self, value):
+        if isinstance(value, list):
+            return [self.wrap(item) for item in value]
+        if type(value).__module__.startswith('playwright.'):
+            return _Counted(value, self)
+        return value
+
+
+def _unwrap(value):
+    return value._target if isinstance(value, _Counted) else value
+
+
+class _Counted:
+    def __init__(self, target, counter):
+        self._target = target
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return self._counter.wrap(attr)
+
+        def call(*args, **kwargs):
+            self._counter.calls += 1
+            args = [_unwrap(arg) for arg in args]
+            kwargs = {key: _unwrap(value) for key, value in kwargs.items()}
+            return self._counter.wrap(attr(*args, **kwargs))
+        return call
+
+    def __bool__(self):
+        return bool(self._target)
+
+
+class PlaywrightDetector:
+    def __init__(self, name, server, workdir):
+        self.name = name
+        self.server = server
+        self.workdir = workdir
+        self.module = importlib.import_module(PLAYWRIGHT_DETECTORS[name])
+
+    def start(self):
+        from playwright.sync_api import sync_playwright
+        self.manager = sync_playwright()
+        playwright = self.manager.start()
+        self.browser = playwright.chromium.launch(headless=True)
+        self.context = self.browser.new_context(viewport={'width': 1366, 'height': 900})
+        self.server.install(self.context)
+        self.scraper = self.module.GoogleAIOverviewScraper(csv_file="unused.csv", output_dir=str(self.workdir / "shots"))
+
+    def detect(self, path):
+        page = self.context.new_page()
+        try:
+            page.goto(f"https://www.google.com{path}", wait_until='domcontentloaded')
+            counter = CallCounter()
+            start = time.perf_counter()
+            has_ai_overview = self.scraper.detect_ai_overview(counter.wrap(page))[0]
+            return bool(has_ai_overview), time.perf_counter() - start, counter.calls
+        finally:
+            page.close()
+
+    def stop(self):
+        self.context.close()
+        self.browser.close()
+        self.manager.__exit__(None, None, None)
+
+
+class SeleniumDetector:
+    def __init__(self, name, server, workdir):
+        self.name = name
+        self.server = server
+        module_name, function = SELENIUM_DETECTORS[name]
+        self.module = importlib.import_module(module_name)
+        self.find = getattr(self.module, function)
+
+    def start(self):
+        from selenium import webdriver
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1366,900')
+        self.driver = webdriver.Chrome(options=options)
+        self.calls = 0
+        execute = self.driver.execute
+
+        def counted_execute(*args, **kwargs):
+            self.calls += 1
+            return execute(*args, **kwargs)
+        # Every WebDriver command, including WebElement ones, goes through driver.execute
+        self.driver.execute = counted_execute
+
+    def detect(self, path):
+        self.driver.get(f"{self.server.url}{path}")
+        self.calls = 0
+        start = time.perf_counter()
+        element, _ = self.find(self.driver)
+        return element is not None, time.perf_counter() - start, self.calls
+
+    def stop(self):
+        self.driver.quit()
+
+
+class FallbackDetector:
+    def __init__(self, name, server, workdir):
+        self.name = name
+        self.server = server
+
+    def start(self):
+        self.backend = get_parser_backend()
+
+    def detect(self, path):
+        request = urllib.request.Request(f"{self.server.url}{path}", headers={'X-Fixture-Host': 'www.google.com'})
+        try:
+            content = urllib.request.urlopen(request).read()
+        except urllib.error.HTTPError as e:
+            content = e.read()
+        start = time.perf_counter()
+        _, node = AI_OVERVIEW_MATCHER.best_match(self.backend, self.backend.parse(content))
+        return node is not None, time.perf_counter() - start, 0
+
+    def stop(self):
+        pass
+
+
+def detector_for(name, server, workdir):
+    if name in PLAYWRIGHT_DETECTORS:
+        return PlaywrightDetector(name, server, workdir)
+    if name in SELENIUM_DETECTORS:
+        return SeleniumDetector(name, server, workdir)
+    return FallbackDetector(name, server, workdir)
+
+
+def evaluate(name, samples, server, sleep_scale=1.0, quiet=True):
+    """Run one detector over the corpus and return its metrics"""
+    workdir = Path(tempfile.mkdtemp(prefix=f"detect_{name}_"))
+    detector = detector_for(name, server, workdir)
+    module = getattr(detector, 'module', None)
+    original_time = module.time if module is not None else None
+    if module is not None:
+        module.time = WarpedTime(sleep_scale)
+
+    counts = {'tp': 0, 'fp': 0, 'fn': 0, 'tn': 0}
+    times, calls, misses = [], [], []
+    stdout = sys.stdout
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        if quiet:
+            sys.stdout = open(os.devnull, 'w')
+        detector.start()
+        try:
+            for sample_name, path, label in samples:
+                predicted, seconds, ipc_calls = detector.detect(path)
+                times.append(seconds)
+                calls.append(ipc_calls)
+                counts[('t' if predicted == label else 'f') + ('p' if predicted else 'n')] += 1
+                if predicted != label:
+                    misses.append(sample_name)
+        finally:
+            detector.stop()
+    finally:
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = stdout
+        if module is not None:
+            module.time = original_time
+        os.chdir(cwd)
+
+    predicted_positive = counts['tp'] + counts['fp']
+    actual_positive = counts['tp'] + counts['fn']
+    return {
+        'detector': name,
+        'corpus': server.corpus_note(),
+        'pages': len(samples),
+        **counts,
+        'precision': round(counts['tp'] / predicted_positive, 3) if predicted_positive else 1.0,
+        'recall': round(counts['tp'] / actual_positive, 3) if actual_positive else 1.0,
+        'mean_s': round(statistics.mean(times), 4),
+        'p99_s': round(percentile(times, 99), 4),
+        'ipc_calls_mean': round(statistics.mean(calls), 1),
+        'misclassified': misses,
+    }
+
+
+def find_regressions(report, baseline, accuracy_tolerance, latency_tolerance):
+    problems = []
+    for metric in ('precision', 'recall'):
+        if report[metric] < baseline[metric] - accuracy_tolerance:
+            problems.append(f"{metric} {baseline[metric]:.3f} -> {report[metric]:.3f}")
+    for metric in ('mean_s', 'p99_s'):
+        if baseline[metric] and report[metric] > baseline[metric] * (1 + latency_tolerance):
+            problems.append(f"{metric} {baseline[metric]:.3f}s -> {report[metric]:.3f}s")
+    return problems
+
+
+def print_reports(reports):
+    if reports:
+        print(f"\nMeasured on the {reports[0]['corpus']}")
+    print(f"\n{'Detector':<19}{'precision':>10}{'recall':>8}{'mean':>9}{'p99':>9}{'IPC/page':>10}  misclassified")
+    for r in reports:
+        print(f"{r['detector']:<19}{r['precision']:>10.3f}{r['recall']:>8.3f}{r['mean_s']:>8.2f}s{r['p99_s']:>8.2f}s"
+              f"{r['ipc_calls_mean']:>10.1f}  {', '.join(r['misclassified']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection accuracy and latency across all detector implementations")
+    parser.add_argument('--detectors', nargs='+', choices=ALL_DETECTORS, default=ALL_DETECTORS)
+    parser.add_argument('--fixtures', default=str(FIXTURE_DIR))
+    parser.add_argument('--sleep-scale', type=float, default=1.0,
+                        help="Factor for the detectors' fixed pauses (0 measures only DOM work)")
+    parser.add_argument('--baseline', default="detector_baseline.json")
+    parser.add_argument('--save-baseline', action='store_true', help="Write this run as the new baseline")
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.0, help="Allowed drop in precision/recall")
+    parser.add_argument('--latency-tolerance', type=float, default=0.25, help="Allowed relative growth in mean/p99")
+    parser.add_argument('--verbose', action='store_true', help="Show the detectors' own output")
+    args = parser.parse_args()
+
+    reports = []
+    with FixtureServer(args.fixtures) as server:
+        samples = load_samples(server)
+        for name in args.detectors:
+            print(f"Running {name} over {len(samples)} labelled pages...")
+            try:
+                reports.append(evaluate(name, samples, server, args.sleep_scale, quiet=not args.verbose))
+            except ImportError as e:
+                print(f"  skipped: {e}")
+    print_reports(reports)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        baseline.update({r['detector']: r for r in reports})
+        baseline_path.write_text(json.dumps(baseline, indent=2))
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    failed = False
+    for report in reports:
+        if report['detector'] not in baseline:
+            continue
+        problems = find_regressions(report, baseline[report['detector']],
+                                    args.accuracy_tolerance, args.latency_tolerance)
+        if problems:
+            failed = True
+            print(f"REGRESSION {report['detector']}: {'; '.join(problems)}")
+    if not failed:
+        print("\nNo regressions against the baseline")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,59 +1,189 @@
 import os
 import csv
-from pathlib import Path
+import json
+import hashlib
+import argparse
+import tempfile
 
-def extract_image_names_to_csv():
+from results_store import iter_results, list_result_files
+
+SCREENSHOT_SUFFIX = '_ai_overview.png'
+INDEX_VERSION = 1
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of a file (blake2b, 128-bit hex)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_index(index_path):
+    """Load the screenshot index, or start a fresh one."""
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION:
+            return index
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable index '{index_path}': {e}")
+    return {'version': INDEX_VERSION, 'files': {}, 'result_files': {}}
+
+
+def save_index(index, index_path):
+    """Write the index atomically so an interrupted run can't corrupt it."""
+    directory = os.path.dirname(os.path.abspath(index_path))
+    fd, temp_path = tempfile.mkstemp(prefix='.image_index.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(temp_path, index_path)
+    except BaseException:
+        # Don't leave a half-written temp file next to the index
+        os.unlink(temp_path)
+        raise
+
+
+def refresh_term_map(index, results_dir):
+    """Map screenshot file names to search terms, re-reading only changed result files."""
+    result_files = index['result_files']
+    seen = set()
+    changed = False
+
+    for path in list_result_files(results_dir):
+        seen.add(path)
+        stat = os.stat(path)
+        cached = result_files.get(path)
+        if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            continue
+
+        terms = {}
+        try:
+            for result in iter_results(path):
+                screenshot_path = result.get('screenshot_path')
+                if screenshot_path and result.get('search_term'):
+                    # Paths may have been written on Windows
+                    name = screenshot_path.replace('\\', '/').rsplit('/', 1)[-1]
+                    terms[name] = result['search_term']
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not read results file '{path}': {e}")
+            continue
+
+        result_files[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'terms': terms}
+        changed = True
+
+    for path in list(result_files):
+        if path not in seen:
+            del result_files[path]
+            changed = True
+
+    # Newer runs win when the same screenshot name appears in several files
+    term_map = {}
+    for path in sorted(result_files, key=lambda p: result_files[p]['mtime_ns']):
+        term_map.update(result_files[path]['terms'])
+    return term_map, changed
+
+
+def scan_folder(index, folder_path):
+    """Update index entries for new or modified screenshots; returns (added, updated, removed)."""
+    files = index['files']
+    seen = set()
+    added = updated = 0
+
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(SCREENSHOT_SUFFIX) or not entry.is_file():
+                continue
+            seen.add(entry.name)
+
+            stat = entry.stat()
+            cached = files.get(entry.name)
+            if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                continue
+
+            files[entry.name] = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'hash': file_hash(entry.path),
+            }
+            if cached:
+                updated += 1
+            else:
+                added += 1
+
+    removed = [name for name in files if name not in seen]
+    for name in removed:
+        del files[name]
+
+    return added, updated, len(removed)
+
+
+def extract_image_names_to_csv(folder_path="ai_overview_screenshots", output_csv="image_names.csv",
+                               index_path=None, results_dir="."):
     """
-    Extract image names from ai_overview_screenshots folder,
-    remove '_ai_overview.png' suffix, and save to CSV file.
+    Incrementally index the ai_overview_screenshots folder and write image_names.csv.
+    Only new or modified screenshots are hashed, and search terms are recovered
+    from the ai_overview_results_*.json files rather than from the file names.
     """
-    # Define the folder path
-    folder_path = r"C:\Users\Admin\PycharmProjects\google_ai_overview\ai_overview_screenshots"
-    
-    # Output CSV file path
-    output_csv = "image_names.csv"
-    
-    # List to store cleaned image names
-    image_names = []
-    
+    index_path = index_path or os.path.splitext(output_csv)[0] + '_index.json'
+
     try:
         # Check if folder exists
-        if not os.path.exists(folder_path):
+        if not os.path.isdir(folder_path):
             print(f"Error: Folder '{folder_path}' does not exist.")
             return
-        
-        # Get all files in the directory
-        files = os.listdir(folder_path)
-        
-        # Filter for PNG files ending with '_ai_overview.png'
-        for file in files:
-            if file.endswith('_ai_overview.png'):
-                # Remove the '_ai_overview.png' suffix and replace underscores with spaces
-                clean_name = file.replace('_ai_overview.png', '').replace('_', ' ')
-                image_names.append(clean_name)
-                print(f"Processed: {file} -> {clean_name}")
-        
-        # Sort the names alphabetically
-        image_names.sort()
-        
-        # Write to CSV file
+
+        index = load_index(index_path)
+        added, updated, removed = scan_folder(index, folder_path)
+        term_map, terms_changed = refresh_term_map(index, results_dir)
+
+        files = index['files']
+        for name, entry in files.items():
+            term = term_map.get(name)
+            if term:
+                entry['term'], entry['term_source'] = term, 'results'
+            else:
+                # Lossy fallback for screenshots with no matching result record
+                entry['term'] = name[:-len(SCREENSHOT_SUFFIX)].replace('_', ' ')
+                entry['term_source'] = 'filename'
+
+        print(f"Scanned '{folder_path}': {len(files)} screenshots "
+              f"({added} new, {updated} modified, {removed} removed)")
+
+        if not (added or updated or removed or terms_changed) and os.path.exists(output_csv):
+            print(f"No changes - '{output_csv}' is up to date")
+            return
+
         with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
-            
-            # Write header
-            writer.writerow(['Image Name'])
-            
-            # Write each image name as a row
-            for name in image_names:
-                writer.writerow([name])
-        
-        print(f"\nSuccess! Extracted {len(image_names)} image names to '{output_csv}'")
-        print(f"Image names saved:")
-        for name in image_names:
-            print(f"  - {name}")
-            
+            writer.writerow(['Image Name', 'File Name', 'Term Source', 'Size', 'Modified (ns)', 'Hash'])
+            for name in sorted(files, key=lambda n: (files[n]['term'].lower(), n)):
+                entry = files[name]
+                writer.writerow([
+                    entry['term'], name, entry['term_source'],
+                    entry['size'], entry['mtime_ns'], entry['hash']
+                ])
+
+        save_index(index, index_path)
+
+        unresolved = sum(1 for entry in files.values() if entry['term_source'] == 'filename')
+        print(f"\nSuccess! Wrote {len(files)} image names to '{output_csv}'")
+        if unresolved:
+            print(f"  {unresolved} names recovered from file names (no matching result record)")
+
     except Exception as e:
         print(f"Error occurred: {str(e)}")
 
+
 if __name__ == "__main__":
-    extract_image_names_to_csv()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Index AI Overview screenshots into image_names.csv")
+    parser.add_argument('folder', nargs='?', default="ai_overview_screenshots", help="Screenshots folder")
+    parser.add_argument('-o', '--output', default="image_names.csv", help="Output CSV path")
+    parser.add_argument('--results-dir', default=".", help="Folder containing ai_overview_results_*.json")
+    args = parser.parse_args()
+
+    extract_image_names_to_csv(args.folder, args.output, results_dir=args.results_dir)
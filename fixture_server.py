@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Google that serves the SERP fixture corpus
+
+serp_fixtures/manifest.json maps search terms to fixture pages: results
+with and without an AI Overview, a collapsed overview behind "Show more",
+one filled in by JavaScript after load, a block (sorry) page and slow pages.
+Latency is injected globally (fixed delay plus random jitter) and per term:
+
+  latency_ms        delay before the response is sent
+  trickle_ms        pause between body chunks, like a slow connection
+  blocked_requests  answer the first N searches with a redirect to the
+                    sorry page (HTTP 429), then serve the fixture
+
+Every other host (the warm-up sites) gets a small generic page and assets get
+204 No Content. install(context) routes all requests of a Playwright browser
+context to the server, so the scrapers run unchanged against it.
+
+The bundled corpus is synthetic ("corpus" in the manifest): hand-written pages
+of a few KB that carry the markup the detectors key on, not sanitized
+captures of real 0.5-1 MB SERPs. It checks behaviour and relative cost; the
+absolute throughput and timing numbers it produces say little about live
+pages. corpus_note() describes the corpus for reports.
+"""
+
+import argparse
+import html
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from term_ingest import normalize_term
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "serp_fixtures"
+TRICKLE_CHUNKS = 8
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "FixtureServer/1.0"
+
+    def do_GET(self):
+        self.server.fixtures.handle(self)
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass  # One line per asset request is just noise during a benchmark
+
+
+class FixtureServer:
+    """Threaded HTTP server for serp_fixtures/, with latency injection"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, host="127.0.0.1", port=0, latency=0.0, jitter=0.0):
+        self.fixture_dir = Path(fixture_dir)
+        self.manifest = json.loads((self.fixture_dir / "manifest.json").read_text(encoding="utf-8"))
+        self.terms = {normalize_term(term): spec for term, spec in self.manifest["terms"].items()}
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.httpd = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.search_hits = {}  # normalized term -> searches served
+        self.requests_served = 0
+        self._pages = {}
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fixtures = self
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def corpus_note(self):
+        """One line for reports: what kind of corpus the numbers were measured on"""
+        names = {spec["fixture"] for spec in self.manifest["terms"].values()}
+        names.add(self.manifest["default"])
+        sizes = [(self.fixture_dir / name).stat().st_size / 1024 for name in names]
+        corpus = self.manifest.get("corpus", "synthetic")
+        note = f"{corpus} corpus, {len(sizes)} SERP pages of {min(sizes):.1f}-{max(sizes):.1f} KB"
+        if corpus == "synthetic":
+            note += " (hand-written; timings are not representative of real 0.5-1 MB SERPs)"
+        return note
+
+    def expected(self, term):
+        """Manifest entry for a term (None for terms served the default page)"""
+        return self.terms.get(normalize_term(term))
+
+    def page(self, name, query=""):
+        if name not in self._pages:
+            self._pages[name] = (self.fixture_dir / name).read_text(encoding="utf-8")
+        return self._pages[name].replace("{{query}}", html.escape(query))
+
+    def resolve(self, path, params, host):
+        """Pick the response for a request: (status, body or None, extra headers, spec)"""
+        query = params.get("q", [""])[0]
+
+        if host and "google." not in host:
+            return 200, self.page(self.manifest["external"]), {}, {}
+        if path in ("/", "/webhp"):
+            return 200, self.page(self.manifest["home"]), {}, {}
+        if path.startswith("/sorry/"):
+            continue_url = params.get("continue", [""])[0]
+            blocked_query = urllib.parse.parse_qs(urllib.parse.urlsplit(continue_url).query).get("q", [""])[0]
+            return 429, self.page(self.manifest["block"], blocked_query), {}, {}
+        if path != "/search":
+            return 204, None, {}, {}
+
+        key = normalize_term(query)
+        spec = self.terms.get(key, {"fixture": self.manifest["default"]})
+        with self.lock:
+            self.search_hits[key] = self.search_hits.get(key, 0) + 1
+            hits = self.search_hits[key]
+        if hits <= spec.get("blocked_requests", 0):
+            target = "/search?" + urllib.parse.urlencode({"q": query})
+            location = "/sorry/index?" + urllib.parse.urlencode({"continue": target})
+            return 302, None, {"Location": location}, {}
+        return 200, self.page(spec["fixture"], query), {}, spec
+
+    def handle(self, request):
+        parts = urllib.parse.urlsplit(request.path)
+        params = urllib.parse.parse_qs(parts.query)
+        host = request.headers.get("X-Fixture-Host", "")
+        status, body, headers, spec = self.resolve(parts.path, params, host)
+
+        delay = self.latency + random.uniform(0, self.jitter) + spec.get("latency_ms", 0) / 1000
+        if delay > 0 and status != 204:
+            time.sleep(delay)
+
+        payload = body.encode("utf-8") if body is not None else b""
+        request.send_response(status)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        if body is not None:
+            request.send_header("Content-Type", "text/html; charset=UTF-8")
+        request.send_header("Content-Length", str(len(payload)))
+        request.end_headers()
+
+        trickle = spec.get("trickle_ms", 0) / 1000
+        try:
+            if trickle and payload:
+                size = -(-len(payload) // TRICKLE_CHUNKS)
+                for offset in range(0, len(payload), size):
+                    request.wfile.write(payload[offset:offset + size])
+                    request.wfile.flush()
+                    time.sleep(trickle)
+            else:
+                request.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (e.g. an early-exit streaming read)
+
+        with self.lock:
+            self.requests_served += 1
+
+    # Playwright integration
+
+    def install(self, context):
+        """Serve every request of a Playwright context (or page) from this server"""
+        context.route("**/*", self._route)
+
+    def _route(self, route):
+        parts = urllib.parse.urlsplit(route.request.url)
+        local = f"{self.url}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+        headers = dict(route.request.headers)
+        headers["x-fixture-host"] = parts.hostname or ""
+        try:
+            route.fulfill(response=route.fetch(url=local, headers=headers))
+        except Exception:
+            route.abort()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the SERP fixture corpus locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument("--fixtures", default=str(FIXTURE_DIR))
+    args = parser.parse_args()
+
+    server = FixtureServer(args.fixtures, args.host, args.port, args.latency, args.jitter).start()
+    print(f"Serving {args.fixtures} at {server.url} (Ctrl+C to stop)")
+    print(f"  {server.corpus_note()}")
+    for term, spec in server.manifest["terms"].items():
+        print(f"  {server.url}/search?{urllib.parse.urlencode({'q': term})}  ->  {spec['fixture']}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import random
+import time
+from urllib.parse import quote_plus, urlsplit
+
+import httpx
+
+from google_ai_fallback_scraper import GoogleAIFallbackScraper
+from retry_queue import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRateLimiter:
+    """Token bucket shared by all in-flight requests, with a global cool-down."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Hold every request for a while (e.g. after a 429 or a block page)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if not self.interval:
+                    return
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.interval)
+
+
+class AsyncFallbackEngine:
+    """asyncio engine for GoogleAIFallbackScraper with pooled keep-alive connections.
+
+    Reuses the scraper's headers, proxy list, blocking detection, extraction and
+    archive, so results match the synchronous search_google path.
+    """
+
+    def __init__(self, scraper=None, max_connections=20, max_keepalive=10, per_host_limit=4,
+                 rate_per_minute=20, burst=2, max_concurrency=8, jitter=(0.5, 2.0), timeout=30):
+        self.scraper = scraper or GoogleAIFallbackScraper()
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.per_host_limit = per_host_limit
+        self.rate_limiter = AsyncRateLimiter(rate_per_minute, burst)
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        self.timeout = timeout
+        self.clients = []
+        self.client_index = 0
+        self.host_semaphores = {}
+        self.stats = {'requests': 0, 'blocked': 0, 'errors': 0, 'bytes': 0, 'cache_hits': 0}
+
+    def _create_clients(self):
+        """One pooled client per proxy (httpx binds proxies per client)."""
+        proxies = self.scraper.proxy_list if self.scraper.use_proxy and self.scraper.proxy_list else [None]
+        for proxy in proxies:
+            self.clients.append(httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                follow_redirects=True,
+                proxy=f"http://{proxy}" if proxy else None,
+            ))
+
+    def _next_client(self):
+        client = self.clients[self.client_index]
+        self.client_index = (self.client_index + 1) % len(self.clients)
+        return client
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).hostname
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self.host_semaphores[host]
+
+    async def _fetch(self, search_url):
+        await self.rate_limiter.acquire()
+        if self.jitter:
+            await asyncio.sleep(random.uniform(*self.jitter))
+        async with self._host_semaphore(search_url):
+            response = await self._next_client().get(search_url, headers=self.scraper.get_realistic_headers())
+        self.stats['requests'] += 1
+        self.stats['bytes'] += len(response.content)
+        return response
+
+    async def search_google(self, search_term, max_retries=3):
+        """Async counterpart of GoogleAIFallbackScraper.search_google."""
+        loop = asyncio.get_running_loop()
+        cache = self.scraper.response_cache
+        if cache:
+            cached = cache.get(search_term, self.scraper.CACHE_ENGINE, self.scraper.CACHE_LOCALE)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached['has_ai_overview'], cached['result_info']
+
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"Searching Google for: '{search_term}' (Attempt {attempt + 1}/{max_retries})")
+
+                search_url = f"https://www.google.com/search?q={quote_plus(search_term)}&hl=en&gl=us"
+                response = await self._fetch(search_url)
+
+                if self.scraper.archive:
+                    try:
+                        self.scraper.archive.append(search_term, response.text, url=str(response.url),
+                                                    status=response.status_code, attempt=attempt + 1)
+                    except Exception as e:
+                        logger.warning(f"Failed to archive SERP for '{search_term}': {e}")
+
+                is_blocked, blocking_type = self.scraper.detect_blocking(response)
+                if is_blocked:
+                    self.stats['blocked'] += 1
+                    logger.warning(f"Blocking detected: {blocking_type}")
+
+                    # The block is on this IP, so every request cools down, not just this term
+                    wait_time = retry_after_seconds(response)
+                    if not wait_time:
+                        if blocking_type == "rate_limit":
+                            wait_time = random.uniform(300, 600)  # 5-10 minutes
+                        else:
+                            wait_time = random.uniform(60, 180)  # 1-3 minutes
+                    logger.info(f"Pausing all requests for {wait_time:.1f} seconds...")
+                    self.rate_limiter.pause(wait_time)
+                    continue
+
+                if response.status_code != 200:
+                    logger.warning(f"HTTP {response.status_code} received")
+                    continue
+
+                # Parsing is CPU-bound; keep it off the event loop
+                ai_overview_found = await loop.run_in_executor(
+                    None, self._extract, response.content, search_term
+                )
+
+                if ai_overview_found:
+                    result_info = f"AI overview found for '{search_term}'"
+                else:
+                    result_info = f"No AI overview found for '{search_term}'"
+                self.scraper.cache_result(search_term, ai_overview_found, result_info)
+                return ai_overview_found, result_info
+
+            except httpx.TimeoutException:
+                self.stats['errors'] += 1
+                logger.warning(f"Request timeout for '{search_term}' (Attempt {attempt + 1})")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(random.uniform(30, 60))
+                continue
+
+            except httpx.HTTPError as e:
+                self.stats['errors'] += 1
+                logger.error(f"Request error for '{search_term}': {e}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(random.uniform(30, 60))
+                continue
+
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Unexpected error for '{search_term}': {e}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(random.uniform(30, 60))
+                continue
+
+        logger.error(f"Failed to search for '{search_term}' after {max_retries} attempts")
+        return False, None
+
+    def _extract(self, content, search_term):
+        document = self.scraper.parse_html(content)
+        return self.scraper.extract_ai_overview(document, search_term)
+
+    async def search_many(self, search_terms, max_retries=3):
+        """Drain a term list concurrently; results keep the input order."""
+        self._create_clients()
+        worker_slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(term):
+            async with worker_slots:
+                has_ai_overview, result_info = await self.search_google(term, max_retries)
+                return {
+                    "search_term": term,
+                    "has_ai_overview": has_ai_overview,
+                    "result_info": result_info
+                }
+
+        try:
+            terms = [term for term in search_terms if term.strip()]
+            return await asyncio.gather(*(run_one(term) for term in terms))
+        finally:
+            await asyncio.gather(*(client.aclose() for client in self.clients))
+            self.clients = []
+
+    def run(self, search_terms, max_retries=3):
+        """Synchronous entry point for scripts."""
+        start = time.monotonic()
+        results = asyncio.run(self.search_many(search_terms, max_retries))
+        elapsed = time.monotonic() - start
+        logger.info(f"Async engine: {len(results)} terms in {elapsed:.1f}s "
+                    f"({self.stats['requests']} requests, {self.stats['blocked']} blocked, "
+                    f"{self.stats['errors']} errors, {self.stats['cache_hits']} cache hits, "
+                    f"{self.stats['bytes'] / 1024:.0f} KiB)")
+        return results
@@ -7,11 +7,16 @@ import os
 import re
 import requests
 from urllib.parse import urljoin, quote_plus
-from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 import threading
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from serp_archive import ArchivedResponse, SerpArchive, SerpArchiveReader
+from serp_parsers import AI_OVERVIEW_MATCHER, AI_OVERVIEW_SELECTORS, get_parser_backend
+from serp_stream import fetch_streaming, wire_bytes
+from response_cache import ResponseCache
+from retry_queue import RetryLater, RetryQueue, retry_after_seconds
+from page_state import PageClassifier
 
 # Configure logging
 logging.basicConfig(
@@ -24,9 +29,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Indicators for detect_blocking, in priority order
+BLOCKING_CLASSIFIER = PageClassifier(
+    text_patterns=[
+        "captcha", "unusual traffic", "automated queries", "robot",
+        "verify you're human", "suspicious activity", "blocked",
+        "access denied", "too many requests", "rate limit",
+        "security check", "prove you're human", "automated traffic"
+    ],
+    url_patterns=["sorry.google.com"],
+)
+
 class GoogleAIFallbackScraper:
-    def __init__(self, use_proxy=False, proxy_list=None):
+    # Cache key parts, matching the search URL built in search_google
+    CACHE_ENGINE = 'http_fallback'
+    CACHE_LOCALE = {'gl': 'us', 'hl': 'en'}
+    
+    def __init__(self, use_proxy=False, proxy_list=None, archive=None, parser_backend=None, streaming=False,
+                 response_cache=None):
         self.use_proxy = use_proxy
+        self.archive = archive  # Optional SerpArchive for raw SERPs
+        self.response_cache = response_cache  # Optional ResponseCache; hits skip the network entirely
+        self.last_cache_hit = False
+        self.streaming = streaming  # Stop reading each SERP once the overview outcome is known
+        self.last_transfer = None
+        self.transfer_log = []
+        self.parser = get_parser_backend(parser_backend)
+        logger.info(f"Using HTML parser backend: {self.parser.name}")
         self.proxy_list = proxy_list or []
         self.current_proxy_index = 0
         self.session_requests = 0
@@ -154,163 +183,210 @@ class GoogleAIFallbackScraper:
         if response.status_code in [403, 503]:
             return True, f"http_error_{response.status_code}"
         
-        content = response.text.lower()
-        blocking_indicators = [
-            "captcha", "unusual traffic", "automated queries", "robot",
-            "verify you're human", "suspicious activity", "blocked",
-            "access denied", "too many requests", "rate limit",
-            "security check", "prove you're human", "automated traffic"
-        ]
-        
-        for indicator in blocking_indicators:
-            if indicator in content:
-                return True, indicator
+        # One pass over the page for every indicator, plus the URL
+        state = BLOCKING_CLASSIFIER.classify_text(response.text, str(response.url))
+        if state.text_match:
+            return True, state.text_match
         
         # Check if we got redirected to a blocking page
-        if "sorry.google.com" in response.url:
+        if state.url_match:
             return True, "sorry_page_redirect"
         
         return False, None
     
-    def search_google(self, search_term, max_retries=3):
-        """Search Google using requests and parse for AI overview."""
+    def fetch_serp(self, search_term, attempt=1, pre_delay=(3, 8)):
+        """Fetch one SERP (streamed when enabled) and archive it; returns the response."""
+        # Check if we need to restart session
+        self.session_requests += 1
+        if self.session_requests >= self.max_requests_per_session:
+            logger.info("Session limit reached, creating new session...")
+            self.session.close()
+            self.session = requests.Session()
+            self.setup_session()
+            self.warm_up_session()
+            self.session_requests = 0
+            self.max_requests_per_session = random.randint(10, 20)
+        
+        # Prepare search URL
+        encoded_term = quote_plus(search_term)
+        search_url = f"https://www.google.com/search?q={encoded_term}&hl=en&gl=us"
+        
+        # Get realistic headers
+        headers = self.get_realistic_headers()
+        
+        # Setup proxy if enabled
+        proxies = None
+        if self.use_proxy and self.proxy_list:
+            proxy = self.get_next_proxy()
+            if proxy:
+                proxies = {'http': f'http://{proxy}', 'https': f'http://{proxy}'}
+                logger.info(f"Using proxy: {proxy}")
+        
+        # Add delay before request
+        if pre_delay:
+            delay = random.uniform(*pre_delay)
+            logger.info(f"Pre-request delay: {delay:.1f} seconds")
+            time.sleep(delay)
+        
+        # Make the search request
+        if self.streaming:
+            response = fetch_streaming(
+                self.session,
+                search_url,
+                headers=headers,
+                proxies=proxies,
+                timeout=30,
+                allow_redirects=True
+            )
+        else:
+            response = self.session.get(
+                search_url, 
+                headers=headers, 
+                proxies=proxies,
+                timeout=30,
+                allow_redirects=True
+            )
         
-        for attempt in range(max_retries):
+        # Keep the raw page so detection can be re-run offline later
+        if self.archive:
             try:
-                logger.info(f"Searching Google for: '{search_term}' (Attempt {attempt + 1}/{max_retries})")
-                
-                # Check if we need to restart session
-                self.session_requests += 1
-                if self.session_requests >= self.max_requests_per_session:
-                    logger.info("Session limit reached, creating new session...")
-                    self.session.close()
-                    self.session = requests.Session()
-                    self.setup_session()
-                    self.warm_up_session()
-                    self.session_requests = 0
-                    self.max_requests_per_session = random.randint(10, 20)
-                
-                # Prepare search URL
-                encoded_term = quote_plus(search_term)
-                search_url = f"https://www.google.com/search?q={encoded_term}&hl=en&gl=us"
-                
-                # Get realistic headers
-                headers = self.get_realistic_headers()
-                
-                # Setup proxy if enabled
-                proxies = None
-                if self.use_proxy and self.proxy_list:
-                    proxy = self.get_next_proxy()
-                    if proxy:
-                        proxies = {'http': f'http://{proxy}', 'https': f'http://{proxy}'}
-                        logger.info(f"Using proxy: {proxy}")
-                
-                # Add delay before request
-                delay = random.uniform(3, 8)
-                logger.info(f"Pre-request delay: {delay:.1f} seconds")
-                time.sleep(delay)
-                
-                # Make the search request
-                response = self.session.get(
-                    search_url, 
-                    headers=headers, 
-                    proxies=proxies,
-                    timeout=30,
-                    allow_redirects=True
-                )
-                
-                # Check for blocking
-                is_blocked, blocking_type = self.detect_blocking(response)
-                if is_blocked:
-                    logger.warning(f"Blocking detected: {blocking_type}")
-                    
-                    if blocking_type == "rate_limit":
-                        wait_time = random.uniform(300, 600)  # 5-10 minutes
-                        logger.info(f"Rate limit detected. Waiting {wait_time:.1f} seconds...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        wait_time = random.uniform(60, 180)  # 1-3 minutes
-                        logger.info(f"Waiting {wait_time:.1f} seconds before retry...")
-                        time.sleep(wait_time)
-                        continue
-                
-                if response.status_code != 200:
-                    logger.warning(f"HTTP {response.status_code} received")
-                    continue
-                
-                # Parse the response
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Look for AI overview content
-                ai_overview_found = self.extract_ai_overview(soup, search_term)
-                
-                if ai_overview_found:
-                    return True, f"AI overview found for '{search_term}'"
-                else:
-                    return False, f"No AI overview found for '{search_term}'"
-                
-            except requests.exceptions.Timeout:
-                logger.warning(f"Request timeout for '{search_term}' (Attempt {attempt + 1})")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(30, 60))
-                continue
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error for '{search_term}': {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(30, 60))
-                continue
-                
+                self.archive.append(search_term, response.text, url=response.url,
+                                    status=response.status_code, attempt=attempt,
+                                    complete=getattr(response, 'complete', True))
             except Exception as e:
-                logger.error(f"Unexpected error for '{search_term}': {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(30, 60))
-                continue
+                logger.warning(f"Failed to archive SERP for '{search_term}': {e}")
+        
+        return response
+    
+    def search_google(self, search_term, max_retries=3):
+        """Search Google using requests and parse for AI overview, waiting out retries in place.
+        
+        Batch runs should call search_once through a RetryQueue instead, so other terms go ahead
+        while this one backs off.
+        """
+        retry_queue = RetryQueue([search_term], max_attempts=max_retries)
+        while retry_queue:
+            entry = retry_queue.next()
+            try:
+                return self.search_once(search_term, attempt=entry.attempts)
+            except RetryLater as e:
+                if retry_queue.defer(entry, e.delay, e.reason, cooldown=e.cooldown):
+                    logger.info(f"Waiting {e.delay:.1f} seconds before retry...")
         
         logger.error(f"Failed to search for '{search_term}' after {max_retries} attempts")
         return False, None
     
-    def extract_ai_overview(self, soup, search_term):
-        """Extract AI overview content from the parsed HTML."""
-        
-        # AI overview selectors to look for
-        ai_selectors = [
-            '[data-attrid="wa:/description"]',
-            '[data-async-context*="ai_overview"]',
-            '.AI-overview',
-            '[data-ved*="AI"]',
-            '.g-blk',
-            '[jsname*="AI"]',
-            '.kp-blk',
-            '[data-attrid*="description"]',
-            '.xpdopen .LGOjhe',
-            '.kno-rdesc',
-            '.yp',
-            '[data-md="50"]',
-            '.ULSxyf',
-            '.hgKElc',
-            '.kno-fb-ctx',
-            '.Z0LcW',
-            '.IZ6rdc',
-            '.ayRjaf',
-            '.g-section-with-header',
-            '.knowledge-panel',
-            '.kp-wholepage'
-        ]
+    def search_once(self, search_term, attempt=1):
+        """One search attempt. Returns (has_ai_overview, result_info) or raises RetryLater."""
         
-        ai_overview_content = None
+        self.last_transfer = None
+        self.last_cache_hit = False
         
-        for selector in ai_selectors:
-            elements = soup.select(selector)
-            if elements:
-                ai_overview_content = elements[0]
-                logger.info(f"AI overview found using selector: {selector}")
-                break
+        if self.response_cache:
+            cached = self.response_cache.get(search_term, self.CACHE_ENGINE, self.CACHE_LOCALE)
+            if cached is not None:
+                logger.info(f"Served '{search_term}' from cache")
+                self.last_cache_hit = True
+                return cached['has_ai_overview'], cached['result_info']
         
-        if ai_overview_content:
+        logger.info(f"Searching Google for: '{search_term}' (Attempt {attempt})")
+        try:
+            response = self.fetch_serp(search_term, attempt=attempt)
+        except requests.exceptions.Timeout:
+            logger.warning(f"Request timeout for '{search_term}' (Attempt {attempt})")
+            raise RetryLater(random.uniform(30, 60), "timeout")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error for '{search_term}': {e}")
+            raise RetryLater(random.uniform(30, 60), f"request error: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error for '{search_term}': {e}")
+            raise RetryLater(random.uniform(30, 60), f"error: {e}")
+        
+        # Blocked, non-200 and retried responses cost bandwidth too, so count them before any check
+        transfer = self.record_transfer(search_term, response)
+        
+        # Check for blocking; the block is on this IP, so every term cools down, not just this one
+        is_blocked, blocking_type = self.detect_blocking(response)
+        if is_blocked:
+            transfer['outcome'] = blocking_type
+            logger.warning(f"Blocking detected: {blocking_type}")
+            cooldown = retry_after_seconds(response) or random.uniform(60, 180)
+            logger.info(f"Holding all searches for {cooldown:.0f} seconds")
+            if blocking_type == "rate_limit":
+                raise RetryLater(random.uniform(300, 600), blocking_type, cooldown=cooldown)  # 5-10 minutes
+            raise RetryLater(random.uniform(60, 180), blocking_type, cooldown=cooldown)  # 1-3 minutes
+        
+        if response.status_code != 200:
+            transfer['outcome'] = f"HTTP {response.status_code}"
+            logger.warning(f"HTTP {response.status_code} received")
+            raise RetryLater(0, f"HTTP {response.status_code}")
+        
+        try:
+            # Parse the response
+            parse_start = time.perf_counter()
+            document = self.parse_html(response.content)
+            
+            # Look for AI overview content
+            ai_overview_found = self.extract_ai_overview(document, search_term)
+            self.record_parse(transfer, time.perf_counter() - parse_start)
+        except Exception as e:
+            transfer['outcome'] = 'error'
+            logger.error(f"Unexpected error for '{search_term}': {e}")
+            raise RetryLater(random.uniform(30, 60), f"error: {e}")
+        
+        if ai_overview_found:
+            result_info = f"AI overview found for '{search_term}'"
+        else:
+            result_info = f"No AI overview found for '{search_term}'"
+        self.cache_result(search_term, ai_overview_found, result_info)
+        return ai_overview_found, result_info
+    
+    def cache_result(self, search_term, has_ai_overview, result_info):
+        """Remember a definitive answer so reruns inside the TTL skip the network."""
+        if self.response_cache:
+            self.response_cache.put(search_term, self.CACHE_ENGINE,
+                                    {'has_ai_overview': has_ai_overview, 'result_info': result_info},
+                                    self.CACHE_LOCALE)
+    
+    def record_transfer(self, search_term, response):
+        """Log bytes read for every response, used or not (proxy bandwidth is billed); returns the entry."""
+        if hasattr(response, 'bytes_read'):
+            bytes_read, stop_reason = response.bytes_read, response.stop_reason or 'full_page'
+        else:
+            bytes_read, stop_reason = wire_bytes(response, len(response.content)), 'full_page'
+        
+        self.last_transfer = {
+            'search_term': search_term,
+            'status': response.status_code,
+            'bytes_read': bytes_read,
+            'parse_ms': None,
+            'stop_reason': stop_reason,
+            'outcome': None
+        }
+        self.transfer_log.append(self.last_transfer)
+        logger.info(f"Read {bytes_read / 1024:.1f} KiB for '{search_term}' ({stop_reason})")
+        return self.last_transfer
+    
+    def record_parse(self, transfer, parse_time):
+        """Add the parse time to a response that made it through to extraction."""
+        transfer['parse_ms'] = round(parse_time * 1000, 1)
+        transfer['outcome'] = 'parsed'
+        logger.info(f"Parsed in {parse_time * 1000:.1f} ms")
+    
+    def parse_html(self, content):
+        """Parse a SERP with the configured parser backend."""
+        return self.parser.parse(content)
+    
+    def extract_ai_overview(self, document, search_term):
+        """Extract AI overview content from a document returned by parse_html."""
+        # One walk over the tree for all selectors, stopping at a top-priority hit
+        selector_index, ai_overview_content = AI_OVERVIEW_MATCHER.best_match(self.parser, document)
+        if ai_overview_content is not None:
+            logger.info(f"AI overview found using selector: {AI_OVERVIEW_SELECTORS[selector_index]}")
+        
+        if ai_overview_content is not None:
             # Extract text content
-            text_content = ai_overview_content.get_text(strip=True)
+            text_content = self.parser.node_text(ai_overview_content)
             
             # Save the content to a file
             safe_filename = sanitize_filename(search_term)
@@ -323,7 +399,7 @@ class GoogleAIFallbackScraper:
                     f.write(f"AI Overview Content:\n")
                     f.write(text_content)
                     f.write(f"\n\nHTML:\n")
-                    f.write(str(ai_overview_content))
+                    f.write(self.parser.node_html(ai_overview_content))
                 
                 logger.info(f"AI overview content saved to: {content_file}")
                 return True
@@ -333,6 +409,32 @@ class GoogleAIFallbackScraper:
                 return True  # Still found content, just couldn't save
         
         return False
+    
+    def reprocess_archive(self, archive_path):
+        """Re-run blocking detection and AI overview extraction over an archived run."""
+        reader = SerpArchiveReader(archive_path)
+        logger.info(f"Reprocessing {len(reader)} archived pages from {archive_path}")
+        
+        results = []
+        for entry, html in reader.iter_pages():
+            search_term = entry['term']
+            response = ArchivedResponse(html, entry.get('url', ''), entry.get('status', 200))
+            
+            is_blocked, blocking_type = self.detect_blocking(response)
+            if is_blocked:
+                results.append({"search_term": search_term, "has_ai_overview": False,
+                                "result_info": f"blocked: {blocking_type}"})
+                continue
+            
+            document = self.parse_html(response.content)
+            has_ai_overview = self.extract_ai_overview(document, search_term)
+            results.append({
+                "search_term": search_term,
+                "has_ai_overview": has_ai_overview,
+                "result_info": f"AI overview {'found' if has_ai_overview else 'not found'} in archive"
+            })
+        
+        return results
 
 def sanitize_filename(filename):
     """Removes or replaces characters invalid for filenames."""
@@ -366,6 +468,13 @@ def main():
     results_csv_path = 'google_ai_fallback_results.csv'
     min_delay = 20   # Longer delays for requests-based approach
     max_delay = 60
+    archive_dir = 'serp_archive'  # Raw SERPs for offline reprocessing (None to disable)
+    use_async_engine = False  # Drain the term list concurrently with pooled connections (needs httpx)
+    async_rate_per_minute = 12  # Global request cap for the async engine
+    parser_backend = None  # None = fastest installed (see benchmark_parsers.py), or e.g. 'html.parser'
+    use_streaming = True  # Stop downloading each SERP once the overview outcome is known (archives the prefix only)
+    cache_path = 'response_cache.sqlite'  # Serve reruns from disk (None to disable)
+    cache_ttl_hours = 6
     
     # Proxy configuration (optional)
     use_proxy = False  # Set to True to enable proxy rotation
@@ -376,7 +485,13 @@ def main():
     ]
     
     # Initialize fallback scraper
-    scraper = GoogleAIFallbackScraper(use_proxy=use_proxy, proxy_list=proxy_list)
+    archive = SerpArchive(archive_dir) if archive_dir else None
+    response_cache = ResponseCache(cache_path, ttl=cache_ttl_hours * 3600) if cache_path else None
+    scraper = GoogleAIFallbackScraper(use_proxy=use_proxy, proxy_list=proxy_list, archive=archive,
+                                      parser_backend=parser_backend, streaming=use_streaming,
+                                      response_cache=response_cache)
+    
+    retry_queue = None
     
     try:
         # Warm up session
@@ -390,30 +505,62 @@ def main():
         
         results = []
         
-        for i, term in enumerate(search_terms):
-            if not term.strip():
-                logger.info("Skipping empty search term.")
-                continue
+        if use_async_engine:
+            from google_ai_fallback_async import AsyncFallbackEngine
+            engine = AsyncFallbackEngine(scraper, rate_per_minute=async_rate_per_minute)
+            results = engine.run(search_terms)
+            search_terms = []  # Already processed
+        
+        # Failed attempts are parked with a not-before time while other terms go ahead
+        retry_queue = RetryQueue([term for term in search_terms if term.strip()], max_attempts=3)
+        searches = 0
+        
+        while retry_queue:
+            wait = retry_queue.wait_time()
+            if wait:
+                logger.info(f"All remaining terms are backing off, idle for {wait:.1f} seconds...")
+            entry = retry_queue.next()
+            term = entry.term
             
-            logger.info(f"Processing term {i+1}/{len(search_terms)}: {term}")
+            logger.info(f"Processing term {retry_queue.completed + 1}/{retry_queue.total}: {term}")
             
             # Search with fallback method
-            has_ai_overview, result_info = scraper.search_google(term)
+            try:
+                has_ai_overview, result_info = scraper.search_once(term, attempt=entry.attempts)
+            except RetryLater as e:
+                if retry_queue.defer(entry, e.delay, e.reason, cooldown=e.cooldown):
+                    logger.info(f"Deferring '{term}' for {e.delay:.1f} seconds ({e.reason}), moving on")
+                    has_ai_overview = None
+                else:
+                    logger.error(f"Failed to search for '{term}' after {entry.attempts} attempts")
+                    has_ai_overview, result_info = False, None
             
-            # Store results
-            results.append({
-                "search_term": term,
-                "has_ai_overview": has_ai_overview,
-                "result_info": result_info
-            })
+            if has_ai_overview is not None:
+                retry_queue.done(entry)
+                # Store results
+                transfer = scraper.last_transfer or {}
+                results.append({
+                    "search_term": term,
+                    "has_ai_overview": has_ai_overview,
+                    "result_info": result_info,
+                    "bytes_read": transfer.get('bytes_read'),
+                    "parse_ms": transfer.get('parse_ms')
+                })
+                
+                if scraper.last_cache_hit:
+                    continue  # No request was sent, so no need to wait
+            
+            if not retry_queue:
+                break
             
             # Extended delay between searches
+            searches += 1
             delay = random.uniform(min_delay, max_delay)
             logger.info(f"Waiting {delay:.2f} seconds before next search...")
             time.sleep(delay)
             
             # Extended breaks every few searches
-            if (i + 1) % 3 == 0:  # More frequent breaks for requests method
+            if searches % 3 == 0:  # More frequent breaks for requests method
                 long_break = random.uniform(180, 420)  # 3-7 minutes
                 logger.info(f"Taking extended break: {long_break:.1f} seconds...")
                 time.sleep(long_break)
@@ -429,6 +576,9 @@ def main():
             logger.info("Session closed.")
         except:
             pass
+        if archive:
+            archive.close()
+            logger.info(f"Archived {archive.pages_written} pages to {archive.archive_path}")
     
     # Save results
     logger.info("\n--- Fallback Search Analysis Complete ---")
@@ -437,10 +587,24 @@ def main():
         logger.info(f"Total terms searched: {len(results)}")
         logger.info(f"AI overviews found: {found_count}")
         logger.info(f"AI overviews not found: {len(results) - found_count}")
+        if scraper.transfer_log:
+            total_bytes = sum(t['bytes_read'] for t in scraper.transfer_log)
+            wasted_bytes = sum(t['bytes_read'] for t in scraper.transfer_log if t['outcome'] != 'parsed')
+            early_exits = sum(1 for t in scraper.transfer_log if t['stop_reason'] != 'full_page')
+            parse_times = [t['parse_ms'] for t in scraper.transfer_log if t['parse_ms'] is not None]
+            mean_parse = sum(parse_times) / len(parse_times) if parse_times else 0.0
+            logger.info(f"Bytes read: {total_bytes / 1024:.0f} KiB over {len(scraper.transfer_log)} responses "
+                        f"({total_bytes / len(scraper.transfer_log) / 1024:.1f} KiB/response, "
+                        f"{wasted_bytes / 1024:.0f} KiB on blocked, failed or retried ones, "
+                        f"{early_exits} early exits), mean parse {mean_parse:.1f} ms")
+        if response_cache:
+            logger.info(response_cache.summary())
+        if retry_queue is not None:
+            logger.info(retry_queue.summary())
         
         try:
             with open(results_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['search_term', 'has_ai_overview', 'result_info']
+                fieldnames = ['search_term', 'has_ai_overview', 'result_info', 'bytes_read', 'parse_ms']
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
                 for result in results:
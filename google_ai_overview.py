@@ -9,12 +9,17 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.service import Service
 import os
 import re
 import requests
 from urllib.parse import urljoin
+from retry_queue import RetryLater, RetryQueue
+from phase_timer import PhaseStats, PhaseTimer
+from selenium_waits import wait_for_first_selector
+from page_state import PageClassifier
+from selenium_capture import ScreenshotWriter, capture_element
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +32,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Indicators for detect_captcha_or_blocking, in priority order
+BLOCKING_CLASSIFIER = PageClassifier(
+    text_patterns=[
+        "captcha",
+        "unusual traffic",
+        "automated queries",
+        "robot",
+        "verify you're human",
+        "suspicious activity",
+        "blocked",
+        "access denied"
+    ],
+    url_patterns=[],
+    captcha_selectors=[
+        "#captcha",
+        ".captcha",
+        "[id*='captcha']",
+        "[class*='captcha']",
+        ".g-recaptcha",
+        "#recaptcha"
+    ],
+)
+
 class GoogleAIScraper:
     def __init__(self, use_proxy=False, proxy_list=None):
         self.use_proxy = use_proxy
@@ -34,6 +62,7 @@ class GoogleAIScraper:
         self.current_proxy_index = 0
         self.session_requests = 0
         self.max_requests_per_session = random.randint(15, 25)
+        self.screenshot_writer = ScreenshotWriter()  # PNGs are decoded and saved off the driving thread
         
         # Realistic user agents pool
         self.user_agents = [
@@ -255,66 +284,34 @@ class GoogleAIScraper:
             logger.warning(f"Random mouse movement failed: {e}")
     
     def detect_captcha_or_blocking(self):
-        """Detect if Google is showing CAPTCHA or blocking access."""
-        blocking_indicators = [
-            "captcha",
-            "unusual traffic",
-            "automated queries",
-            "robot",
-            "verify you're human",
-            "suspicious activity",
-            "blocked",
-            "access denied"
-        ]
-        
+        """Detect if Google is showing CAPTCHA or blocking access (one page probe)."""
         try:
-            page_source = self.driver.page_source.lower()
-            page_title = self.driver.title.lower()
-            
-            for indicator in blocking_indicators:
-                if indicator in page_source or indicator in page_title:
-                    logger.warning(f"Blocking detected: {indicator}")
-                    return True, indicator
-                    
-            # Check for specific CAPTCHA elements
-            captcha_selectors = [
-                "#captcha",
-                ".captcha",
-                "[id*='captcha']",
-                "[class*='captcha']",
-                ".g-recaptcha",
-                "#recaptcha"
-            ]
-            
-            for selector in captcha_selectors:
-                try:
-                    if self.driver.find_element(By.CSS_SELECTOR, selector):
-                        logger.warning(f"CAPTCHA element found: {selector}")
-                        return True, "captcha_element"
-                except NoSuchElementException:
-                    continue
-                    
-            return False, None
-            
+            state = BLOCKING_CLASSIFIER.probe_selenium(self.driver)
         except Exception as e:
             logger.error(f"Error detecting blocking: {e}")
             return False, None
+        
+        if state.text_match:
+            logger.warning(f"Blocking detected: {state.text_match}")
+            return True, state.text_match
+        
+        if state.captcha:
+            logger.warning(f"CAPTCHA element found: {state.captcha}")
+            return True, "captcha_element"
+        
+        return False, None
     
-    def handle_blocking(self, blocking_type):
-        """Handle different types of blocking."""
+    def handle_blocking(self, blocking_type, attempt=0):
+        """Handle different types of blocking; returns how long the term should wait before its retry."""
         logger.warning(f"Handling blocking type: {blocking_type}")
         
         if "captcha" in blocking_type.lower():
             logger.info("CAPTCHA detected. Waiting for manual resolution...")
             input("Please solve the CAPTCHA manually and press Enter to continue...")
-            return True
-        
-        # For other types of blocking, wait and retry
-        wait_time = random.uniform(60, 180)  # Wait 1-3 minutes
-        logger.info(f"Waiting {wait_time:.1f} seconds before retry...")
-        time.sleep(wait_time)
+            return 0
         
-        return False
+        # For other types of blocking, back off for 1-3 minutes plus the exponential delay
+        return random.uniform(60, 180) + self.exponential_backoff_delay(attempt)
     
     def exponential_backoff_delay(self, attempt):
         """Calculate delay using exponential backoff."""
@@ -349,222 +346,207 @@ def read_search_terms_from_csv(file_path):
         logger.error(f"Error reading CSV file: {e}")
         return []
 
-def analyze_google_search(scraper, search_term, max_retries=3):
-    """Searches Google.ca for a term and screenshots the AI overview if found."""
+def find_ai_overview_element(driver, timeout=15):
+    """Wait up to `timeout` seconds for the AI overview or, failing that, a featured snippet.
+    
+    All selectors are polled together in priority order; returns (element, selector) or (None, None).
+    """
+    ai_overview_selectors = [
+        # Updated selectors for current Google AI overview
+        "[data-attrid='wa:/description']",
+        "[data-async-context*='ai_overview']",
+        ".AI-overview",
+        "[data-ved*='AI']",
+        ".g-blk",
+        "[jsname*='AI']",
+        ".kp-blk",
+        "[data-attrid*='description']",
+        ".xpdopen .LGOjhe",
+        ".kno-rdesc",
+        ".yp",  # AI overview container
+        "[data-md='50']",  # AI overview data attribute
+        ".ULSxyf",  # AI overview content
+        ".hgKElc",  # AI overview text
+        ".kno-fb-ctx",  # Knowledge panel context
+        ".Z0LcW",  # Featured snippet
+        ".IZ6rdc",  # Rich snippet
+        ".ayRjaf"   # AI overview wrapper
+    ]
+    
+    # Featured snippets only count when no AI overview selector matches
+    featured_snippet_selectors = [
+        ".kp-blk",
+        ".g .s",
+        "[data-attrid='wa:/description']",
+        ".xpdopen",
+        ".kno-rdesc",
+        ".LGOjhe",
+        ".Z0LcW",
+        ".IZ6rdc",
+        ".hgKElc"
+    ]
+    
+    ai_overview_element, selector = wait_for_first_selector(
+        driver, ai_overview_selectors + featured_snippet_selectors, timeout)
+    if ai_overview_element is None:
+        return None, None
+    if selector in ai_overview_selectors:
+        logger.info(f"AI overview found using selector: {selector}")
+    else:
+        logger.info(f"Featured content found using selector: {selector}")
+    return ai_overview_element, selector
+
+def analyze_google_search(scraper, search_term, attempt=1, timer=None):
+    """Searches Google.ca for a term and screenshots the AI overview if found.
+    
+    Makes one attempt; a retryable failure raises RetryLater so the caller can move on to other terms.
+    Phase durations are recorded on `timer` (a PhaseTimer) when one is given.
+    """
     wait_time_for_ai_overview = 15  # Define at function level to fix UnboundLocalError
+    timer = timer or PhaseTimer()
+    timer.enter('session')
     
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Searching Google.ca for: '{search_term}' (Attempt {attempt + 1}/{max_retries})")
-            
-            # Check if we need to restart session
-            scraper.session_requests += 1
-            if scraper.session_requests >= scraper.max_requests_per_session:
-                logger.info("Session limit reached, restarting browser...")
-                scraper.driver.quit()
-                time.sleep(random.uniform(30, 60))
-                if not scraper.setup_driver():
-                    return False, None
-                scraper.session_requests = 0
-                scraper.max_requests_per_session = random.randint(15, 25)
-            
-            # Navigate to Google with random delay
-            time.sleep(random.uniform(2, 5))
-            scraper.driver.get("https://www.google.ca")
-            
-            # Check for blocking immediately after loading
+    try:
+        logger.info(f"Searching Google.ca for: '{search_term}' (Attempt {attempt})")
+        
+        # Check if we need to restart session
+        scraper.session_requests += 1
+        if scraper.session_requests >= scraper.max_requests_per_session:
+            logger.info("Session limit reached, restarting browser...")
+            scraper.driver.quit()
+            time.sleep(random.uniform(30, 60))
+            if not scraper.setup_driver():
+                return False, None
+            scraper.session_requests = 0
+            scraper.max_requests_per_session = random.randint(15, 25)
+        
+        # Navigate to Google with random delay
+        timer.enter('navigation')
+        time.sleep(random.uniform(2, 5))
+        scraper.driver.get("https://www.google.ca")
+        
+        # Check for blocking immediately after loading
+        with timer.span('block_check'):
             is_blocked, blocking_type = scraper.detect_captcha_or_blocking()
-            if is_blocked:
-                if scraper.handle_blocking(blocking_type):
-                    continue  # Retry after handling
-                else:
-                    # If can't handle, wait and retry
-                    delay = scraper.exponential_backoff_delay(attempt)
-                    logger.info(f"Waiting {delay:.1f} seconds before retry...")
-                    time.sleep(delay)
-                    continue
-            
-            # Random mouse movement
-            scraper.random_mouse_movement()
-            
-            # Handle cookie consent
-            try:
-                cookie_selectors = [
-                    "//button[contains(text(), 'Accept')]",
-                    "//button[contains(text(), 'I agree')]",
-                    "//button[contains(text(), 'OK')]",
-                    "//button[contains(text(), 'Accept all')]",
-                    "#L2AGLb",  # Google's "I agree" button ID
-                    ".QS5gu"   # Another Google consent button class
-                ]
-                
-                for selector in cookie_selectors:
-                    try:
-                        if selector.startswith("//"):
-                            cookie_button = WebDriverWait(scraper.driver, 3).until(
-                                EC.element_to_be_clickable((By.XPATH, selector))
-                            )
-                        else:
-                            cookie_button = WebDriverWait(scraper.driver, 3).until(
-                                EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                            )
-                        cookie_button.click()
-                        logger.info("Accepted cookies")
-                        time.sleep(random.uniform(1, 3))
-                        break
-                    except TimeoutException:
-                        continue
-                        
-            except Exception as e:
-                logger.info("No cookie consent dialog found or already accepted")
-            
-            # Find search box with multiple selectors
-            search_box_selectors = ["input[name='q']", "textarea[name='q']", "#APjFqb"]
-            search_box = None
+        if is_blocked:
+            retry_delay = scraper.handle_blocking(blocking_type, attempt - 1)
+            raise RetryLater(retry_delay, blocking_type, cooldown=retry_delay)
+        
+        # Random mouse movement
+        scraper.random_mouse_movement()
+        
+        # Handle cookie consent
+        try:
+            cookie_selectors = [
+                "//button[contains(text(), 'Accept')]",
+                "//button[contains(text(), 'I agree')]",
+                "//button[contains(text(), 'OK')]",
+                "//button[contains(text(), 'Accept all')]",
+                "#L2AGLb",  # Google's "I agree" button ID
+                ".QS5gu"   # Another Google consent button class
+            ]
             
-            for selector in search_box_selectors:
+            for selector in cookie_selectors:
                 try:
-                    search_box = WebDriverWait(scraper.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
+                    if selector.startswith("//"):
+                        cookie_button = WebDriverWait(scraper.driver, 3).until(
+                            EC.element_to_be_clickable((By.XPATH, selector))
+                        )
+                    else:
+                        cookie_button = WebDriverWait(scraper.driver, 3).until(
+                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+                        )
+                    cookie_button.click()
+                    logger.info("Accepted cookies")
+                    time.sleep(random.uniform(1, 3))
                     break
                 except TimeoutException:
                     continue
-            
-            if not search_box:
-                raise TimeoutException("Could not find search box")
-            
-            # Human-like typing
-            scraper.human_like_typing(search_box, search_term)
-            
-            # Random delay before pressing enter
-            time.sleep(random.uniform(0.5, 2))
-            search_box.send_keys(Keys.RETURN)
-            
-            # Wait for search results with longer timeout
+                    
+        except Exception as e:
+            logger.info("No cookie consent dialog found or already accepted")
+        
+        # Find search box with multiple selectors
+        search_box_selectors = ["input[name='q']", "textarea[name='q']", "#APjFqb"]
+        search_box = None
+        
+        for selector in search_box_selectors:
             try:
-                WebDriverWait(scraper.driver, 15).until(
-                    EC.any_of(
-                        EC.presence_of_element_located((By.ID, "search")),
-                        EC.presence_of_element_located((By.ID, "rso")),
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "[data-ved]"))
-                    )
+                search_box = WebDriverWait(scraper.driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
                 )
+                break
             except TimeoutException:
-                logger.warning("Search results took too long to load")
                 continue
+        
+        if not search_box:
+            raise TimeoutException("Could not find search box")
+        
+        # Human-like typing
+        scraper.human_like_typing(search_box, search_term)
+        
+        # Random delay before pressing enter
+        time.sleep(random.uniform(0.5, 2))
+        search_box.send_keys(Keys.RETURN)
+        
+        # Wait for search results with longer timeout
+        timer.enter('results_wait')
+        try:
+            WebDriverWait(scraper.driver, 15).until(
+                EC.any_of(
+                    EC.presence_of_element_located((By.ID, "search")),
+                    EC.presence_of_element_located((By.ID, "rso")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "[data-ved]"))
+                )
+            )
+        except TimeoutException:
+            logger.warning("Search results took too long to load")
+            raise RetryLater(scraper.exponential_backoff_delay(attempt - 1), "results did not load")
+        
+        # Check for blocking after search
+        timer.enter('block_check')
+        is_blocked, blocking_type = scraper.detect_captcha_or_blocking()
+        if is_blocked:
+            retry_delay = scraper.handle_blocking(blocking_type, attempt - 1)
+            raise RetryLater(retry_delay, blocking_type, cooldown=retry_delay)
+        
+        # Wait for AI overview with extended selectors
+        timer.enter('detection')
+        logger.info(f"Waiting up to {wait_time_for_ai_overview} seconds for AI overview...")
+        
+        ai_overview_element, _ = find_ai_overview_element(scraper.driver, wait_time_for_ai_overview)
+        
+        if ai_overview_element:
+            timer.enter('screenshot')
+            # Take screenshot: a clip of the element's rectangle, wherever the page is scrolled to
+            safe_filename_term = sanitize_filename(search_term)
+            screenshot_path = f"screenshots_google_ai/{safe_filename_term}_ai_overview.png"
             
-            # Check for blocking after search
-            is_blocked, blocking_type = scraper.detect_captcha_or_blocking()
-            if is_blocked:
-                if scraper.handle_blocking(blocking_type):
-                    continue
-                else:
-                    delay = scraper.exponential_backoff_delay(attempt)
-                    time.sleep(delay)
-                    continue
-            
-            # Wait for AI overview with extended selectors
-            logger.info(f"Waiting up to {wait_time_for_ai_overview} seconds for AI overview...")
-            
-            ai_overview_element = None
-            ai_overview_selectors = [
-                # Updated selectors for current Google AI overview
-                "[data-attrid='wa:/description']",
-                "[data-async-context*='ai_overview']",
-                ".AI-overview",
-                "[data-ved*='AI']",
-                ".g-blk",
-                "[jsname*='AI']",
-                ".kp-blk",
-                "[data-attrid*='description']",
-                ".xpdopen .LGOjhe",
-                ".kno-rdesc",
-                ".yp",  # AI overview container
-                "[data-md='50']",  # AI overview data attribute
-                ".ULSxyf",  # AI overview content
-                ".hgKElc",  # AI overview text
-                ".kno-fb-ctx",  # Knowledge panel context
-                ".Z0LcW",  # Featured snippet
-                ".IZ6rdc",  # Rich snippet
-                ".ayRjaf"   # AI overview wrapper
-            ]
-            
-            # Try multiple selectors with shorter individual timeouts
-            for selector in ai_overview_selectors:
-                try:
-                    ai_overview_element = WebDriverWait(scraper.driver, 3).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    logger.info(f"AI overview found using selector: {selector}")
-                    break
-                except TimeoutException:
-                    continue
-            
-            # If no AI overview found, look for featured snippets
-            if not ai_overview_element:
-                featured_snippet_selectors = [
-                    ".kp-blk",
-                    ".g .s",
-                    "[data-attrid='wa:/description']",
-                    ".xpdopen",
-                    ".kno-rdesc",
-                    ".LGOjhe",
-                    ".Z0LcW",
-                    ".IZ6rdc",
-                    ".hgKElc"
-                ]
-                
-                for selector in featured_snippet_selectors:
-                    try:
-                        ai_overview_element = WebDriverWait(scraper.driver, 2).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                        logger.info(f"Featured content found using selector: {selector}")
-                        break
-                    except TimeoutException:
-                        continue
-            
-            if ai_overview_element:
-                # Ensure element is visible
-                time.sleep(random.uniform(2, 4))
-                
-                # Scroll to element
-                scraper.driver.execute_script("arguments[0].scrollIntoView(true);", ai_overview_element)
-                time.sleep(random.uniform(1, 2))
-                
-                # Take screenshot
-                safe_filename_term = sanitize_filename(search_term)
-                screenshot_path = f"screenshots_google_ai/{safe_filename_term}_ai_overview.png"
-                
-                try:
-                    ai_overview_element.screenshot(screenshot_path)
-                    logger.info(f"Screenshot saved to: {screenshot_path}")
-                    return True, screenshot_path
-                except Exception as e:
-                    logger.error(f"Failed to take screenshot: {e}")
+            try:
+                image = capture_element(scraper.driver, ai_overview_element)
+                if image is None:
+                    logger.error("Failed to take screenshot: AI overview element has no size")
                     return False, None
-            else:
-                logger.info(f"No AI overview or featured content found for '{search_term}' within {wait_time_for_ai_overview} seconds.")
+                scraper.screenshot_writer.submit(screenshot_path, image)
+                logger.info(f"Screenshot queued for writing: {screenshot_path}")
+                return True, screenshot_path
+            except Exception as e:
+                logger.error(f"Failed to take screenshot: {e}")
                 return False, None
-                
-        except TimeoutException:
-            logger.warning(f"Timeout occurred for '{search_term}' within {wait_time_for_ai_overview} seconds (Attempt {attempt + 1})")
-            if attempt < max_retries - 1:
-                delay = scraper.exponential_backoff_delay(attempt)
-                logger.info(f"Waiting {delay:.1f} seconds before retry...")
-                time.sleep(delay)
-            continue
+        else:
+            logger.info(f"No AI overview or featured content found for '{search_term}' within {wait_time_for_ai_overview} seconds.")
+            return False, None
             
-        except Exception as e:
-            logger.error(f"Error occurred while searching for '{search_term}': {e}")
-            if attempt < max_retries - 1:
-                delay = scraper.exponential_backoff_delay(attempt)
-                time.sleep(delay)
-            continue
-    
-    logger.error(f"Failed to search for '{search_term}' after {max_retries} attempts")
-    return False, None
+    except RetryLater:
+        raise
+        
+    except TimeoutException:
+        logger.warning(f"Timeout occurred for '{search_term}' within {wait_time_for_ai_overview} seconds (Attempt {attempt})")
+        raise RetryLater(scraper.exponential_backoff_delay(attempt - 1), "timeout")
+        
+    except Exception as e:
+        logger.error(f"Error occurred while searching for '{search_term}': {e}")
+        raise RetryLater(scraper.exponential_backoff_delay(attempt - 1), f"error: {e}")
 
 def main():
     # Configuration
@@ -584,6 +566,8 @@ def main():
     
     # Initialize scraper
     scraper = GoogleAIScraper(use_proxy=use_proxy, proxy_list=proxy_list)
+    retry_queue = None
+    phase_stats = PhaseStats()
     
     try:
         # Setup driver
@@ -604,30 +588,53 @@ def main():
         
         results = []
         
-        for i, term in enumerate(search_terms):
-            if not term.strip():
-                logger.info("Skipping empty search term.")
-                continue
-            
-            logger.info(f"Processing term {i+1}/{len(search_terms)}: {term}")
+        # Failed attempts are parked with a not-before time while other terms go ahead
+        retry_queue = RetryQueue([term for term in search_terms if term.strip()], max_attempts=3)
+        searches = 0
+        
+        while retry_queue:
+            wait = retry_queue.wait_time()
+            if wait:
+                logger.info(f"All remaining terms are backing off, idle for {wait:.1f} seconds...")
+            entry = retry_queue.next()
+            term = entry.term
             
-            # Search with retry logic
-            has_ai_overview, screenshot = analyze_google_search(scraper, term)
+            logger.info(f"Processing term {retry_queue.completed + 1}/{retry_queue.total}: {term}")
             
-            # Store results
-            results.append({
-                "search_term": term,
-                "has_ai_overview": has_ai_overview,
-                "screenshot_path": screenshot
-            })
+            timer = PhaseTimer()
+            try:
+                has_ai_overview, screenshot = analyze_google_search(scraper, term, attempt=entry.attempts, timer=timer)
+            except RetryLater as e:
+                if retry_queue.defer(entry, e.delay, e.reason, cooldown=e.cooldown):
+                    logger.info(f"Deferring '{term}' for {e.delay:.1f} seconds ({e.reason}), moving on")
+                    has_ai_overview = None
+                else:
+                    logger.error(f"Failed to search for '{term}' after {entry.attempts} attempts")
+                    has_ai_overview, screenshot = False, None
+            timings = timer.finish()
+            phase_stats.add(timings)
+            
+            if has_ai_overview is not None:
+                retry_queue.done(entry)
+                # Store results
+                results.append({
+                    "search_term": term,
+                    "has_ai_overview": has_ai_overview,
+                    "screenshot_path": screenshot,
+                    "timings": json.dumps(timings)
+                })
+            
+            if not retry_queue:
+                break
             
             # Longer random delay between searches
+            searches += 1
             delay = random.uniform(min_delay, max_delay)
             logger.info(f"Waiting {delay:.2f} seconds before next search...")
             time.sleep(delay)
             
             # Occasional longer breaks
-            if (i + 1) % 10 == 0:
+            if searches % 10 == 0:
                 long_break = random.uniform(60, 180)
                 logger.info(f"Taking a longer break: {long_break:.1f} seconds...")
                 time.sleep(long_break)
@@ -641,18 +648,28 @@ def main():
         if scraper.driver:
             scraper.driver.quit()
             logger.info("Browser closed.")
+        scraper.screenshot_writer.close()
+        logger.info(scraper.screenshot_writer.summary())
     
     # Save results
     logger.info("\n--- Search Analysis Complete ---")
     if results:
+        # Overviews whose screenshot never reached the disk keep has_ai_overview but lose the path
+        scraper.screenshot_writer.drop_failed(results)
         found_count = sum(1 for r in results if r['has_ai_overview'])
         logger.info(f"Total terms searched: {len(results)}")
         logger.info(f"AI overviews found: {found_count}")
         logger.info(f"AI overviews not found: {len(results) - found_count}")
+        if retry_queue is not None:
+            logger.info(retry_queue.summary())
+        if phase_stats.attempts:
+            logger.info(f"Phase timings over {phase_stats.attempts} search attempts:")
+            for line in phase_stats.summary_lines():
+                logger.info(f"  {line}")
         
         try:
             with open(results_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['search_term', 'has_ai_overview', 'screenshot_path']
+                fieldnames = ['search_term', 'has_ai_overview', 'screenshot_path', 'timings']
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
                 for result in results:
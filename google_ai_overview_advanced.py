@@ -21,6 +21,11 @@ from selenium_stealth import stealth
 import threading
 import subprocess
 import platform
+from phase_timer import PhaseStats, PhaseTimer
+from retry_queue import RetryLater, RetryQueue
+from selenium_waits import wait_for_first_selector
+from page_state import PageClassifier, SEARCH_BOX_SELECTORS
+from selenium_capture import ScreenshotWriter, capture_element
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +38,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Indicators for detect_blocking_advanced, in priority order
+BLOCKING_CLASSIFIER = PageClassifier(
+    text_patterns=[
+        "captcha", "unusual traffic", "automated queries", "robot",
+        "verify you're human", "suspicious activity", "blocked",
+        "access denied", "too many requests", "rate limit",
+        "security check", "verify your identity", "prove you're human",
+        "automated traffic", "bot", "crawler", "scraper"
+    ],
+    url_patterns=["sorry.google.com", "accounts.google.com/signin"],
+    captcha_selectors=[
+        "#captcha", ".captcha", "[id*='captcha']", "[class*='captcha']",
+        ".g-recaptcha", "#recaptcha", ".recaptcha", "[data-sitekey]",
+        "iframe[src*='recaptcha']", ".cf-challenge-form"
+    ],
+    search_box_selectors=SEARCH_BOX_SELECTORS,
+)
+
 class AdvancedGoogleAIScraper:
     def __init__(self, use_proxy=False, proxy_list=None, use_mobile=False):
         self.use_proxy = use_proxy
@@ -42,6 +65,7 @@ class AdvancedGoogleAIScraper:
         self.max_requests_per_session = random.randint(8, 15)  # Reduced session length
         self.use_mobile = use_mobile
         self.ua = UserAgent()
+        self.screenshot_writer = ScreenshotWriter()  # PNGs are decoded and saved off the driving thread
         
         # Enhanced mobile user agents
         self.mobile_user_agents = [
@@ -548,80 +572,45 @@ class AdvancedGoogleAIScraper:
         return proxy
     
     def detect_blocking_advanced(self):
-        """Advanced blocking detection with multiple indicators."""
-        blocking_indicators = [
-            "captcha", "unusual traffic", "automated queries", "robot",
-            "verify you're human", "suspicious activity", "blocked",
-            "access denied", "too many requests", "rate limit",
-            "security check", "verify your identity", "prove you're human",
-            "automated traffic", "bot", "crawler", "scraper"
-        ]
-        
+        """Advanced blocking detection with multiple indicators, from a single page probe."""
         try:
-            page_source = self.driver.page_source.lower()
-            page_title = self.driver.title.lower()
-            current_url = self.driver.current_url.lower()
-            
-            # Check page content
-            for indicator in blocking_indicators:
-                if indicator in page_source or indicator in page_title:
-                    logger.warning(f"Blocking detected in content: {indicator}")
-                    return True, indicator
-            
-            # Check URL for redirects to blocking pages
-            blocking_urls = ["sorry.google.com", "accounts.google.com/signin"]
-            for url_part in blocking_urls:
-                if url_part in current_url:
-                    logger.warning(f"Blocking detected in URL: {url_part}")
-                    return True, f"url_redirect_{url_part}"
-            
-            # Check for CAPTCHA elements
-            captcha_selectors = [
-                "#captcha", ".captcha", "[id*='captcha']", "[class*='captcha']",
-                ".g-recaptcha", "#recaptcha", ".recaptcha", "[data-sitekey]",
-                "iframe[src*='recaptcha']", ".cf-challenge-form"
-            ]
-            
-            for selector in captcha_selectors:
-                try:
-                    if self.driver.find_elements(By.CSS_SELECTOR, selector):
-                        logger.warning(f"CAPTCHA element found: {selector}")
-                        return True, "captcha_element"
-                except:
-                    continue
-            
-            # Check for missing search elements (indicates blocking)
-            essential_elements = ["input[name='q']", "textarea[name='q']", "#APjFqb"]
-            found_search_box = False
-            for selector in essential_elements:
-                try:
-                    if self.driver.find_elements(By.CSS_SELECTOR, selector):
-                        found_search_box = True
-                        break
-                except:
-                    continue
-            
-            if not found_search_box and "google" in current_url:
-                logger.warning("Search box not found - possible blocking")
-                return True, "missing_search_elements"
-                
-            return False, None
-            
+            state = BLOCKING_CLASSIFIER.probe_selenium(self.driver)
         except Exception as e:
             logger.error(f"Error detecting blocking: {e}")
             return False, None
+        
+        # Same precedence as the indicator checks always had: content, URL, CAPTCHA elements, search box
+        if state.text_match:
+            logger.warning(f"Blocking detected in content: {state.text_match}")
+            return True, state.text_match
+        
+        if state.url_match:
+            logger.warning(f"Blocking detected in URL: {state.url_match}")
+            return True, f"url_redirect_{state.url_match}"
+        
+        if state.captcha:
+            logger.warning(f"CAPTCHA element found: {state.captcha}")
+            return True, "captcha_element"
+        
+        # Missing search elements indicate blocking
+        if state.search_box is False and "google" in state.url.lower():
+            logger.warning("Search box not found - possible blocking")
+            return True, "missing_search_elements"
+        
+        return False, None
     
     def handle_blocking_advanced(self, blocking_type):
-        """Advanced blocking handling with multiple strategies."""
+        """Advanced blocking handling with multiple strategies.
+        
+        Returns (retry_delay, restart): how long the term should wait before its retry, and whether
+        the session needs a fresh fingerprint first. Nothing sleeps here for longer than a refresh.
+        """
         logger.warning(f"Handling blocking type: {blocking_type}")
         
         if "captcha" in blocking_type.lower():
             logger.info("CAPTCHA detected. Implementing evasion strategy...")
             
-            # Strategy 1: Wait and hope it goes away
-            time.sleep(random.uniform(30, 60))
-            
-            # Strategy 2: Try refreshing
+            # Strategy 1: Try refreshing
             try:
                 self.driver.refresh()
                 time.sleep(random.uniform(5, 10))
@@ -630,27 +619,20 @@ class AdvancedGoogleAIScraper:
                 is_blocked, _ = self.detect_blocking_advanced()
                 if not is_blocked:
                     logger.info("Blocking resolved after refresh")
-                    return True
+                    return 0, False
             except:
                 pass
             
-            # Strategy 3: Restart session
+            # Strategy 2: Restart session and let the term cool down
             logger.info("Restarting session to bypass blocking...")
-            return False
+            return random.uniform(30, 60), True
         
         # For other blocking types
         if "rate limit" in blocking_type.lower() or "too many requests" in blocking_type.lower():
-            wait_time = random.uniform(300, 600)  # Wait 5-10 minutes
-            logger.info(f"Rate limit detected. Waiting {wait_time:.1f} seconds...")
-            time.sleep(wait_time)
-            return True
+            return random.uniform(300, 600), False  # 5-10 minutes
         
-        # Default strategy: exponential backoff
-        wait_time = random.uniform(60, 300)  # Wait 1-5 minutes
-        logger.info(f"Waiting {wait_time:.1f} seconds before retry...")
-        time.sleep(wait_time)
-        
-        return False
+        # Default strategy: back off 1-5 minutes on a fresh session
+        return random.uniform(60, 300), True
     
     def restart_session(self):
         """Restart the browser session with new fingerprint."""
@@ -701,206 +683,203 @@ def read_search_terms_from_csv(file_path):
         logger.error(f"Error reading CSV file: {e}")
         return []
 
-def analyze_google_search_advanced(scraper, search_term, max_retries=3):
-    """Advanced Google search with comprehensive evasion."""
+def find_ai_overview_element_advanced(driver, timeout=3):
+    """First element matching the AI overview selectors, as (element, selector) or (None, None).
     
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Searching Google for: '{search_term}' (Attempt {attempt + 1}/{max_retries})")
-            
-            # Check if we need to restart session
-            scraper.session_requests += 1
-            if scraper.session_requests >= scraper.max_requests_per_session:
-                logger.info("Session limit reached, restarting...")
-                if not scraper.restart_session():
-                    continue
-            
-            # Extended pre-search delay
-            pre_search_delay = random.uniform(5, 15)
-            logger.info(f"Pre-search delay: {pre_search_delay:.1f} seconds")
-            time.sleep(pre_search_delay)
-            
-            # Navigate to Google with realistic referrer
-            if random.choice([True, False]):
-                # Sometimes go through google.com first
-                scraper.driver.get("https://www.google.com")
-                time.sleep(random.uniform(2, 5))
-                scraper.realistic_mouse_movements()
-            
-            # Go to search page
-            scraper.driver.get("https://www.google.com/search")
-            time.sleep(random.uniform(2, 4))
-            
-            # Check for blocking immediately
-            is_blocked, blocking_type = scraper.detect_blocking_advanced()
-            if is_blocked:
-                if scraper.handle_blocking_advanced(blocking_type):
-                    continue
-                else:
-                    if not scraper.restart_session():
-                        continue
-                    continue
-            
-            # Realistic mouse movements before searching
+    The selectors are checked together in priority order, once per poll, for up to `timeout` seconds.
+    """
+    ai_overview_selectors = [
+        # Latest Google AI overview selectors
+        "[data-attrid='wa:/description']",
+        "[data-async-context*='ai_overview']", 
+        ".AI-overview",
+        "[data-ved*='AI']",
+        ".g-blk",
+        "[jsname*='AI']",
+        ".kp-blk",
+        "[data-attrid*='description']",
+        ".xpdopen .LGOjhe",
+        ".kno-rdesc",
+        ".yp",
+        "[data-md='50']",
+        ".ULSxyf",
+        ".hgKElc", 
+        ".kno-fb-ctx",
+        ".Z0LcW",
+        ".IZ6rdc",
+        ".ayRjaf",
+        ".g-section-with-header",
+        ".knowledge-panel",
+        ".kp-wholepage",
+        "[data-hveid*='CA']",
+        ".g[data-ved*='0ahUKEwi']"
+    ]
+    
+    ai_overview_element, selector = wait_for_first_selector(driver, ai_overview_selectors, timeout)
+    if ai_overview_element is not None:
+        logger.info(f"AI overview found using selector: {selector}")
+    return ai_overview_element, selector
+
+def analyze_google_search_advanced(scraper, search_term, attempt=1, timer=None):
+    """Advanced Google search with comprehensive evasion.
+    
+    Makes one attempt; a retryable failure raises RetryLater so the caller can move on to other terms.
+    Phase durations are recorded on `timer` (a PhaseTimer) when one is given.
+    """
+    timer = timer or PhaseTimer()
+    timer.enter('session')
+    
+    try:
+        logger.info(f"Searching Google for: '{search_term}' (Attempt {attempt})")
+        
+        # Check if we need to restart session
+        scraper.session_requests += 1
+        if scraper.session_requests >= scraper.max_requests_per_session:
+            logger.info("Session limit reached, restarting...")
+            if not scraper.restart_session():
+                raise RetryLater(0, "session restart failed")
+        
+        # Extended pre-search delay
+        timer.enter('warmup')
+        pre_search_delay = random.uniform(5, 15)
+        logger.info(f"Pre-search delay: {pre_search_delay:.1f} seconds")
+        time.sleep(pre_search_delay)
+        
+        # Navigate to Google with realistic referrer
+        timer.enter('navigation')
+        if random.choice([True, False]):
+            # Sometimes go through google.com first
+            scraper.driver.get("https://www.google.com")
+            time.sleep(random.uniform(2, 5))
             scraper.realistic_mouse_movements()
-            
-            # Find search box with multiple strategies
-            search_box_selectors = [
-                "input[name='q']", 
-                "textarea[name='q']", 
-                "#APjFqb",
-                "[data-ved] input",
-                ".gLFyf"
-            ]
-            
-            search_box = None
-            for selector in search_box_selectors:
-                try:
-                    search_box = WebDriverWait(scraper.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    logger.info(f"Found search box with selector: {selector}")
-                    break
-                except TimeoutException:
-                    continue
-            
-            if not search_box:
-                logger.warning("Could not find search box")
-                continue
-            
-            # Human-like interaction with search box
-            scraper.human_like_click(search_box)
-            time.sleep(random.uniform(0.5, 1.5))
-            
-            # Type search term naturally
-            scraper.human_like_typing(search_box, search_term)
-            
-            # Random delay before submitting
-            time.sleep(random.uniform(1, 3))
-            
-            # Submit search (sometimes use Enter, sometimes click search button)
-            if random.choice([True, False]):
-                search_box.send_keys(Keys.RETURN)
-            else:
-                try:
-                    search_button = scraper.driver.find_element(By.CSS_SELECTOR, "input[value='Google Search']")
-                    scraper.human_like_click(search_button)
-                except:
-                    search_box.send_keys(Keys.RETURN)
-            
-            # Wait for results with extended timeout
+        
+        # Go to search page
+        scraper.driver.get("https://www.google.com/search")
+        time.sleep(random.uniform(2, 4))
+        
+        # Check for blocking immediately
+        with timer.span('block_check'):
+            is_blocked, blocking_type = scraper.detect_blocking_advanced()
+        if is_blocked:
+            retry_delay, restart = scraper.handle_blocking_advanced(blocking_type)
+            if restart:
+                scraper.restart_session()
+            raise RetryLater(retry_delay, blocking_type, cooldown=retry_delay)
+        
+        # Realistic mouse movements before searching
+        scraper.realistic_mouse_movements()
+        
+        # Find search box with multiple strategies
+        search_box_selectors = [
+            "input[name='q']", 
+            "textarea[name='q']", 
+            "#APjFqb",
+            "[data-ved] input",
+            ".gLFyf"
+        ]
+        
+        search_box = None
+        for selector in search_box_selectors:
             try:
-                WebDriverWait(scraper.driver, 20).until(
-                    EC.any_of(
-                        EC.presence_of_element_located((By.ID, "search")),
-                        EC.presence_of_element_located((By.ID, "rso")),
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "[data-ved]")),
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".g"))
-                    )
+                search_box = WebDriverWait(scraper.driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
                 )
+                logger.info(f"Found search box with selector: {selector}")
+                break
             except TimeoutException:
-                logger.warning("Search results took too long to load")
                 continue
+        
+        if not search_box:
+            logger.warning("Could not find search box")
+            raise RetryLater(0, "search box not found")
+        
+        # Human-like interaction with search box
+        scraper.human_like_click(search_box)
+        time.sleep(random.uniform(0.5, 1.5))
+        
+        # Type search term naturally
+        scraper.human_like_typing(search_box, search_term)
+        
+        # Random delay before submitting
+        time.sleep(random.uniform(1, 3))
+        
+        # Submit search (sometimes use Enter, sometimes click search button)
+        if random.choice([True, False]):
+            search_box.send_keys(Keys.RETURN)
+        else:
+            try:
+                search_button = scraper.driver.find_element(By.CSS_SELECTOR, "input[value='Google Search']")
+                scraper.human_like_click(search_button)
+            except:
+                search_box.send_keys(Keys.RETURN)
+        
+        # Wait for results with extended timeout
+        timer.enter('results_wait')
+        try:
+            WebDriverWait(scraper.driver, 20).until(
+                EC.any_of(
+                    EC.presence_of_element_located((By.ID, "search")),
+                    EC.presence_of_element_located((By.ID, "rso")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "[data-ved]")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ".g"))
+                )
+            )
+        except TimeoutException:
+            logger.warning("Search results took too long to load")
+            raise RetryLater(0, "results did not load")
+        
+        # Check for blocking after search
+        timer.enter('block_check')
+        is_blocked, blocking_type = scraper.detect_blocking_advanced()
+        if is_blocked:
+            retry_delay, restart = scraper.handle_blocking_advanced(blocking_type)
+            if restart:
+                scraper.restart_session()
+            raise RetryLater(retry_delay, blocking_type, cooldown=retry_delay)
+        
+        # Simulate reading results
+        timer.enter('browsing')
+        time.sleep(random.uniform(2, 5))
+        scraper.realistic_mouse_movements()
+        
+        # Look for AI overview with comprehensive selectors
+        timer.enter('detection')
+        logger.info("Looking for AI overview...")
+        
+        ai_overview_element, _ = find_ai_overview_element_advanced(scraper.driver)
+        
+        if ai_overview_element:
+            timer.enter('screenshot')
+            # Take screenshot: a clip of the element's rectangle, wherever the page is scrolled to
+            safe_filename_term = sanitize_filename(search_term)
+            screenshot_path = f"screenshots_google_ai/{safe_filename_term}_ai_overview.png"
             
-            # Check for blocking after search
-            is_blocked, blocking_type = scraper.detect_blocking_advanced()
-            if is_blocked:
-                if scraper.handle_blocking_advanced(blocking_type):
-                    continue
-                else:
-                    if not scraper.restart_session():
-                        continue
-                    continue
-            
-            # Simulate reading results
-            time.sleep(random.uniform(2, 5))
-            scraper.realistic_mouse_movements()
-            
-            # Look for AI overview with comprehensive selectors
-            logger.info("Looking for AI overview...")
-            
-            ai_overview_element = None
-            ai_overview_selectors = [
-                # Latest Google AI overview selectors
-                "[data-attrid='wa:/description']",
-                "[data-async-context*='ai_overview']", 
-                ".AI-overview",
-                "[data-ved*='AI']",
-                ".g-blk",
-                "[jsname*='AI']",
-                ".kp-blk",
-                "[data-attrid*='description']",
-                ".xpdopen .LGOjhe",
-                ".kno-rdesc",
-                ".yp",
-                "[data-md='50']",
-                ".ULSxyf",
-                ".hgKElc", 
-                ".kno-fb-ctx",
-                ".Z0LcW",
-                ".IZ6rdc",
-                ".ayRjaf",
-                ".g-section-with-header",
-                ".knowledge-panel",
-                ".kp-wholepage",
-                "[data-hveid*='CA']",
-                ".g[data-ved*='0ahUKEwi']"
-            ]
-            
-            # Try each selector with patience
-            for selector in ai_overview_selectors:
-                try:
-                    elements = scraper.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        ai_overview_element = elements[0]
-                        logger.info(f"AI overview found using selector: {selector}")
-                        break
-                except:
-                    continue
-            
-            if ai_overview_element:
-                # Ensure element is visible and stable
-                time.sleep(random.uniform(2, 4))
-                
-                # Scroll to element naturally
-                scraper.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", ai_overview_element)
-                time.sleep(random.uniform(2, 3))
-                
-                # Take screenshot
-                safe_filename_term = sanitize_filename(search_term)
-                screenshot_path = f"screenshots_google_ai/{safe_filename_term}_ai_overview.png"
-                
-                try:
-                    # Ensure directory exists
-                    os.makedirs("screenshots_google_ai", exist_ok=True)
-                    
-                    ai_overview_element.screenshot(screenshot_path)
-                    logger.info(f"Screenshot saved to: {screenshot_path}")
-                    return True, screenshot_path
-                except Exception as e:
-                    logger.error(f"Failed to take screenshot: {e}")
+            try:
+                # Clip of the element's full rectangle; the writer creates the directory
+                image = capture_element(scraper.driver, ai_overview_element)
+                if image is None:
+                    logger.error("Failed to take screenshot: AI overview element has no size")
                     return False, None
-            else:
-                logger.info(f"No AI overview found for '{search_term}'")
+                scraper.screenshot_writer.submit(screenshot_path, image)
+                logger.info(f"Screenshot queued for writing: {screenshot_path}")
+                return True, screenshot_path
+            except Exception as e:
+                logger.error(f"Failed to take screenshot: {e}")
                 return False, None
-                
-        except TimeoutException:
-            logger.warning(f"Timeout occurred for '{search_term}' (Attempt {attempt + 1})")
-            if attempt < max_retries - 1:
-                delay = random.uniform(30, 90)
-                logger.info(f"Waiting {delay:.1f} seconds before retry...")
-                time.sleep(delay)
-            continue
+        else:
+            logger.info(f"No AI overview found for '{search_term}'")
+            return False, None
             
-        except Exception as e:
-            logger.error(f"Error occurred while searching for '{search_term}': {e}")
-            if attempt < max_retries - 1:
-                delay = random.uniform(30, 90)
-                time.sleep(delay)
-            continue
-    
-    logger.error(f"Failed to search for '{search_term}' after {max_retries} attempts")
-    return False, None
+    except RetryLater:
+        raise
+        
+    except TimeoutException:
+        logger.warning(f"Timeout occurred for '{search_term}' (Attempt {attempt})")
+        raise RetryLater(random.uniform(30, 90), "timeout")
+        
+    except Exception as e:
+        logger.error(f"Error occurred while searching for '{search_term}': {e}")
+        raise RetryLater(random.uniform(30, 90), f"error: {e}")
 
 def main():
     # Configuration
@@ -920,6 +899,8 @@ def main():
     
     # Initialize advanced scraper
     scraper = AdvancedGoogleAIScraper(use_proxy=use_proxy, proxy_list=proxy_list)
+    retry_queue = None
+    phase_stats = PhaseStats()
     
     try:
         # Setup undetected driver
@@ -943,30 +924,54 @@ def main():
         
         results = []
         
-        for i, term in enumerate(search_terms):
-            if not term.strip():
-                logger.info("Skipping empty search term.")
-                continue
+        # Failed attempts are parked with a not-before time while other terms go ahead
+        retry_queue = RetryQueue([term for term in search_terms if term.strip()], max_attempts=3)
+        searches = 0
+        
+        while retry_queue:
+            wait = retry_queue.wait_time()
+            if wait:
+                logger.info(f"All remaining terms are backing off, idle for {wait:.1f} seconds...")
+            entry = retry_queue.next()
+            term = entry.term
             
-            logger.info(f"Processing term {i+1}/{len(search_terms)}: {term}")
+            logger.info(f"Processing term {retry_queue.completed + 1}/{retry_queue.total}: {term}")
             
-            # Search with advanced retry logic
-            has_ai_overview, screenshot = analyze_google_search_advanced(scraper, term)
+            timer = PhaseTimer()
+            try:
+                has_ai_overview, screenshot = analyze_google_search_advanced(scraper, term, attempt=entry.attempts,
+                                                                             timer=timer)
+            except RetryLater as e:
+                if retry_queue.defer(entry, e.delay, e.reason, cooldown=e.cooldown):
+                    logger.info(f"Deferring '{term}' for {e.delay:.1f} seconds ({e.reason}), moving on")
+                    has_ai_overview = None
+                else:
+                    logger.error(f"Failed to search for '{term}' after {entry.attempts} attempts")
+                    has_ai_overview, screenshot = False, None
+            timings = timer.finish()
+            phase_stats.add(timings)
+            
+            if has_ai_overview is not None:
+                retry_queue.done(entry)
+                # Store results
+                results.append({
+                    "search_term": term,
+                    "has_ai_overview": has_ai_overview,
+                    "screenshot_path": screenshot,
+                    "timings": json.dumps(timings)
+                })
             
-            # Store results
-            results.append({
-                "search_term": term,
-                "has_ai_overview": has_ai_overview,
-                "screenshot_path": screenshot
-            })
+            if not retry_queue:
+                break
             
             # Extended delay between searches
+            searches += 1
             delay = random.uniform(min_delay, max_delay)
             logger.info(f"Waiting {delay:.2f} seconds before next search...")
             time.sleep(delay)
             
             # Extended breaks every few searches
-            if (i + 1) % 5 == 0:
+            if searches % 5 == 0:
                 long_break = random.uniform(120, 300)  # 2-5 minutes
                 logger.info(f"Taking extended break: {long_break:.1f} seconds...")
                 time.sleep(long_break)
@@ -988,18 +993,28 @@ def main():
                 logger.info("Browser closed.")
         except:
             pass
+        scraper.screenshot_writer.close()
+        logger.info(scraper.screenshot_writer.summary())
     
     # Save results
     logger.info("\n--- Advanced Search Analysis Complete ---")
     if results:
+        # Overviews whose screenshot never reached the disk keep has_ai_overview but lose the path
+        scraper.screenshot_writer.drop_failed(results)
         found_count = sum(1 for r in results if r['has_ai_overview'])
         logger.info(f"Total terms searched: {len(results)}")
         logger.info(f"AI overviews found: {found_count}")
         logger.info(f"AI overviews not found: {len(results) - found_count}")
+        if retry_queue is not None:
+            logger.info(retry_queue.summary())
+        if phase_stats.attempts:
+            logger.info(f"Phase timings over {phase_stats.attempts} search attempts:")
+            for line in phase_stats.summary_lines():
+                logger.info(f"  {line}")
         
         try:
             with open(results_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['search_term', 'has_ai_overview', 'screenshot_path']
+                fieldnames = ['search_term', 'has_ai_overview', 'screenshot_path', 'timings']
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
                 for result in results:
@@ -13,14 +13,28 @@ import csv
 import time
 import random
 import json
+import logging
 import base64
 import urllib.parse
 from datetime import datetime
 from playwright.sync_api import sync_playwright
 from pathlib import Path
+from phase_timer import PhaseStats, PhaseTimer
+from response_cache import ScraperCache
+from resource_monitor import ResourceMonitor
+from term_ingest import describe, fan_out, read_term_groups
+from term_log import TermLog
+
+# Per-term output, routed through TermLog: INFO+ to the console off-thread, DEBUG only kept for failed terms
+logger = logging.getLogger(__name__)
 
 class GoogleAIOverviewScraper:
-    def __init__(self, csv_file, output_dir="screenshots", delay_range=(3, 8), proxies=None):
+    # Cache key parts: results from different scrapers or locales never mix
+    CACHE_ENGINE = 'playwright_20250526'
+    CACHE_LOCALE = {'gl': 'ca', 'hl': 'en-CA', 'cr': 'countryCA', 'lr': 'lang_en'}
+
+    def __init__(self, csv_file, output_dir="screenshots", delay_range=(3, 8), proxies=None,
+                 cache_path=None, cache_ttl=6 * 3600, memory_ceiling_mb=1500, debug_log=None):
         self.csv_file = csv_file
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
@@ -29,6 +43,18 @@ class GoogleAIOverviewScraper:
         self.proxies = proxies or []
         self.current_proxy_index = 0
         
+        # Optional TTL cache: reruns inside the TTL are served without a browser
+        self.result_cache = ScraperCache(cache_path, self.CACHE_ENGINE, self.CACHE_LOCALE, ttl=cache_ttl)
+        
+        # The browser is recycled when its process tree outgrows this many MB (None: only on proxy rotation)
+        self.resource_monitor = ResourceMonitor(memory_ceiling_mb)
+        
+        # Per-phase timings of every search attempt, summarised in print_summary
+        self.phase_stats = PhaseStats()
+        
+        # Per-term output goes to the console off-thread; debug_log adds a JSON-lines file with failed terms' detail
+        self.term_log = TermLog(logger, log_file=debug_log)
+        
         # Validate proxy configuration
         if self.proxies:
             print(f"🔐 Proxy configuration loaded: {len(self.proxies)} proxies available")
@@ -208,13 +234,13 @@ class GoogleAIOverviewScraper:
             return has_ai_content or is_ai_header
             
         except Exception as e:
-            print(f"  ⚠️ Error verifying element: {e}")
+            logger.debug("⚠️ Error verifying element: %s", e)
             return False
 
     def detect_ai_overview(self, page):
         """Detect if AI Overview is present on the page using the exact wrapper structure"""
         
-        print("  🔍 Checking for AI Overview using specific wrapper div...")
+        logger.debug("🔍 Checking for AI Overview using specific wrapper div...")
         
         # Primary AI Overview container selectors based on your HTML example
         ai_overview_wrapper_selectors = [
@@ -244,7 +270,7 @@ class GoogleAIOverviewScraper:
         for selector in ai_overview_wrapper_selectors:
             try:
                 elements = page.query_selector_all(selector)
-                print(f"  📋 Trying selector: {selector} - Found {len(elements)} elements")
+                logger.debug("📋 Trying selector: %s - Found %s elements", selector, len(elements))
                 
                 for element in elements:
                     if element and element.is_visible():
@@ -254,17 +280,17 @@ class GoogleAIOverviewScraper:
                         if "AI Overview" in element_text:
                             # Additional verification using the new method
                             if self.verify_ai_overview_element(page, element):
-                                print(f"  ✅ Found and verified AI Overview wrapper")
+                                logger.info("✅ Found and verified AI Overview wrapper")
                                 ai_overview_element = element
                                 selector_used = selector
                                 return True, selector_used, ai_overview_element
                             else:
-                                print(f"  ⚠️ Found 'AI Overview' text but failed additional verification")
+                                logger.debug("⚠️ Found 'AI Overview' text but failed additional verification")
                         else:
-                            print(f"  ⚠️ Found element but no 'AI Overview' text")
+                            logger.debug("⚠️ Found element but no 'AI Overview' text")
                             
             except Exception as e:
-                print(f"  ⚠️ Error with selector {selector}: {e}")
+                logger.debug("⚠️ Error with selector %s: %s", selector, e)
                 continue
         
         # Fallback: Check for the H1 with "AI Overview" text specifically
@@ -276,19 +302,19 @@ class GoogleAIOverviewScraper:
                     parent = h1.locator('xpath=ancestor::div[@data-mcpr or contains(@class, "YzCcne")]').first
                     if parent:
                         if self.verify_ai_overview_element(page, parent):
-                            print(f"  ✅ Found and verified AI Overview via H1 parent fallback")
+                            logger.info("✅ Found and verified AI Overview via H1 parent fallback")
                             ai_overview_element = parent
                             selector_used = "h1:has-text('AI Overview') -> parent"
                             return True, selector_used, ai_overview_element
                     else:
                         # Check if the H1 itself passes verification
                         if self.verify_ai_overview_element(page, h1):
-                            print(f"  ✅ Found and verified AI Overview via H1 fallback")
+                            logger.info("✅ Found and verified AI Overview via H1 fallback")
                             ai_overview_element = h1
                             selector_used = "h1:has-text('AI Overview')"
                             return True, selector_used, ai_overview_element
         except Exception as e:
-            print(f"  ⚠️ H1 fallback failed: {e}")
+            logger.debug("⚠️ H1 fallback failed: %s", e)
         
         # Final fallback: Text-based search with stricter criteria
         # NOTE: This should NOT return True since we couldn't find a valid element
@@ -298,20 +324,20 @@ class GoogleAIOverviewScraper:
             
             for indicator in ai_indicators:
                 if indicator in page_content:
-                    print(f"  ⚠️ Found AI Overview text in page content, but no valid element structure - NOT counting as valid AI Overview")
+                    logger.warning("⚠️ Found AI Overview text in page content, but no valid element structure - NOT counting as valid AI Overview")
                     # Don't return True here - we need a valid element to screenshot
                     break
         except Exception as e:
-            print(f"  ⚠️ Text search failed: {e}")
+            logger.debug("⚠️ Text search failed: %s", e)
         
-        print(f"  ❌ No AI Overview found on this page")
+        logger.info("❌ No AI Overview found on this page")
         return False, None, None
 
     def expand_ai_overview(self, page, ai_overview_element=None):
         """Expand AI Overview content by clicking 'Show more' buttons"""
         expanded_something = False
         
-        print("  🔍 Looking for AI Overview expandable content...")
+        logger.debug("🔍 Looking for AI Overview expandable content...")
         
         # Strategy 1: Target the specific AI Overview "Show more" button structure
         ai_overview_expand_selectors = [
@@ -337,12 +363,12 @@ class GoogleAIOverviewScraper:
             'div[role="button"]:has-text("Show more")'
         ]
         
-        print("  🎯 Searching for AI Overview 'Show more' buttons...")
+        logger.debug("🎯 Searching for AI Overview 'Show more' buttons...")
         
         for selector in ai_overview_expand_selectors:
             try:
                 buttons = page.query_selector_all(selector)
-                print(f"  🔍 Trying selector: {selector} - Found {len(buttons)} elements")
+                logger.debug("🔍 Trying selector: %s - Found %s elements", selector, len(buttons))
                 
                 for button in buttons:
                     if button.is_visible():
@@ -354,7 +380,7 @@ class GoogleAIOverviewScraper:
                         except:
                             pass
                         
-                        print(f"  📋 Button details - ARIA: '{aria_label}', Text: '{button_text}'")
+                        logger.debug("📋 Button details - ARIA: '%s', Text: '%s'", aria_label, button_text)
                         
                         # Verify this is actually a "Show more" button for AI Overview
                         is_ai_overview_button = (
@@ -367,7 +393,7 @@ class GoogleAIOverviewScraper:
                         )
                         
                         if is_ai_overview_button:
-                            print(f"  🎯 Found AI Overview expand button: '{aria_label or button_text}'")
+                            logger.debug("🎯 Found AI Overview expand button: '%s'", aria_label or button_text)
                             
                             try:
                                 # Scroll to button and ensure it's in view
@@ -387,7 +413,7 @@ class GoogleAIOverviewScraper:
                                 
                                 # Wait for content to expand
                                 time.sleep(random.uniform(2, 4))
-                                print(f"  ✅ Successfully expanded AI Overview content!")
+                                logger.info("✅ Successfully expanded AI Overview content!")
                                 
                                 # Remove highlighting
                                 page.evaluate("""(element) => {
@@ -398,16 +424,16 @@ class GoogleAIOverviewScraper:
                                 return expanded_something
                                 
                             except Exception as e:
-                                print(f"  ⚠️ Failed to click expand button: {e}")
+                                logger.debug("⚠️ Failed to click expand button: %s", e)
                                 continue
                                 
             except Exception as e:
-                print(f"  ⚠️ Error with selector {selector}: {e}")
+                logger.debug("⚠️ Error with selector %s: %s", selector, e)
                 continue
         
         # Strategy 2: If specific selectors fail, try a more general approach
         if not expanded_something:
-            print("  🔄 Trying general approach...")
+            logger.debug("🔄 Trying general approach...")
             try:
                 # Look for any button containing "Show more" text
                 show_more_buttons = page.query_selector_all('*')
@@ -418,7 +444,7 @@ class GoogleAIOverviewScraper:
                             aria_label = (element.get_attribute('aria-label') or "").lower()
                             
                             if ('show more' in element_text or 'show more' in aria_label) and element.is_visible():
-                                print(f"  🎯 Found potential expand button: '{element_text or aria_label}'")
+                                logger.debug("🎯 Found potential expand button: '%s'", element_text or aria_label)
                                 
                                 # Check if this might be in an AI Overview context
                                 parent_content = ""
@@ -442,25 +468,27 @@ class GoogleAIOverviewScraper:
                                         element.click()
                                         expanded_something = True
                                         time.sleep(random.uniform(2, 4))
-                                        print(f"  ✅ Successfully expanded content with general approach!")
+                                        logger.info("✅ Successfully expanded content with general approach!")
                                         return expanded_something
                                     except:
                                         continue
                     except:
                         continue
             except Exception as e:
-                print(f"  ⚠️ General approach failed: {e}")
+                logger.debug("⚠️ General approach failed: %s", e)
         
         if expanded_something:
-            print(f"  🎉 Content expansion completed - waiting for DOM updates...")
+            logger.info("🎉 Content expansion completed - waiting for DOM updates...")
             time.sleep(random.uniform(2, 4))
         else:
-            print(f"  ℹ️ No expandable AI Overview content found")
+            logger.info("ℹ️ No expandable AI Overview content found")
         
         return expanded_something
 
     def search_and_screenshot(self, search_term, browser, context):
-        """Perform search and take screenshot if AI overview found"""
+        """Perform search and take screenshot if AI overview found; per-phase timings go into result['timings']"""
+        timer = PhaseTimer()
+        timer.enter('session')
         page = context.new_page()
         
         try:
@@ -468,7 +496,8 @@ class GoogleAIOverviewScraper:
             search_url = f"https://www.google.ca/search?q={urllib.parse.quote_plus(search_term)}&hl=en-CA&gl=ca&cr=countryCA&lr=lang_en"
 
             
-            print(f"  🌐 Navigating to: {search_url}")
+            timer.enter('navigation')
+            logger.debug("🌐 Navigating to: %s", search_url)
             page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
             
             # Wait for page to fully load
@@ -476,10 +505,10 @@ class GoogleAIOverviewScraper:
             
             # Check if we got blocked or redirected
             current_url = page.url
-            print(f"  📍 Current URL: {current_url}")
+            logger.debug("📍 Current URL: %s", current_url)
             
             if 'sorry' in current_url.lower() or 'blocked' in current_url.lower():
-                print("  ⚠️ Detected blocking, trying alternative method...")
+                logger.warning("⚠️ Detected blocking, trying alternative method...")
                 
                 # Method 2: Try going to google.ca first, then search
                 page.goto('https://www.google.ca/?gl=ca&hl=en-CA', timeout=30000)
@@ -492,7 +521,7 @@ class GoogleAIOverviewScraper:
                 for selector in search_selectors:
                     try:
                         search_box = page.wait_for_selector(selector, timeout=5000)
-                        print(f"  ✅ Found search box: {selector}")
+                        logger.debug("✅ Found search box: %s", selector)
                         break
                     except:
                         continue
@@ -509,6 +538,7 @@ class GoogleAIOverviewScraper:
                     raise Exception("Could not find search box with any selector")
             
             # Wait for search results to appear - try multiple selectors
+            timer.enter('results_wait')
             search_result_selectors = [
                 '#search',
                 '.g',
@@ -523,7 +553,7 @@ class GoogleAIOverviewScraper:
                 try:
                     page.wait_for_selector(selector, timeout=10000)
                     results_found = True
-                    print(f"  ✅ Search results loaded (found: {selector})")
+                    logger.debug("✅ Search results loaded (found: %s)", selector)
                     break
                 except:
                     continue
@@ -533,18 +563,19 @@ class GoogleAIOverviewScraper:
                 page_content = page.content()
                 if any(indicator in page_content.lower() for indicator in ['results', 'about', 'web']):
                     results_found = True
-                    print("  ✅ Search results detected via content analysis")
+                    logger.debug("✅ Search results detected via content analysis")
                 else:
                     # Take a debug screenshot to see what's happening
                     debug_path = self.output_dir / f"debug_{search_term.replace(' ', '_')}.png"
                     page.screenshot(path=str(debug_path))
-                    print(f"  🐛 Debug screenshot saved: {debug_path}")
+                    logger.info("🐛 Debug screenshot saved: %s", debug_path)
                     raise Exception("Could not find search results on page")
             
             # Additional wait for dynamic content
             time.sleep(random.uniform(2, 4))
             
             # Check for AI Overview
+            timer.enter('detection')
             has_ai_overview, selector_used, ai_overview_element = self.detect_ai_overview(page)
             
             result = {
@@ -558,20 +589,22 @@ class GoogleAIOverviewScraper:
             
             # If AI overview found, try to expand it before screenshot
             if has_ai_overview and ai_overview_element is not None:
-                print(f"  🎯 AI Overview detected for '{search_term}'")
+                logger.info("🎯 AI Overview detected for '%s'", search_term)
                 
                 # Double-check: Verify the element still exists and contains AI Overview text
                 try:
                     if ai_overview_element.is_visible():
                         element_text = ai_overview_element.inner_text()
                         if element_text and 'AI Overview' in element_text:
-                            print(f"  ✅ Verified AI Overview presence")
+                            logger.debug("✅ Verified AI Overview presence")
                             
                             # Try to expand the content
+                            timer.enter('expansion')
                             content_expanded = self.expand_ai_overview(page, ai_overview_element)
                             result['content_expanded'] = content_expanded
                             
                             # Take screenshot after expansion attempt
+                            timer.enter('screenshot')
                             screenshot_path = self.output_dir / f"{search_term.replace(' ', '_').replace('/', '_')}_ai_overview.png"
                             
                             # Scroll to AI Overview element
@@ -583,30 +616,32 @@ class GoogleAIOverviewScraper:
                             result['screenshot_path'] = str(screenshot_path)
                             
                             expansion_status = "with expanded content" if content_expanded else "without expansion"
-                            print(f"  ✅ AI Overview screenshot saved {expansion_status}")
+                            logger.info("✅ AI Overview screenshot saved %s", expansion_status)
                         else:
-                            print(f"  ⚠️ Element found but doesn't contain 'AI Overview' text - skipping screenshot")
+                            logger.warning("⚠️ Element found but doesn't contain 'AI Overview' text - skipping screenshot")
                             result['has_ai_overview'] = False
                     else:
-                        print(f"  ⚠️ AI Overview element not visible - skipping screenshot")
+                        logger.warning("⚠️ AI Overview element not visible - skipping screenshot")
                         result['has_ai_overview'] = False
                 except Exception as e:
-                    print(f"  ⚠️ Error verifying AI Overview element: {e}")
+                    logger.warning("⚠️ Error verifying AI Overview element: %s", e)
                     result['has_ai_overview'] = False
             else:
-                print(f"  ❌ No AI Overview detected for '{search_term}'")
+                logger.info("❌ No AI Overview detected for '%s'", search_term)
             
+            result['timings'] = timer.finish()
             return result
             
         except Exception as e:
-            print(f"❌ Error searching '{search_term}': {str(e)}")
+            logger.error("❌ Error searching '%s': %s", search_term, e)
             return {
                 'search_term': search_term,
                 'has_ai_overview': False,
                 'selector_used': None,
                 'timestamp': datetime.now().isoformat(),
                 'screenshot_path': None,
-                'error': str(e)
+                'error': str(e),
+                'timings': timer.finish()
             }
         finally:
             page.close()
@@ -616,30 +651,42 @@ class GoogleAIOverviewScraper:
         print("🚀 Starting Google AI Overview Analysis for CRA...")
         
         # Read search terms from CSV
-        search_terms = []
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader, None)  # Skip header if present
-                search_terms = [row[0].strip() for row in reader if row]
+            term_groups = read_term_groups(self.csv_file)
         except Exception as e:
             print(f"❌ Error reading CSV file: {e}")
             return
         
-        print(f"📊 Found {len(search_terms)} search terms to analyze")
+        # Duplicates and case/whitespace variants are searched once and fanned out afterwards
+        search_terms = [group.search_term for group in term_groups]
+        print(f"📊 Found {describe(term_groups)} to analyze")
+        
+        search_terms = self.result_cache.serve(search_terms, self.results)
+        if search_terms:
+            self.fetch_terms(search_terms)
         
-        with sync_playwright() as playwright:
+        # Save results, one per original CSV row
+        self.results = fan_out(self.results, term_groups)
+        self.save_results()
+        self.print_summary()
+
+    def fetch_terms(self, search_terms):
+        """Search and screenshot the terms the cache could not serve"""
+        with self.term_log, sync_playwright() as playwright:
             # Get initial proxy
             proxy = self.get_next_proxy() if self.proxies else None
             browser, context = self.setup_browser_context(playwright, proxy)
+            self.resource_monitor.start()
             
             try:
                 for i, term in enumerate(search_terms, 1):
                     print(f"\n🔍 Processing {i}/{len(search_terms)}: '{term}'")
                     
+                    self.term_log.begin(term)
                     try:
                         result = self.search_and_screenshot(term, browser, context)
                         self.results.append(result)
+                        self.result_cache.store(result)
                     except Exception as e:
                         print(f"❌ Error during search: {e}")
                         # If proxy error, try rotating to next proxy
@@ -653,6 +700,7 @@ class GoogleAIOverviewScraper:
                             try:
                                 result = self.search_and_screenshot(term, browser, context)
                                 self.results.append(result)
+                                self.result_cache.store(result)
                             except Exception as retry_e:
                                 print(f"❌ Retry failed: {retry_e}")
                                 # Add failed result
@@ -674,6 +722,8 @@ class GoogleAIOverviewScraper:
                                 'screenshot_path': None,
                                 'error': str(e)
                             })
+                    self.term_log.end(failed=bool(self.results[-1].get('error')))
+                    self.phase_stats.add(self.results[-1].get('timings'))
                     
                     # Random delay between searches (important!)
                     if i < len(search_terms):
@@ -681,9 +731,12 @@ class GoogleAIOverviewScraper:
                         print(f"⏳ Waiting {delay:.1f} seconds before next search...")
                         time.sleep(delay)
                         
-                        # Rotate proxy and refresh context periodically
-                        rotation_interval = 10 if self.proxies else 20
-                        if i % rotation_interval == 0:
+                        # Refresh the context when the browser outgrows the memory ceiling, rotate proxies every 10 terms
+                        over_ceiling = self.resource_monitor.over_ceiling()
+                        if over_ceiling or (self.proxies and i % 10 == 0):
+                            if over_ceiling:
+                                print(f"🧹 Memory ceiling reached: {self.resource_monitor.describe_last()}")
+                                self.resource_monitor.recycled()
                             print("🔄 Refreshing browser context...")
                             if self.proxies:
                                 print("🔄 Rotating to next proxy...")
@@ -697,10 +750,7 @@ class GoogleAIOverviewScraper:
             finally:
                 context.close()
                 browser.close()
-        
-        # Save results
-        self.save_results()
-        self.print_summary()
+                self.resource_monitor.stop()
 
     def save_results(self):
         """Save results to JSON and CSV files"""
@@ -741,6 +791,13 @@ class GoogleAIOverviewScraper:
         print(f"Percentage with AI Overview: {(ai_overview_count/total_terms)*100:.1f}%")
         print(f"Screenshots captured: {ai_overview_count}")
         print(f"Screenshots saved in: {self.output_dir}")
+        if self.result_cache.cache:
+            print(self.result_cache.summary())
+        if self.phase_stats.attempts:
+            print(f"\nPhase timings over {self.phase_stats.attempts} search attempts:")
+            for line in self.phase_stats.summary_lines():
+                print(f"  {line}")
+        self.resource_monitor.print_summary()
 
 
 if __name__ == "__main__":
@@ -782,7 +839,8 @@ if __name__ == "__main__":
         csv_file=CSV_FILE,
         output_dir=OUTPUT_DIR,
         delay_range=DELAY_RANGE,
-        proxies=PROXIES
+        proxies=PROXIES,
+        cache_path="response_cache.sqlite"
     )
     
     scraper.run_analysis()
\ No newline at end of file
@@ -6,13 +6,50 @@ import json
 import urllib.parse
 import math
 import hashlib
+import logging
 import os
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from playwright.sync_api import sync_playwright
 from pathlib import Path
+from overview_fingerprint import normalize_overview_text, text_fingerprint
+from cookie_store import CookieStore
+from serp_archive import SerpArchive
+from response_cache import ScraperCache
+from term_ingest import describe, fan_out, read_term_groups
+from recrawl_scheduler import RunDeadline, describe_plan, plan_recrawl
+from work_queue import default_worker_id
+from phase_timer import PhaseStats, PhaseTimer
+from metrics_server import MetricsServer, ScraperMetrics
+from trace_sampler import TraceSampler
+from term_log import TermLog
+from page_state import PageClassifier
+
+# Per-term output, routed through TermLog: INFO+ to the console off-thread, DEBUG only kept for failed terms
+logger = logging.getLogger(__name__)
+
+# Block signals checked by check_for_captcha_or_blocks, all in one page.evaluate
+BLOCK_CLASSIFIER = PageClassifier(
+    text_patterns=['unusual traffic', 'automated queries'],
+    url_patterns=['sorry/index', 'sorry.google.com'],
+    captcha_selectors=[
+        'form[action*="sorry"]',
+        '#captcha-form',
+        'input[name="captcha"]',
+        '.g-recaptcha',
+        '[src*="recaptcha"]'
+    ],
+)
 
 class GoogleAIOverviewScraper:
-    def __init__(self, csv_file, output_dir="screenshots", delay_range=(10, 20), proxies=None):
+    # Cache key parts: results from different scrapers or locales never mix
+    CACHE_ENGINE = 'playwright_international'
+    CACHE_LOCALE = {'gl': 'ca', 'hl': 'en-CA'}
+
+    def __init__(self, csv_file, output_dir="screenshots", delay_range=(10, 20), proxies=None, cookie_flush_every=5,
+                 archive_dir=None, archive_mode='serp', cache_path=None, cache_ttl=6 * 3600, recrawl_budget=None,
+                 work_queue=None, lease_seconds=900, metrics_port=None, trace_dir=None, trace_sample_rate=0.02,
+                 trace_max_mb=500, debug_log=None):
         self.csv_file = csv_file
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
@@ -26,6 +63,43 @@ class GoogleAIOverviewScraper:
         self.cookies_dir = Path("cookies")
         self.cookies_dir.mkdir(exist_ok=True)
         
+        # Cookies are cached per proxy identity on context close and flushed every N terms and at the end of the run
+        self.cookie_store = CookieStore(
+            self.cookies_dir / "cookie_store.json",
+            flush_every=cookie_flush_every,
+            legacy_dir=self.cookies_dir
+        )
+        
+        # Optional raw page archive: 'serp' keeps the whole page, 'overview' only the AI Overview subtree
+        self.archive = SerpArchive(archive_dir) if archive_dir else None
+        self.archive_mode = archive_mode
+        
+        # Optional TTL cache: reruns inside the TTL are served without a browser
+        self.result_cache = ScraperCache(cache_path, self.CACHE_ENGINE, self.CACHE_LOCALE, ttl=cache_ttl)
+        
+        # Incremental re-crawl: None runs every term, otherwise e.g. {'max_terms': 200, 'max_minutes': 240}
+        self.recrawl_budget = recrawl_budget
+        self.recrawl_deadline = None  # the plan only estimates max_minutes; this stops the run when it is spent
+        self.budget_deferred = 0
+        
+        # Optional shared WorkQueue: several workers (processes or machines) split the run by leasing terms
+        self.work_queue = work_queue
+        self.lease_seconds = lease_seconds
+        self.worker_id = default_worker_id()
+        
+        # Per-phase timings of every search attempt, summarised in print_summary
+        self.phase_stats = PhaseStats()
+        
+        # Optional live metrics: Prometheus text format on http://127.0.0.1:<metrics_port>/metrics during run_analysis
+        self.metrics_port = metrics_port
+        self.metrics = ScraperMetrics(self.CACHE_ENGINE) if metrics_port is not None else None
+        
+        # Optional Playwright tracing: failed, slower-than-p99 and sampled terms keep a trace, the rest are dropped
+        self.trace_sampler = TraceSampler(trace_dir, trace_sample_rate, trace_max_mb * 2**20) if trace_dir else None
+        
+        # Per-term output goes to the console off-thread; debug_log adds a JSON-lines file with failed terms' detail
+        self.term_log = TermLog(logger, log_file=debug_log)
+        
         if self.proxies:
             print(f"Proxy configuration loaded: {len(self.proxies)} proxies available")
             print("Will force Canadian search results regardless of proxy location")
@@ -90,13 +164,11 @@ class GoogleAIOverviewScraper:
     def load_proxy_cookies(self, context, proxy_hash):
         """Load cookies for this specific proxy identity"""
         try:
-            cookie_file = self.cookies_dir / f"{proxy_hash}.json"
-            if cookie_file.exists():
-                with open(cookie_file, "r") as f:
-                    cookies = json.load(f)
-                    context.add_cookies(cookies)
-                    print(f"  Loaded {len(cookies)} cookies for proxy {proxy_hash[:8]}...")
-                    return True
+            cookies = self.cookie_store.get(proxy_hash)
+            if cookies:
+                context.add_cookies(cookies)
+                print(f"  Loaded {len(cookies)} cookies for proxy {proxy_hash[:8]}...")
+                return True
             else:
                 print(f"  No existing cookies for proxy {proxy_hash[:8]}...")
                 return False
@@ -105,16 +177,31 @@ class GoogleAIOverviewScraper:
             return False
 
     def save_proxy_cookies(self, context, proxy_hash):
-        """Save cookies for this specific proxy identity"""
+        """Snapshot cookies for this specific proxy identity into the in-memory store"""
         try:
-            cookies = context.cookies()
-            cookie_file = self.cookies_dir / f"{proxy_hash}.json"
-            with open(cookie_file, "w") as f:
-                json.dump(cookies, f)
-            print(f"  Saved {len(cookies)} cookies for proxy {proxy_hash[:8]}...")
+            cookies = self.cookie_store.capture(context, proxy_hash)
+            print(f"  Cached {len(cookies)} cookies for proxy {proxy_hash[:8]}...")
         except Exception as e:
             print(f"  Error saving cookies for proxy {proxy_hash[:8]}...: {e}")
 
+    def flush_cookies(self):
+        """Write cached cookies to the cookie store on disk"""
+        try:
+            flushed = self.cookie_store.flush()
+            if flushed:
+                print(f"  Flushed cookies for {flushed} proxy identities")
+        except Exception as e:
+            print(f"  Error flushing cookie store: {e}")
+
+    def close_browser_context(self, browser, context, proxy_hash=None):
+        """Cache this identity's cookies, then close the context and browser (disk flushes are batched)"""
+        if proxy_hash:
+            self.save_proxy_cookies(context, proxy_hash)
+        if self.trace_sampler:
+            self.trace_sampler.detach(context)
+        context.close()
+        browser.close()
+
     def setup_browser_context(self, playwright, proxy=None):
         """Setup browser with Canadian localization and randomized fingerprints"""
         user_agent = random.choice(self.user_agents)
@@ -214,6 +301,12 @@ class GoogleAIOverviewScraper:
         context.set_default_navigation_timeout(45000)
         context.set_default_timeout(45000)
         
+        if self.metrics:
+            self.metrics.browser_launched()
+            self.metrics.track_transfer(context)
+        if self.trace_sampler:
+            self.trace_sampler.attach(context)
+        
         # Load existing cookies for this proxy identity
         self.load_proxy_cookies(context, proxy_hash)
         
@@ -754,9 +847,11 @@ class GoogleAIOverviewScraper:
             print(f"  Alt-tab simulation failed: {e}")
 
     def save_session_cookies(self, context, proxy_hash=None):
-        """Save cookies for session persistence - now uses proxy-specific storage"""
+        """Save cookies for session persistence - flushed to disk every N terms across all identities"""
         if proxy_hash:
-            self.save_proxy_cookies(context, proxy_hash)
+            if self.cookie_store.term_completed():
+                self.save_proxy_cookies(context, proxy_hash)
+                self.flush_cookies()
         else:
             # Fallback to old method if no proxy hash provided
             try:
@@ -767,57 +862,43 @@ class GoogleAIOverviewScraper:
                 pass
 
     def check_for_captcha_or_blocks(self, page):
-        """Check if Google is showing CAPTCHA or blocking page"""
+        """Check if Google is showing CAPTCHA or blocking page (one round trip to the browser)"""
+        # Priority check: sorry/index URL (most reliable indicator). page.url is known locally, so this
+        # still works while the redirect to the sorry page is tearing down the execution context
+        if BLOCK_CLASSIFIER.url.best_match(page.url):
+            logger.warning("🚨 SORRY PAGE DETECTED: %s", page.url)
+            logger.info("🔄 Will restart with new proxy and retry same search term")
+            return 'sorry_page'
+        
         try:
-            current_url = page.url
-            
-            # Priority check: sorry/index URL (most reliable indicator)
-            if current_url.startswith('https://www.google.com/sorry/index'):
-                print(f"  🚨 SORRY PAGE URL DETECTED: {current_url}")
-                print("  🔄 Will restart with new proxy and retry same search term")
-                return 'sorry_page'
-            
-            # Secondary checks for other sorry URLs
-            if 'sorry/index' in current_url or 'sorry.google.com' in current_url:
-                print(f"  🚨 SORRY PAGE DETECTED: {current_url}")
-                print("  🔄 Will restart with new proxy and retry same search term")
-                return 'sorry_page'
-            
-            # Check for CAPTCHA elements
-            captcha_selectors = [
-                'form[action*="sorry"]',
-                '#captcha-form',
-                'input[name="captcha"]',
-                '.g-recaptcha',
-                '[src*="recaptcha"]'
-            ]
-            
-            for selector in captcha_selectors:
-                if page.query_selector(selector):
-                    print("  🚨 CAPTCHA FORM DETECTED - Will restart with new proxy")
-                    return 'captcha'
-            
-            # Check for unusual traffic messages
-            try:
-                page_content = page.content().lower()
-                if 'unusual traffic' in page_content or 'automated queries' in page_content:
-                    print("  🚨 UNUSUAL TRAFFIC MESSAGE DETECTED - Will restart with new proxy")
-                    return 'unusual_traffic'
-            except:
-                pass
-                
-            return None
-            
+            state = BLOCK_CLASSIFIER.probe_playwright(page)
         except Exception as e:
-            print(f"  DEBUG: Error checking for blocks: {e}")
+            logger.debug("Error checking for blocks: %s", e)
             return None
+        
+        if state.url_match:
+            logger.warning("🚨 SORRY PAGE DETECTED: %s", state.url)
+            logger.info("🔄 Will restart with new proxy and retry same search term")
+            return 'sorry_page'
+        
+        if state.captcha:
+            logger.warning("🚨 CAPTCHA FORM DETECTED - Will restart with new proxy")
+            return 'captcha'
+        
+        if state.text_match:
+            logger.warning("🚨 UNUSUAL TRAFFIC MESSAGE DETECTED - Will restart with new proxy")
+            return 'unusual_traffic'
+        
+        return None
     
     def handle_captcha_restart(self, browser, context, playwright):
         """Handle CAPTCHA detection by restarting with new proxy"""
         try:
             print("  🔄 CAPTCHA/BLOCK DETECTED - Restarting session...")
             
-            # Close current browser session
+            # Close current browser session (blocked cookies are not worth keeping)
+            if self.trace_sampler:
+                self.trace_sampler.detach(context)
             context.close()
             browser.close()
             print("  ✅ Closed blocked session")
@@ -843,15 +924,15 @@ class GoogleAIOverviewScraper:
 
     def detect_ai_overview(self, page):
         """Detect AI Overview with smart DOM waiting"""
-        print("  Checking for AI Overview...")
+        logger.debug("Checking for AI Overview...")
         
         # Smart wait for Google search results to load
         try:
             # Wait for search results container - more reliable than static timeout
             page.wait_for_selector("div.g, #search, #rso", timeout=30000)
-            print("  Search results loaded successfully")
+            logger.debug("Search results loaded successfully")
         except:
-            print("  WARNING: Search results took longer than expected to load")
+            logger.warning("WARNING: Search results took longer than expected to load")
         
         # Check for blocks/CAPTCHA after page loads
         block_type = self.check_for_captcha_or_blocks(page)
@@ -883,12 +964,12 @@ class GoogleAIOverviewScraper:
                     if element and element.is_visible():
                         text = element.inner_text()
                         if text and "AI Overview" in text:
-                            print(f"  SUCCESS: Found AI Overview")
+                            logger.info("SUCCESS: Found AI Overview")
                             return True, selector, element
             except:
                 continue
         
-        print(f"  FAILED: No AI Overview found")
+        logger.info("FAILED: No AI Overview found")
         return False, None, None
 
     def extract_ai_overview_content(self, page):
@@ -911,14 +992,20 @@ class GoogleAIOverviewScraper:
                 document.querySelector('mark.QVRyCf')?.textContent
             ''')
             
-            return {
+            ai_content = {
                 'text_segments': text_segments,
                 'highlighted_info': highlighted_info,
                 'full_text': ' '.join(text_segments) if text_segments else None
             }
             
+            # Fingerprint of the normalized text so runs can be diffed cheaply
+            normalized_text = normalize_overview_text(ai_content)
+            ai_content['fingerprint'] = text_fingerprint(normalized_text) if normalized_text else None
+            
+            return ai_content
+            
         except Exception as e:
-            print(f"  WARNING: Error extracting AI Overview content: {e}")
+            logger.warning("WARNING: Error extracting AI Overview content: %s", e)
             return None
 
     def click_show_more_ai_overview(self, page):
@@ -934,13 +1021,13 @@ class GoogleAIOverviewScraper:
             'div.in7vHe',                            # Inner container
         ]
         
-        print(f"  DEBUG: Looking for 'Show more' button...")
+        logger.debug("Looking for 'Show more' button")
         
         for i, selector in enumerate(show_more_selectors):
             try:
-                print(f"  DEBUG: Trying selector {i+1}: {selector}")
+                logger.debug("Trying selector %d: %s", i + 1, selector)
                 elements = page.query_selector_all(selector)
-                print(f"  DEBUG: Found {len(elements)} elements with this selector")
+                logger.debug("Found %d elements with this selector", len(elements))
                 
                 for j, element in enumerate(elements):
                     if element and element.is_visible():
@@ -948,7 +1035,7 @@ class GoogleAIOverviewScraper:
                         try:
                             text = element.inner_text().lower()
                             aria_label = element.get_attribute('aria-label') or ""
-                            print(f"  DEBUG: Element {j+1} text: '{text}', aria-label: '{aria_label}'")
+                            logger.debug("Element %d text: %r, aria-label: %r", j + 1, text, aria_label)
                         except:
                             text = ""
                             aria_label = ""
@@ -962,13 +1049,13 @@ class GoogleAIOverviewScraper:
                         )
                         
                         if is_show_more:
-                            print(f"  Found 'Show more' button with selector: {selector}")
+                            logger.debug("Found 'Show more' button with selector: %s", selector)
                             
                             # Check if element is actually clickable
                             try:
                                 box = element.bounding_box()
                                 if box:
-                                    print(f"  DEBUG: Button position: x={box['x']}, y={box['y']}, width={box['width']}, height={box['height']}")
+                                    logger.debug("Button position: %s", box)
                                     
                                     # Scroll element into view first
                                     element.scroll_into_view_if_needed()
@@ -978,64 +1065,82 @@ class GoogleAIOverviewScraper:
                                     try:
                                         # Method 1: Direct element click
                                         element.click()
-                                        print(f"  SUCCESS: Clicked 'Show more' using element.click()")
+                                        logger.info("SUCCESS: Clicked 'Show more' using element.click()")
                                     except:
                                         # Method 2: Force click
                                         element.click(force=True)
-                                        print(f"  SUCCESS: Clicked 'Show more' using force click")
+                                        logger.info("SUCCESS: Clicked 'Show more' using force click")
                                     
                                     # Wait for content to expand and verify
                                     time.sleep(random.uniform(2, 4))
                                     
-                                    # Check if aria-expanded changed
-                                    new_aria_expanded = element.get_attribute('aria-expanded')
-                                    print(f"  DEBUG: aria-expanded after click: {new_aria_expanded}")
+                                    # Check if aria-expanded changed (a browser round trip, so only when it gets logged)
+                                    if logger.isEnabledFor(logging.DEBUG):
+                                        logger.debug("aria-expanded after click: %s", element.get_attribute('aria-expanded'))
                                     
                                     return True
                                 else:
-                                    print(f"  DEBUG: No bounding box for element")
+                                    logger.debug("No bounding box for element")
                             except Exception as click_error:
-                                print(f"  DEBUG: Click error: {click_error}")
+                                logger.debug("Click error: %s", click_error)
                                 continue
                 
             except Exception as e:
-                print(f"  DEBUG: Error with selector {selector}: {e}")
+                logger.debug("Error with selector %s: %s", selector, e)
                 continue
         
         # Try a more general approach - look for any clickable element with "Show more" text
         try:
-            print(f"  DEBUG: Trying general approach...")
+            logger.debug("Trying general approach")
             all_clickables = page.query_selector_all('[role="button"], button, a, div[onclick], span[onclick]')
-            print(f"  DEBUG: Found {len(all_clickables)} clickable elements")
+            logger.debug("Found %d clickable elements", len(all_clickables))
             
             for element in all_clickables:
                 if element and element.is_visible():
                     text = element.inner_text().lower()
                     if 'show more' in text:
-                        print(f"  Found 'Show more' via general search: '{text}'")
+                        logger.debug("Found 'Show more' via general search: '%s'", text)
                         element.click()
                         time.sleep(random.uniform(2, 4))
-                        print(f"  SUCCESS: Clicked 'Show more' via general search")
+                        logger.info("SUCCESS: Clicked 'Show more' via general search")
                         return True
         except Exception as e:
-            print(f"  DEBUG: Error in general approach: {e}")
+            logger.debug("Error in general approach: %s", e)
         
-        print(f"  INFO: No 'Show more' button found - AI Overview may already be fully expanded")
+        logger.info("INFO: No 'Show more' button found - AI Overview may already be fully expanded")
         return False
 
+    def archive_page(self, page, search_term, ai_overview_element=None):
+        """Append the current page (or its AI Overview subtree) to the run archive"""
+        if not self.archive:
+            return None
+        try:
+            if self.archive_mode == 'overview':
+                if not ai_overview_element:
+                    return None
+                html = ai_overview_element.evaluate("el => el.outerHTML")
+            else:
+                html = page.content()
+            return self.archive.append(search_term, html, url=page.url, kind=self.archive_mode)
+        except Exception as e:
+            logger.warning("WARNING: Failed to archive page: %s", e)
+            return None
+
     def search_and_screenshot(self, search_term, browser, context, proxy_hash=None):
-        """Perform search with human-like behavior"""
+        """Perform search with human-like behavior; per-phase timings go into result['timings']"""
+        timer = PhaseTimer()
+        timer.enter('warmup')
         page = context.new_page()
         
         try:
-            print(f"  Searching: {search_term}")
-            print(f"  Forcing Canadian results with parameters")
+            logger.info("Searching: %s", search_term)
+            logger.debug("Forcing Canadian results with parameters")
             
             # Sometimes browse other pages first to appear natural
             self.browse_other_pages(page)
             
             # Start with a more realistic browsing session
-            print("  Starting realistic browsing session")
+            logger.debug("Starting realistic browsing session")
             
             # First visit a non-Google site to establish normal browsing
             normal_sites = [
@@ -1048,7 +1153,7 @@ class GoogleAIOverviewScraper:
             if random.random() < 0.7:  # 70% chance to visit normal site first
                 normal_site = random.choice(normal_sites)
                 try:
-                    print(f"  Visiting {normal_site} first to establish normal browsing")
+                    logger.debug("Visiting %s first to establish normal browsing", normal_site)
                     page.goto(normal_site, timeout=30000)
                     time.sleep(random.uniform(5, 12))
                     
@@ -1064,16 +1169,17 @@ class GoogleAIOverviewScraper:
                     pass
             
             # Now go to Google homepage
-            print("  Loading Google homepage")
+            timer.enter('navigation')
+            logger.debug("Loading Google homepage")
             page.goto('https://www.google.com', timeout=30000)
             time.sleep(random.uniform(3, 8))  # Longer pause to read/think
             
             # Simulate human typing in search box
-            print("  Typing search query with human behavior")
+            logger.debug("Typing search query with human behavior")
             typing_success = self.simulate_typing_behavior(page, search_term)
             
             if not typing_success:
-                print("  Typing failed - using direct URL approach")
+                logger.warning("Typing failed - using direct URL approach")
                 # Fallback to direct URL if typing fails
                 search_url = self.build_canadian_search_url(search_term)
                 response = page.goto(search_url, wait_until='domcontentloaded', timeout=45000)
@@ -1093,29 +1199,32 @@ class GoogleAIOverviewScraper:
                 page.keyboard.press('Enter')
                 
                 # Smart wait for search results instead of static timeout
+                timer.enter('results_wait')
                 try:
                     page.wait_for_selector("div.g, #search, #rso", timeout=45000)
-                    print("  Search completed successfully")
+                    logger.debug("Search completed successfully")
                 except:
-                    print("  WARNING: Search results slow to load")
+                    logger.warning("WARNING: Search results slow to load")
                 
                 response = None  # No response object when using keyboard search
             
             if response and response.status == 429:
-                print(f"  WARNING: Rate limited (429)")
+                logger.warning("WARNING: Rate limited (429)")
                 return {
                     'search_term': search_term,
                     'has_ai_overview': False,
                     'timestamp': datetime.now().isoformat(),
-                    'error': 'Rate limited'
+                    'error': 'Rate limited',
+                    'timings': timer.finish()
                 }
             
             # Verify we're getting Canadian results (optional)
+            timer.enter('browsing')
             try:
                 # Check if page mentions Canada or Canadian sites
                 page_text = page.content()
                 if any(indicator in page_text for indicator in ['.gc.ca', 'Canada.ca', 'Government of Canada']):
-                    print(f"  SUCCESS: Confirmed Canadian results")
+                    logger.debug("SUCCESS: Confirmed Canadian results")
             except:
                 pass
             
@@ -1123,7 +1232,7 @@ class GoogleAIOverviewScraper:
             time.sleep(random.uniform(2, 4))
             
             # Simulate natural scrolling and interactions
-            print("  Simulating human browsing behavior")
+            logger.debug("Simulating human browsing behavior")
             self.random_scroll(page)
             time.sleep(random.uniform(1, 2))
             
@@ -1136,12 +1245,16 @@ class GoogleAIOverviewScraper:
             time.sleep(random.uniform(1, 3))
             
             # Check for AI Overview (this also checks for CAPTCHA/blocks)
+            timer.enter('detection')
             has_ai_overview, selector_used, ai_overview_element = self.detect_ai_overview(page)
             
+            timer.enter('archive')
+            archive_ref = self.archive_page(page, search_term, ai_overview_element)
+            
             # Handle detection of blocks/CAPTCHA - return special code to trigger restart
             if selector_used and selector_used.startswith('blocked_'):
                 block_type = selector_used.replace('blocked_', '')
-                print(f"  BLOCKED: Google detected automation ({block_type})")
+                logger.warning("BLOCKED: Google detected automation (%s)", block_type)
                 return {
                     'search_term': search_term,
                     'has_ai_overview': False,
@@ -1150,13 +1263,16 @@ class GoogleAIOverviewScraper:
                     'ai_content': None,
                     'timestamp': datetime.now().isoformat(),
                     'screenshot_path': None,
+                    'archive_ref': archive_ref,
                     'error': f'Blocked by Google: {block_type}',
-                    'restart_needed': True  # Signal for restart
+                    'restart_needed': True,  # Signal for restart
+                    'timings': timer.finish()
                 }
             
             # If AI Overview found, try to expand it by clicking "Show more"
             expanded_content = False
             if has_ai_overview:
+                timer.enter('expansion')
                 expanded_content = self.click_show_more_ai_overview(page)
                 # Additional scroll after expansion to make sure everything is visible
                 if expanded_content:
@@ -1166,11 +1282,12 @@ class GoogleAIOverviewScraper:
             # Extract detailed AI Overview content if found
             ai_content = None
             if has_ai_overview:
+                timer.enter('extraction')
                 ai_content = self.extract_ai_overview_content(page)
                 if ai_content:
-                    print(f"  Extracted AI content: {len(ai_content.get('text_segments', []))} segments")
+                    logger.info("Extracted AI content: %s segments", len(ai_content.get('text_segments', [])))
                     if expanded_content:
-                        print(f"  Content was expanded using 'Show more' button")
+                        logger.info("Content was expanded using 'Show more' button")
             
             result = {
                 'search_term': search_term,
@@ -1180,28 +1297,33 @@ class GoogleAIOverviewScraper:
                 'ai_content': ai_content,
                 'timestamp': datetime.now().isoformat(),
                 'screenshot_path': None,
+                'archive_ref': archive_ref,
             }
             
             if has_ai_overview and ai_overview_element:
+                timer.enter('screenshot')
                 screenshot_path = self.output_dir / f"{search_term.replace(' ', '_').replace('/', '_')}_ai_overview.png"
                 page.route("**/*", lambda route: route.continue_())
                 time.sleep(2)
                 page.screenshot(path=str(screenshot_path), full_page=True)
                 result['screenshot_path'] = str(screenshot_path)
-                print(f"  📸 Screenshot saved")
+                logger.info("📸 Screenshot saved")
             
             # Save session state with proxy-specific cookies
+            timer.enter('saving')
             self.save_session_cookies(context, proxy_hash)
             
+            result['timings'] = timer.finish()
             return result
             
         except Exception as e:
-            print(f"  FAILED: Error: {str(e)}")
+            logger.error("FAILED: Error: %s", e)
             return {
                 'search_term': search_term,
                 'has_ai_overview': False,
                 'timestamp': datetime.now().isoformat(),
-                'error': str(e)
+                'error': str(e),
+                'timings': timer.finish()
             }
         finally:
             page.close()
@@ -1211,36 +1333,89 @@ class GoogleAIOverviewScraper:
         print("Starting Google AI Overview Analysis")
         print("Using international proxies with Canadian localization")
         
-        search_terms = []
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader, None)
-                search_terms = [row[0].strip() for row in reader if row]
+            term_groups = read_term_groups(self.csv_file)
         except Exception as e:
             print(f"FAILED: Error reading CSV: {e}")
             return
         
-        print(f"Found {len(search_terms)} search terms")
+        # Duplicates and case/whitespace variants are searched once and fanned out afterwards
+        print(f"Found {describe(term_groups)}")
+        
+        if self.recrawl_budget is not None:
+            self.recrawl_deadline = RunDeadline(self.recrawl_budget.get('max_minutes'))
+            term_groups, plan = plan_recrawl(term_groups, **self.recrawl_budget)
+            print(f"Re-crawl plan: {describe_plan(plan)}")
+            if not term_groups:
+                print("Nothing is due for a re-check")
+                return
+        
+        search_terms = [group.search_term for group in term_groups]
+        
+        search_terms = self.result_cache.serve(search_terms, self.results)
+        if search_terms:
+            if self.work_queue:
+                queued = set(search_terms)
+                added = self.work_queue.enqueue((group.term_id, group.search_term)
+                                                for group in term_groups if group.search_term in queued)
+                print(f"Work queue run {self.work_queue.run_id}: {added} terms added ({self.work_queue.describe()})")
+            self.fetch_terms(search_terms)
         
+        self.results = fan_out(self.results, term_groups)
+        self.save_results()
+        self.print_summary()
+
+    def fetch_terms(self, search_terms):
+        """Search and screenshot the terms the cache could not serve"""
         # Random initial delay to avoid patterns
         initial_delay = random.uniform(15, 45)  # 15-45 seconds initial delay
         print(f"Initial delay: {initial_delay:.1f} seconds to avoid detection...")
         time.sleep(initial_delay)
         
-        with sync_playwright() as playwright:
+        with self.run_services(), sync_playwright() as playwright:
             proxy = self.get_next_proxy()
             browser, context, proxy_hash = self.setup_browser_context(playwright, proxy)
             
+            claim = None
             try:
                 i = 0
-                while i < len(search_terms):
-                    term = search_terms[i]
+                while True:
+                    if claim is None and self.recrawl_deadline and self.recrawl_deadline.expired():
+                        # Unchecked terms stay due, so the next run picks them up first
+                        if self.work_queue:
+                            print(f"Re-crawl budget of {self.recrawl_deadline.max_minutes} min spent, "
+                                  f"leaving the queue as is ({self.work_queue.describe()})")
+                        else:
+                            self.budget_deferred = len(search_terms) - i
+                            print(f"Re-crawl budget of {self.recrawl_deadline.max_minutes} min spent, "
+                                  f"deferring {self.budget_deferred} terms to the next run")
+                        break
+                    if self.work_queue:
+                        # Keep the claim across CAPTCHA restarts, otherwise lease the next term (waiting
+                        # out other workers' leases); None only once the whole run is finished
+                        claim = claim or self.work_queue.claim_next(self.worker_id, self.lease_seconds)
+                        if claim is None:
+                            break
+                        term = claim.search_term
+                    elif i < len(search_terms):
+                        term = search_terms[i]
+                    else:
+                        break
                     search_number = i + 1
                     print(f"\n{'='*50}")
                     print(f"Search {search_number}/{len(search_terms)}: '{term}'")
                     
-                    result = self.search_and_screenshot(term, browser, context, proxy_hash)
+                    lease = self.work_queue.keep_alive(claim, self.lease_seconds) if claim else nullcontext()
+                    trace = self.trace_sampler.begin(context, term) if self.trace_sampler else None
+                    self.term_log.begin(term)
+                    with lease:
+                        result = self.search_and_screenshot(term, browser, context, proxy_hash)
+                    self.term_log.end(failed=bool(result.get('error')))
+                    if trace:
+                        result['trace_path'] = self.trace_sampler.end(trace, result)
+                    self.phase_stats.add(result.get('timings'))
+                    if self.metrics:
+                        self.metrics.record_attempt(result)
                     
                     # Check if we need to restart due to CAPTCHA/blocks
                     if result.get('restart_needed'):
@@ -1256,6 +1431,12 @@ class GoogleAIOverviewScraper:
                     
                     # Success - add result and move to next term
                     self.results.append(result)
+                    self.result_cache.store(result)
+                    if self.metrics:
+                        self.metrics.term_finished(result)
+                    if claim:
+                        self.work_queue.ack(claim, result)
+                        claim = None
                     i += 1  # Only increment when search succeeds or fails without CAPTCHA
                     
                     # Simulate alt-tabbing every few queries (realistic multitasking)
@@ -1272,8 +1453,7 @@ class GoogleAIOverviewScraper:
                     # Check if we need new proxy due to rate limit
                     if result.get('error') == 'Rate limited' and self.proxies:
                         print("Rotating proxy due to rate limit...")
-                        context.close()
-                        browser.close()
+                        self.close_browser_context(browser, context, proxy_hash)
                         
                         # Wait before using new proxy
                         wait_time = random.uniform(30, 60)
@@ -1284,7 +1464,8 @@ class GoogleAIOverviewScraper:
                         browser, context, proxy_hash = self.setup_browser_context(playwright, proxy)
                     
                     # Enhanced delay between searches with random activities
-                    if search_number < len(search_terms):
+                    more_terms = self.work_queue.has_pending() if self.work_queue else search_number < len(search_terms)
+                    if more_terms:
                         delay = random.uniform(self.delay_range[0], self.delay_range[1])
                         print(f"Waiting {delay:.1f} seconds...")
                         
@@ -1309,17 +1490,38 @@ class GoogleAIOverviewScraper:
                         # Rotate proxy more frequently for better diversity
                         if search_number % 1 == 0 and self.proxies:  # Rotate after EVERY search
                             print("Periodic proxy rotation...")
-                            context.close()
-                            browser.close()
+                            self.close_browser_context(browser, context, proxy_hash)
                             proxy = self.get_next_proxy()
                             browser, context, proxy_hash = self.setup_browser_context(playwright, proxy)
                 
             finally:
-                context.close()
-                browser.close()
-        
-        self.save_results()
-        self.print_summary()
+                if claim:
+                    # Hand an unfinished term straight back instead of waiting for the lease to expire
+                    self.work_queue.release(claim)
+                self.close_browser_context(browser, context, proxy_hash)
+                self.flush_cookies()
+                if self.archive:
+                    self.archive.close()
+                    print(f"Archived {self.archive.pages_written} pages to {self.archive.archive_path}")
+
+    @contextmanager
+    def run_services(self):
+        """Metrics endpoint and term log for the length of a run, stopped however the run ends"""
+        metrics_server = None
+        if self.metrics:
+            try:
+                metrics_server = MetricsServer(self.metrics, port=self.metrics_port).start()
+                print(f"Live metrics at {metrics_server.url}")
+            except OSError as e:
+                # Typically another worker already serving on this port
+                print(f"Metrics endpoint disabled, could not listen on port {self.metrics_port}: {e}")
+        self.term_log.start()
+        try:
+            yield
+        finally:
+            if metrics_server:
+                metrics_server.stop()
+            self.term_log.stop()
 
     def save_results(self):
         """Save results"""
@@ -1358,6 +1560,18 @@ class GoogleAIOverviewScraper:
         print(f"{'='*30}")
         print(f"Total: {total}")
         print(f"With AI Overview: {with_ai} ({(with_ai/total)*100:.1f}%)" if total > 0 else "N/A")
+        if self.result_cache.cache:
+            print(self.result_cache.summary())
+        if self.work_queue:
+            print(f"Work queue: {self.work_queue.describe()}")
+        if self.budget_deferred:
+            print(f"Re-crawl budget: {self.budget_deferred} terms deferred to the next run")
+        if self.trace_sampler:
+            print(self.trace_sampler.summary())
+        if self.phase_stats.attempts:
+            print(f"\nPhase timings over {self.phase_stats.attempts} search attempts:")
+            for line in self.phase_stats.summary_lines():
+                print(f"  {line}")
 
 
 if __name__ == "__main__":
@@ -1399,7 +1613,15 @@ if __name__ == "__main__":
         csv_file=CSV_FILE,
         output_dir=OUTPUT_DIR,
         delay_range=DELAY_RANGE,
-        proxies=PROXIES
+        proxies=PROXIES,
+        archive_dir="serp_archive",
+        cache_path="response_cache.sqlite",
+        recrawl_budget={'max_terms': 200, 'max_minutes': 240, 'seconds_per_term': 120},
+        # To split a run across processes, give every worker the same queue, e.g.
+        # work_queue=SQLiteWorkQueue("work_queue.sqlite")
+        metrics_port=None,  # e.g. 9464 for a Prometheus scrape target; one port per worker
+        trace_dir="traces",  # Playwright traces of failed, slow and 2% sampled terms
+        debug_log="scraper_debug.jsonl",  # Verbose detail of failed terms only
     )
     
     scraper.run_analysis()
\ No newline at end of file
@@ -7,13 +7,27 @@ import csv
 import time
 import random
 import json
+import logging
 import urllib.parse
 from datetime import datetime
 from playwright.sync_api import sync_playwright
 from pathlib import Path
+from phase_timer import PhaseStats, PhaseTimer
+from response_cache import ScraperCache
+from resource_monitor import ResourceMonitor
+from term_ingest import describe, fan_out, read_term_groups
+from term_log import TermLog
+
+# Per-term output, routed through TermLog: INFO+ to the console off-thread, DEBUG only kept for failed terms
+logger = logging.getLogger(__name__)
 
 class GoogleAIOverviewScraper:
-    def __init__(self, csv_file, output_dir="screenshots", delay_range=(3, 8), proxies=None):
+    # Cache key parts: results from different scrapers or locales never mix
+    CACHE_ENGINE = 'playwright_optimized'
+    CACHE_LOCALE = {'gl': 'ca', 'hl': 'en-CA'}
+
+    def __init__(self, csv_file, output_dir="screenshots", delay_range=(3, 8), proxies=None,
+                 cache_path=None, cache_ttl=6 * 3600, memory_ceiling_mb=1500, debug_log=None):
         self.csv_file = csv_file
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
@@ -22,6 +36,18 @@ class GoogleAIOverviewScraper:
         self.proxies = proxies or []
         self.current_proxy_index = 0
         
+        # Optional TTL cache: reruns inside the TTL are served without a browser
+        self.result_cache = ScraperCache(cache_path, self.CACHE_ENGINE, self.CACHE_LOCALE, ttl=cache_ttl)
+        
+        # The browser is recycled when its process tree outgrows this many MB (None: only on proxy rotation)
+        self.resource_monitor = ResourceMonitor(memory_ceiling_mb)
+        
+        # Per-phase timings of every search attempt, summarised in print_summary
+        self.phase_stats = PhaseStats()
+        
+        # Per-term output goes to the console off-thread; debug_log adds a JSON-lines file with failed terms' detail
+        self.term_log = TermLog(logger, log_file=debug_log)
+        
         if self.proxies:
             print(f"🔐 Proxy configuration loaded: {len(self.proxies)} proxies available")
         else:
@@ -114,7 +140,7 @@ class GoogleAIOverviewScraper:
 
     def detect_ai_overview(self, page):
         """Simplified AI Overview detection"""
-        print("  🔍 Checking for AI Overview...")
+        logger.debug("🔍 Checking for AI Overview...")
         
         # Wait for page to stabilize
         page.wait_for_load_state('networkidle', timeout=30000)
@@ -133,7 +159,7 @@ class GoogleAIOverviewScraper:
                     if element and element.is_visible():
                         text = element.inner_text()
                         if text and "AI Overview" in text:
-                            print(f"  ✅ Found AI Overview")
+                            logger.info("✅ Found AI Overview")
                             return True, selector, element
             except:
                 continue
@@ -142,34 +168,39 @@ class GoogleAIOverviewScraper:
         try:
             page_content = page.content()
             if "AI Overview" in page_content:
-                print(f"  ⚠️ Found AI Overview in content but no visible element")
+                logger.warning("⚠️ Found AI Overview in content but no visible element")
         except:
             pass
         
-        print(f"  ❌ No AI Overview found")
+        logger.info("❌ No AI Overview found")
         return False, None, None
 
     def search_and_screenshot(self, search_term, browser, context):
-        """Perform search with optimized loading"""
+        """Perform search with optimized loading; per-phase timings go into result['timings']"""
+        timer = PhaseTimer()
+        timer.enter('session')
         page = context.new_page()
         
         try:
             # Direct search URL
             search_url = f"https://www.google.ca/search?q={urllib.parse.quote_plus(search_term)}&hl=en-CA&gl=ca"
             
-            print(f"  🌐 Searching for: {search_term}")
+            logger.info("🌐 Searching for: %s", search_term)
             
             # Navigate with network idle wait
+            timer.enter('navigation')
             response = page.goto(search_url, wait_until='networkidle', timeout=45000)
             
             if not response or response.status >= 400:
-                print(f"  ❌ Failed to load page: Status {response.status if response else 'No response'}")
+                logger.warning("❌ Failed to load page: Status %s", response.status if response else 'No response')
                 raise Exception(f"Page load failed with status {response.status if response else 'No response'}")
             
             # Wait a bit for dynamic content
+            timer.enter('results_wait')
             time.sleep(3)
             
             # Check for AI Overview
+            timer.enter('detection')
             has_ai_overview, selector_used, ai_overview_element = self.detect_ai_overview(page)
             
             result = {
@@ -182,6 +213,7 @@ class GoogleAIOverviewScraper:
             
             # Take screenshot if AI overview found
             if has_ai_overview and ai_overview_element:
+                timer.enter('screenshot')
                 screenshot_path = self.output_dir / f"{search_term.replace(' ', '_').replace('/', '_')}_ai_overview.png"
                 
                 # Enable images temporarily for screenshot
@@ -190,19 +222,21 @@ class GoogleAIOverviewScraper:
                 
                 page.screenshot(path=str(screenshot_path), full_page=True)
                 result['screenshot_path'] = str(screenshot_path)
-                print(f"  📸 Screenshot saved")
+                logger.info("📸 Screenshot saved")
             
+            result['timings'] = timer.finish()
             return result
             
         except Exception as e:
-            print(f"  ❌ Error: {str(e)}")
+            logger.error("❌ Error: %s", e)
             return {
                 'search_term': search_term,
                 'has_ai_overview': False,
                 'selector_used': None,
                 'timestamp': datetime.now().isoformat(),
                 'screenshot_path': None,
-                'error': str(e)
+                'error': str(e),
+                'timings': timer.finish()
             }
         finally:
             page.close()
@@ -212,28 +246,41 @@ class GoogleAIOverviewScraper:
         print("🚀 Starting Google AI Overview Analysis...")
         
         # Read search terms
-        search_terms = []
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader, None)  # Skip header
-                search_terms = [row[0].strip() for row in reader if row]
+            term_groups = read_term_groups(self.csv_file)
         except Exception as e:
             print(f"❌ Error reading CSV: {e}")
             return
         
-        print(f"📊 Found {len(search_terms)} search terms")
+        # Duplicates and case/whitespace variants are searched once and fanned out afterwards
+        search_terms = [group.search_term for group in term_groups]
+        print(f"📊 Found {describe(term_groups)}")
+        
+        search_terms = self.result_cache.serve(search_terms, self.results)
+        if search_terms:
+            self.fetch_terms(search_terms)
         
-        with sync_playwright() as playwright:
+        self.results = fan_out(self.results, term_groups)
+        self.save_results()
+        self.print_summary()
+
+    def fetch_terms(self, search_terms):
+        """Search and screenshot the terms the cache could not serve"""
+        with self.term_log, sync_playwright() as playwright:
             proxy = self.get_next_proxy() if self.proxies else None
             browser, context = self.setup_browser_context(playwright, proxy)
+            self.resource_monitor.start()
             
             try:
                 for i, term in enumerate(search_terms, 1):
                     print(f"\n🔍 Processing {i}/{len(search_terms)}: '{term}'")
                     
+                    self.term_log.begin(term)
                     result = self.search_and_screenshot(term, browser, context)
+                    self.term_log.end(failed=bool(result.get('error')))
+                    self.phase_stats.add(result.get('timings'))
                     self.results.append(result)
+                    self.result_cache.store(result)
                     
                     # Delay between searches
                     if i < len(search_terms):
@@ -241,9 +288,13 @@ class GoogleAIOverviewScraper:
                         print(f"⏳ Waiting {delay:.1f} seconds...")
                         time.sleep(delay)
                         
-                        # Rotate proxy every 5 searches
-                        if i % 5 == 0 and self.proxies:
-                            print("🔄 Rotating proxy...")
+                        # Rotate proxy every 5 searches, recycle the browser when it outgrows the memory ceiling
+                        over_ceiling = self.resource_monitor.over_ceiling()
+                        if over_ceiling or (i % 5 == 0 and self.proxies):
+                            if over_ceiling:
+                                print(f"🧹 Memory ceiling reached: {self.resource_monitor.describe_last()}")
+                                self.resource_monitor.recycled()
+                            print("🔄 Rotating proxy..." if self.proxies else "🔄 Restarting browser...")
                             context.close()
                             browser.close()
                             proxy = self.get_next_proxy()
@@ -252,9 +303,7 @@ class GoogleAIOverviewScraper:
             finally:
                 context.close()
                 browser.close()
-        
-        self.save_results()
-        self.print_summary()
+                self.resource_monitor.stop()
 
     def save_results(self):
         """Save results to files"""
@@ -291,6 +340,13 @@ class GoogleAIOverviewScraper:
         print(f"Total searches: {total}")
         print(f"With AI Overview: {with_ai}")
         print(f"Percentage: {(with_ai/total)*100:.1f}%" if total > 0 else "N/A")
+        if self.result_cache.cache:
+            print(self.result_cache.summary())
+        if self.phase_stats.attempts:
+            print(f"\nPhase timings over {self.phase_stats.attempts} search attempts:")
+            for line in self.phase_stats.summary_lines():
+                print(f"  {line}")
+        self.resource_monitor.print_summary()
 
 
 if __name__ == "__main__":
@@ -316,7 +372,8 @@ if __name__ == "__main__":
         csv_file=CSV_FILE,
         output_dir=OUTPUT_DIR,
         delay_range=DELAY_RANGE,
-        proxies=PROXIES
+        proxies=PROXIES,
+        cache_path="response_cache.sqlite"
     )
     
     scraper.run_analysis()
\ No newline at end of file
@@ -7,13 +7,28 @@ import csv
 import time
 import random
 import json
+import logging
 import urllib.parse
 from datetime import datetime
 from playwright.sync_api import sync_playwright
 from pathlib import Path
+from phase_timer import PhaseStats, PhaseTimer
+from response_cache import ScraperCache
+from resource_monitor import ResourceMonitor
+from retry_queue import RetryQueue, retry_after_seconds
+from term_ingest import describe, fan_out, read_term_groups
+from term_log import TermLog
+
+# Per-term output, routed through TermLog: INFO+ to the console off-thread, DEBUG only kept for failed terms
+logger = logging.getLogger(__name__)
 
 class GoogleAIOverviewScraper:
-    def __init__(self, csv_file, output_dir="screenshots", delay_range=(10, 20), proxies=None):
+    # Cache key parts: results from different scrapers or locales never mix
+    CACHE_ENGINE = 'playwright_rate_limit'
+    CACHE_LOCALE = {'gl': 'ca', 'hl': 'en-CA'}
+
+    def __init__(self, csv_file, output_dir="screenshots", delay_range=(10, 20), proxies=None,
+                 cache_path=None, cache_ttl=6 * 3600, memory_ceiling_mb=1500, debug_log=None):
         self.csv_file = csv_file
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
@@ -23,6 +38,20 @@ class GoogleAIOverviewScraper:
         self.current_proxy_index = 0
         self.rate_limit_count = 0
         self.backoff_time = 30  # Initial backoff time in seconds
+        self.max_attempts = 4  # Per term, including the first try
+        self.retry_queue = None
+        
+        # Optional TTL cache: reruns inside the TTL are served without a browser
+        self.result_cache = ScraperCache(cache_path, self.CACHE_ENGINE, self.CACHE_LOCALE, ttl=cache_ttl)
+        
+        # The browser is recycled when its process tree outgrows this many MB (None: only on proxy rotation)
+        self.resource_monitor = ResourceMonitor(memory_ceiling_mb)
+        
+        # Per-phase timings of every search attempt, summarised in print_summary
+        self.phase_stats = PhaseStats()
+        
+        # Per-term output goes to the console off-thread; debug_log adds a JSON-lines file with failed terms' detail
+        self.term_log = TermLog(logger, log_file=debug_log)
         
         if self.proxies:
             print(f"🔐 Proxy configuration loaded: {len(self.proxies)} proxies available")
@@ -184,25 +213,26 @@ class GoogleAIOverviewScraper:
         
         return browser, context
 
-    def handle_rate_limit(self):
-        """Handle rate limiting with exponential backoff"""
+    def handle_rate_limit(self, retry_after=None):
+        """Register a rate limit and return the exponential backoff for the affected term
+        
+        Nothing sleeps here: the term is deferred in the retry queue and other terms go ahead on a
+        fresh proxy (without proxies the whole queue cools down for the same time). A Retry-After
+        header longer than the backoff wins.
+        """
         self.rate_limit_count += 1
         wait_time = min(self.backoff_time * (2 ** (self.rate_limit_count - 1)), 300)  # Max 5 minutes
+        if retry_after:
+            wait_time = max(wait_time, round(retry_after))
         
-        print(f"\n⚠️ Rate limit detected (429). Count: {self.rate_limit_count}")
-        print(f"⏳ Waiting {wait_time} seconds before retrying...")
-        
-        # Progress indicator
-        for i in range(int(wait_time)):
-            print(f"\r⏳ Waiting... {wait_time - i} seconds remaining", end='', flush=True)
-            time.sleep(1)
-        print()  # New line after countdown
+        logger.warning("⚠️ Rate limit detected (429). Count: %s", self.rate_limit_count)
+        logger.info("⏳ Term will be retried in %s seconds", wait_time)
         
         return wait_time
 
     def detect_ai_overview(self, page):
         """Detect AI Overview with improved selectors"""
-        print("  🔍 Checking for AI Overview...")
+        logger.debug("🔍 Checking for AI Overview...")
         
         # Wait for content to load
         try:
@@ -240,7 +270,7 @@ class GoogleAIOverviewScraper:
                         try:
                             text = element.inner_text()
                             if text and "AI Overview" in text:
-                                print(f"  ✅ Found AI Overview using: {selector}")
+                                logger.info("✅ Found AI Overview using: %s", selector)
                                 return True, selector, element
                         except:
                             continue
@@ -251,21 +281,27 @@ class GoogleAIOverviewScraper:
         try:
             page_content = page.content()
             if "AI Overview" in page_content and "Generated" in page_content:
-                print(f"  ⚠️ AI Overview text found in source but not as visible element")
+                logger.warning("⚠️ AI Overview text found in source but not as visible element")
         except:
             pass
         
-        print(f"  ❌ No AI Overview found")
+        logger.info("❌ No AI Overview found")
         return False, None, None
 
-    def search_and_screenshot(self, search_term, browser, context, retry_count=0):
-        """Perform search with retry logic for rate limits"""
+    def search_and_screenshot(self, search_term, browser, context):
+        """Perform one search attempt; a rate limit comes back as a result with 'retry_after' set
+
+        Per-phase timings go into result['timings'].
+        """
+        timer = PhaseTimer()
+        timer.enter('session')
         page = context.new_page()
         
         try:
             # Randomize search approach
+            timer.enter('navigation')
             if random.random() < 0.3:  # 30% chance to use homepage first
-                print(f"  🏠 Using homepage approach for: {search_term}")
+                logger.info("🏠 Using homepage approach for: %s", search_term)
                 page.goto('https://www.google.ca', wait_until='domcontentloaded', timeout=60000)
                 time.sleep(random.uniform(2, 4))
                 
@@ -277,45 +313,35 @@ class GoogleAIOverviewScraper:
                     search_box.type(search_term, delay=random.randint(50, 150))
                     time.sleep(random.uniform(0.5, 1.5))
                     search_box.press('Enter')
+                    timer.enter('results_wait')
                     page.wait_for_load_state('networkidle', timeout=60000)
             else:
                 # Direct search URL
                 search_url = f"https://www.google.ca/search?q={urllib.parse.quote_plus(search_term)}&hl=en-CA&gl=ca"
-                print(f"  🔍 Direct search for: {search_term}")
+                logger.info("🔍 Direct search for: %s", search_term)
                 
                 response = page.goto(search_url, wait_until='domcontentloaded', timeout=60000)
                 
                 # Check for rate limiting
                 if response and response.status == 429:
-                    page.close()
-                    
-                    if retry_count >= 3:
-                        print(f"  ❌ Max retries reached for '{search_term}'")
-                        return {
-                            'search_term': search_term,
-                            'has_ai_overview': False,
-                            'timestamp': datetime.now().isoformat(),
-                            'error': 'Rate limited after 3 retries'
-                        }
-                    
-                    # Handle rate limit
-                    self.handle_rate_limit()
-                    
-                    # Force proxy rotation
-                    if self.proxies:
-                        print("  🔄 Rotating to next proxy...")
-                        return None  # Signal to rotate proxy
-                    
-                    # Retry with same context
-                    return self.search_and_screenshot(search_term, browser, context, retry_count + 1)
+                    return {
+                        'search_term': search_term,
+                        'has_ai_overview': False,
+                        'timestamp': datetime.now().isoformat(),
+                        'error': 'Rate limited (429)',
+                        'retry_after': self.handle_rate_limit(retry_after_seconds(response)),
+                        'timings': timer.finish()
+                    }
                 
                 elif not response or response.status >= 400:
                     raise Exception(f"Page load failed with status {response.status if response else 'No response'}")
             
             # Random delay to appear more human
+            timer.enter('results_wait')
             time.sleep(random.uniform(2, 5))
             
             # Check for AI Overview
+            timer.enter('detection')
             has_ai_overview, selector_used, ai_overview_element = self.detect_ai_overview(page)
             
             result = {
@@ -328,6 +354,7 @@ class GoogleAIOverviewScraper:
             
             # Screenshot if found
             if has_ai_overview and ai_overview_element:
+                timer.enter('screenshot')
                 screenshot_path = self.output_dir / f"{search_term.replace(' ', '_').replace('/', '_')}_ai_overview.png"
                 
                 # Re-enable images for screenshot
@@ -336,21 +363,23 @@ class GoogleAIOverviewScraper:
                 
                 page.screenshot(path=str(screenshot_path), full_page=True)
                 result['screenshot_path'] = str(screenshot_path)
-                print(f"  📸 Screenshot saved")
+                logger.info("📸 Screenshot saved")
             
             # Reset rate limit count on success
             if self.rate_limit_count > 0:
                 self.rate_limit_count = max(0, self.rate_limit_count - 1)
             
+            result['timings'] = timer.finish()
             return result
             
         except Exception as e:
-            print(f"  ❌ Error: {str(e)}")
+            logger.error("❌ Error: %s", e)
             return {
                 'search_term': search_term,
                 'has_ai_overview': False,
                 'timestamp': datetime.now().isoformat(),
-                'error': str(e)
+                'error': str(e),
+                'timings': timer.finish()
             }
         finally:
             page.close()
@@ -361,50 +390,89 @@ class GoogleAIOverviewScraper:
         print(f"⏱️ Using delay range: {self.delay_range[0]}-{self.delay_range[1]} seconds")
         
         # Read search terms
-        search_terms = []
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader, None)
-                search_terms = [row[0].strip() for row in reader if row]
+            term_groups = read_term_groups(self.csv_file)
         except Exception as e:
             print(f"❌ Error reading CSV: {e}")
             return
         
-        print(f"📊 Found {len(search_terms)} search terms")
+        # Duplicates and case/whitespace variants are searched once and fanned out afterwards
+        search_terms = [group.search_term for group in term_groups]
+        print(f"📊 Found {describe(term_groups)}")
         
-        with sync_playwright() as playwright:
+        search_terms = self.result_cache.serve(search_terms, self.results)
+        if search_terms:
+            self.fetch_terms(search_terms)
+        
+        self.results = fan_out(self.results, term_groups)
+        self.save_results()
+        self.print_summary()
+
+    def fetch_terms(self, search_terms):
+        """Search and screenshot the terms the cache could not serve"""
+        # Rate-limited terms are parked with a not-before time while other terms go ahead
+        self.retry_queue = RetryQueue(search_terms, max_attempts=self.max_attempts)
+        
+        with self.term_log, sync_playwright() as playwright:
             proxy = self.get_next_proxy()
             browser, context = self.setup_browser_context(playwright, proxy)
+            self.resource_monitor.start()
             
             try:
-                for i, term in enumerate(search_terms, 1):
+                i = 0
+                while self.retry_queue:
+                    wait = self.retry_queue.wait_time()
+                    if wait:
+                        print(f"\n⏳ All remaining terms are backing off, idle for {wait:.0f} seconds...")
+                    entry = self.retry_queue.next()
+                    term = entry.term
+                    i += 1
                     print(f"\n{'='*60}")
-                    print(f"🔍 Processing {i}/{len(search_terms)}: '{term}'")
+                    attempt = f" (attempt {entry.attempts}/{self.max_attempts})" if entry.attempts > 1 else ""
+                    print(f"🔍 Processing {self.retry_queue.completed + 1}/{self.retry_queue.total}: '{term}'{attempt}")
                     
+                    self.term_log.begin(term)
                     result = self.search_and_screenshot(term, browser, context)
+                    self.term_log.end(failed=bool(result.get('error')))
+                    self.phase_stats.add(result.get('timings'))
                     
-                    # Check if we need to rotate proxy (None result indicates rate limit)
-                    if result is None and self.proxies:
-                        context.close()
-                        browser.close()
-                        proxy = self.get_next_proxy(force_rotate=True)
-                        browser, context = self.setup_browser_context(playwright, proxy)
-                        # Retry with new proxy
-                        result = self.search_and_screenshot(term, browser, context)
+                    if result.get('retry_after'):
+                        # Without a proxy to rotate to, the next term would hit the same rate-limited IP
+                        cooldown = 0 if self.proxies else result['retry_after']
+                        if self.retry_queue.defer(entry, result['retry_after'], result['error'], cooldown=cooldown):
+                            print(f"  ⏭️ Deferred '{term}', moving on to the next ready term")
+                            result = None
+                        else:
+                            print(f"  ❌ Max retries reached for '{term}'")
+                            del result['retry_after']
+                            result['error'] = f"Rate limited after {entry.attempts} attempts"
+                        
+                        # Rotate away from the rate-limited exit
+                        if self.proxies:
+                            print("  🔄 Rotating to next proxy...")
+                            context.close()
+                            browser.close()
+                            proxy = self.get_next_proxy(force_rotate=True)
+                            browser, context = self.setup_browser_context(playwright, proxy)
                     
                     if result:
                         self.results.append(result)
+                        self.result_cache.store(result)
+                        self.retry_queue.done(entry)
                     
                     # Delay between searches
-                    if i < len(search_terms):
+                    if self.retry_queue:
                         delay = random.uniform(self.delay_range[0], self.delay_range[1])
                         print(f"\n⏳ Waiting {delay:.1f} seconds before next search...")
                         time.sleep(delay)
                         
-                        # Periodic proxy rotation
-                        if i % 3 == 0 and self.proxies:
-                            print("\n🔄 Periodic proxy rotation...")
+                        # Periodic proxy rotation, or a fresh browser once it outgrows the memory ceiling
+                        over_ceiling = self.resource_monitor.over_ceiling()
+                        if over_ceiling or (i % 3 == 0 and self.proxies):
+                            if over_ceiling:
+                                print(f"\n🧹 Memory ceiling reached: {self.resource_monitor.describe_last()}")
+                                self.resource_monitor.recycled()
+                            print("\n🔄 Periodic proxy rotation..." if self.proxies else "\n🔄 Restarting browser...")
                             context.close()
                             browser.close()
                             proxy = self.get_next_proxy(force_rotate=True)
@@ -413,9 +481,7 @@ class GoogleAIOverviewScraper:
             finally:
                 context.close()
                 browser.close()
-        
-        self.save_results()
-        self.print_summary()
+                self.resource_monitor.stop()
 
     def save_results(self):
         """Save results to files"""
@@ -457,6 +523,15 @@ class GoogleAIOverviewScraper:
         print(f"Errors: {errors}")
         print(f"Success rate: {((total-errors)/total)*100:.1f}%" if total > 0 else "N/A")
         print(f"AI Overview rate: {(with_ai/total)*100:.1f}%" if total > 0 else "N/A")
+        if self.result_cache.cache:
+            print(self.result_cache.summary())
+        if self.phase_stats.attempts:
+            print(f"\nPhase timings over {self.phase_stats.attempts} search attempts:")
+            for line in self.phase_stats.summary_lines():
+                print(f"  {line}")
+        if self.retry_queue is not None:
+            print(self.retry_queue.summary())
+        self.resource_monitor.print_summary()
 
 
 if __name__ == "__main__":
@@ -482,7 +557,8 @@ if __name__ == "__main__":
         csv_file=CSV_FILE,
         output_dir=OUTPUT_DIR,
         delay_range=DELAY_RANGE,
-        proxies=PROXIES
+        proxies=PROXIES,
+        cache_path="response_cache.sqlite"
     )
     
     scraper.run_analysis()
\ No newline at end of file
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Live run metrics in the Prometheus text format
+
+ScraperMetrics is updated by run_analysis as terms finish and MetricsServer
+serves it on a local port (GET /metrics), so a long unattended batch can be
+charted and alerted on instead of only printing to stdout. Exposed:
+
+  scraper_terms_processed_total       finished terms
+  scraper_search_attempts_total       search attempts, including restarted ones
+  scraper_terms_per_minute            over the last `rate_window` seconds
+  scraper_ai_overview_found_total     terms with an AI Overview
+  scraper_ai_overview_found_ratio     found / processed
+  scraper_errors_total{type}          failed attempts by error type
+  scraper_blocks_total{type}          CAPTCHA/block pages by block type
+  scraper_phase_seconds{phase}        per-phase latency histogram (result['timings'])
+  scraper_browser_launches_total      browsers started
+  scraper_response_bytes_total        response bytes, from Content-Length (lower bound)
+  scraper_uptime_seconds              since the run started
+
+Response bytes are a lower bound: chunked and most compressed responses carry
+no Content-Length and are not counted, and asking the browser for each
+request's real size would cost a round trip per response.
+
+Only the standard library is used; nothing listens unless a MetricsServer is
+started.
+"""
+
+import argparse
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PHASE_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def error_type(error):
+    """Short label for a result's error message"""
+    if not error:
+        return None
+    if error.startswith('Blocked by Google'):
+        return 'blocked'
+    if 'rate limit' in error.lower():
+        return 'rate_limited'
+    if 'timeout' in error.lower():
+        return 'timeout'
+    return 'other'
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ScraperMetrics:
+    """Counters, gauges and phase histograms for one scraper run (thread-safe)"""
+
+    def __init__(self, scraper="scraper", rate_window=900, clock=time.monotonic):
+        self.scraper = scraper
+        self.rate_window = rate_window
+        self.clock = clock
+        self.started = clock()
+        self.lock = threading.Lock()
+        self.terms_processed = 0
+        self.attempts = 0
+        self.found = 0
+        self.errors = {}
+        self.blocks = {}
+        self.browser_launches = 0
+        self.response_bytes = 0
+        self.phases = {}  # phase -> [bucket counts..., sum, count]
+        self._finished_at = deque()
+
+    def record_attempt(self, result):
+        """Count one search attempt: its error or block type and its phase timings"""
+        with self.lock:
+            self.attempts += 1
+            selector = result.get('selector_used') or ''
+            if selector.startswith('blocked_'):
+                block = selector[len('blocked_'):]
+                self.blocks[block] = self.blocks.get(block, 0) + 1
+            kind = error_type(result.get('error'))
+            if kind:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+            for phase, seconds in (result.get('timings') or {}).items():
+                self._observe(phase, seconds)
+
+    def term_finished(self, result):
+        """Count a term whose result is final (it will not be retried)"""
+        with self.lock:
+            self.terms_processed += 1
+            if result.get('has_ai_overview'):
+                self.found += 1
+            self._finished_at.append(self.clock())
+
+    def browser_launched(self):
+        with self.lock:
+            self.browser_launches += 1
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.response_bytes += count
+
+    def track_transfer(self, context):
+        """Add the Content-Length of every response in a Playwright context to the byte counter (a lower bound)"""
+        def on_response(response):
+            try:
+                self.add_bytes(int(response.headers.get('content-length', 0)))
+            except ValueError:
+                pass
+        context.on('response', on_response)
+
+    def _observe(self, phase, seconds):
+        histogram = self.phases.setdefault(phase, [0] * len(PHASE_BUCKETS) + [0.0, 0])
+        for index, bound in enumerate(PHASE_BUCKETS):
+            if seconds <= bound:
+                histogram[index] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+    def terms_per_minute(self):
+        now = self.clock()
+        while self._finished_at and now - self._finished_at[0] > self.rate_window:
+            self._finished_at.popleft()
+        # At least a minute, so the first term doesn't read as thousands per minute
+        window = min(self.rate_window, max(60.0, now - self.started))
+        return len(self._finished_at) / window * 60
+
+    def render(self):
+        """The current values in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_labels(scraper=self.scraper, **labels)} {_number(value)}")
+
+        with self.lock:
+            metric('scraper_terms_processed_total', 'counter', "Terms with a final result",
+                   [('', {}, self.terms_processed)])
+            metric('scraper_search_attempts_total', 'counter', "Search attempts, including restarted ones",
+                   [('', {}, self.attempts)])
+            metric('scraper_terms_per_minute', 'gauge', f"Terms finished per minute over the last {self.rate_window}s",
+                   [('', {}, round(self.terms_per_minute(), 3))])
+            metric('scraper_ai_overview_found_total', 'counter', "Terms with an AI Overview",
+                   [('', {}, self.found)])
+            ratio = self.found / self.terms_processed if self.terms_processed else 0.0
+            metric('scraper_ai_overview_found_ratio', 'gauge', "Share of processed terms with an AI Overview",
+                   [('', {}, round(ratio, 4))])
+            metric('scraper_errors_total', 'counter', "Failed search attempts by error type",
+                   [('', {'type': kind}, count) for kind, count in sorted(self.errors.items())])
+            metric('scraper_blocks_total', 'counter', "CAPTCHA or block pages by type",
+                   [('', {'type': kind}, count) for kind, count in sorted(self.blocks.items())])
+            samples = []
+            for phase, histogram in self.phases.items():
+                for bound, count in zip(PHASE_BUCKETS + (float('inf'),), histogram[:len(PHASE_BUCKETS)] + [histogram[-1]]):
+                    samples.append(('_bucket', {'phase': phase, 'le': _number(float(bound))}, count))
+                samples.append(('_sum', {'phase': phase}, round(histogram[-2], 3)))
+                samples.append(('_count', {'phase': phase}, histogram[-1]))
+            metric('scraper_phase_seconds', 'histogram', "Duration of each search phase", samples)
+            metric('scraper_browser_launches_total', 'counter', "Browsers started",
+                   [('', {}, self.browser_launches)])
+            metric('scraper_response_bytes_total', 'counter', "Response bytes received (Content-Length; lower bound)",
+                   [('', {}, self.response_bytes)])
+            metric('scraper_uptime_seconds', 'gauge', "Seconds since the run started",
+                   [('', {}, round(self.clock() - self.started, 1))])
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server_version = "ScraperMetrics/1.0"
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        payload = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # A scrape every few seconds would drown the scraper's own output
+
+
+class MetricsServer:
+    """Serves a ScraperMetrics on http://host:port/metrics from a background thread"""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9464):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = self.metrics
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an empty metrics page, e.g. to check a scrape config")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9464)
+    args = parser.parse_args()
+
+    server = MetricsServer(ScraperMetrics(), args.host, args.port).start()
+    print(f"Serving metrics at {server.url} (Ctrl+C to stop)")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Normalized AI Overview text fingerprints and per-run delta reports
+
+Compares two ai_overview_results_*.json runs term by term and reports which
+answers changed and by how much, instead of diffing the JSON files by hand.
+
+Usage:
+    python overview_fingerprint.py                      # two newest runs in cwd
+    python overview_fingerprint.py old.json new.json [-o report.csv]
+"""
+
+import argparse
+import csv
+import hashlib
+import re
+import sys
+import unicodedata
+
+from results_store import iter_results, list_result_files
+
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed permutation coefficients so signatures are comparable across runs
+_PERMUTATIONS = []
+for _i in range(MINHASH_PERMUTATIONS):
+    _seed = hashlib.blake2b(f"minhash-{_i}".encode(), digest_size=16).digest()
+    _PERMUTATIONS.append((
+        int.from_bytes(_seed[:8], 'big') % (_MERSENNE_PRIME - 1) + 1,
+        int.from_bytes(_seed[8:], 'big') % _MERSENNE_PRIME,
+    ))
+
+_SUPERSCRIPTS = re.compile('[\u00b9\u00b2\u00b3\u2070-\u2079]+')
+_ZERO_WIDTH = re.compile('[\u200b-\u200f\u2060\ufeff]')
+_CITATIONS = re.compile(r'\[\s*\d+(?:\s*[,\-–]\s*\d+)*\s*\]')
+_URLS = re.compile(r'https?://\S+')
+_WHITESPACE = re.compile(r'\s+')
+_SPACE_BEFORE_PUNCT = re.compile(r'\s+([.,;:!?])')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+_WORDS = re.compile(r'\w+')
+
+
+def _overview_text(ai_content):
+    """Pull the raw overview text out of an ai_content dict or plain string"""
+    if not ai_content:
+        return ""
+    if isinstance(ai_content, str):
+        return ai_content
+    segments = ai_content.get('text_segments')
+    if segments:
+        return ' '.join(segments)
+    return ai_content.get('full_text') or ""
+
+
+def normalize_overview_text(ai_content):
+    """Canonical form of overview text: whitespace, citations and ordering normalized"""
+    text = _overview_text(ai_content)
+    if not text:
+        return ""
+
+    text = _SUPERSCRIPTS.sub(' ', text)
+    text = _ZERO_WIDTH.sub('', text)
+    text = unicodedata.normalize('NFKC', text)
+    text = _CITATIONS.sub(' ', text)
+    text = _URLS.sub(' ', text)
+    text = _WHITESPACE.sub(' ', text).strip().casefold()
+    text = _SPACE_BEFORE_PUNCT.sub(r'\1', text)
+
+    # Google reorders and repeats sentences between renders, so compare them as a set
+    sentences = {s.strip() for s in _SENTENCE_BREAK.split(text) if s.strip()}
+    return '\n'.join(sorted(sentences))
+
+
+def text_fingerprint(normalized_text):
+    """Fast 64-bit fingerprint of normalized text (hex)"""
+    return hashlib.blake2b(normalized_text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _shingles(normalized_text):
+    """Word shingles taken per sentence so they don't depend on sentence order"""
+    shingles = set()
+    for sentence in normalized_text.split('\n'):
+        words = _WORDS.findall(sentence)
+        if len(words) < SHINGLE_SIZE:
+            if words:
+                shingles.add(' '.join(words))
+            continue
+        for i in range(len(words) - SHINGLE_SIZE + 1):
+            shingles.add(' '.join(words[i:i + SHINGLE_SIZE]))
+    return shingles
+
+
+def minhash_signature(normalized_text):
+    """MinHash signature over word shingles of normalized text"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+        for s in _shingles(normalized_text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * MINHASH_PERMUTATIONS
+
+    signature = []
+    for a, b in _PERMUTATIONS:
+        signature.append(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes))
+    return signature
+
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    if not signature_a or not signature_b:
+        return 0.0
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
+
+
+def fingerprint_result(result):
+    """Summarize a scraper result dict as (has_ai_overview, fingerprint, signature)"""
+    normalized = normalize_overview_text(result.get('ai_content'))
+    if not normalized:
+        return bool(result.get('has_ai_overview')), None, None
+    return bool(result.get('has_ai_overview')), text_fingerprint(normalized), minhash_signature(normalized)
+
+
+def classify_change(old, new):
+    """Compare two fingerprint summaries and return (status, similarity)"""
+    old_has, old_fp, old_sig = old
+    new_has, new_fp, new_sig = new
+
+    if old_has and not new_has:
+        return 'overview_lost', 0.0
+    if new_has and not old_has:
+        return 'overview_gained', 0.0
+    if not new_has:
+        return 'no_overview', 1.0
+    if old_fp is None or new_fp is None:
+        return 'no_text', None
+    if old_fp == new_fp:
+        return 'unchanged', 1.0
+    return 'changed', estimate_similarity(old_sig, new_sig)
+
+
+def build_delta_report(old_results_path, new_results_path):
+    """Yield one delta row per term, streaming each results file once"""
+    baseline = {}
+    for result in iter_results(old_results_path):
+        if 'error' in result:
+            continue
+        baseline[result['search_term']] = fingerprint_result(result)
+
+    seen = set()
+    for result in iter_results(new_results_path):
+        term = result['search_term']
+        if term in seen or 'error' in result:
+            continue
+        seen.add(term)
+
+        current = fingerprint_result(result)
+        previous = baseline.get(term)
+        if previous is None:
+            status, similarity = 'new_term', None
+        else:
+            status, similarity = classify_change(previous, current)
+
+        yield {
+            'search_term': term,
+            'status': status,
+            'similarity': similarity,
+            'change': None if similarity is None else round(1.0 - similarity, 4),
+            'old_fingerprint': previous[1] if previous else None,
+            'new_fingerprint': current[1],
+        }
+
+    for term, previous in baseline.items():
+        if term not in seen:
+            yield {
+                'search_term': term,
+                'status': 'missing',
+                'similarity': None,
+                'change': None,
+                'old_fingerprint': previous[1],
+                'new_fingerprint': None,
+            }
+
+
+def write_delta_report(old_results_path, new_results_path, output_csv):
+    """Write the delta report to CSV and return counts per status"""
+    counts = {}
+    fieldnames = ['search_term', 'status', 'similarity', 'change', 'old_fingerprint', 'new_fingerprint']
+
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in build_delta_report(old_results_path, new_results_path):
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+            if row['similarity'] is not None:
+                row['similarity'] = round(row['similarity'], 4)
+            writer.writerow(row)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report AI Overview changes between two runs")
+    parser.add_argument('old_results', nargs='?', help="Baseline results JSON")
+    parser.add_argument('new_results', nargs='?', help="New results JSON")
+    parser.add_argument('-o', '--output', default='ai_overview_delta.csv', help="Report CSV path")
+    args = parser.parse_args()
+
+    old_path, new_path = args.old_results, args.new_results
+    if not (old_path and new_path):
+        runs = list_result_files()
+        if len(runs) < 2:
+            print("❌ Need two results files to compare")
+            sys.exit(1)
+        old_path, new_path = runs[-2], runs[-1]
+
+    print(f"📊 Comparing {old_path} -> {new_path}")
+    counts = write_delta_report(old_path, new_path, args.output)
+
+    print("\n📈 DELTA SUMMARY")
+    print(f"{'='*50}")
+    for status, count in sorted(counts.items()):
+        print(f"{status}: {count}")
+    print(f"💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Lightweight per-phase timing for each searched term
+
+PhaseTimer splits one search into consecutive phases (navigation, results
+wait, detection, expansion, extraction, screenshot, saving) by marking where
+each one begins, so the scraper code keeps its shape. The durations are
+stored in result['timings'] and PhaseStats turns them into per-phase
+p50/p90/p99 and totals for the run summary.
+"""
+
+import time
+from contextlib import contextmanager
+
+# Summary order; phases not listed here follow in the order first seen
+PHASE_ORDER = [
+    'session', 'warmup', 'navigation', 'results_wait', 'browsing', 'block_check', 'detection',
+    'archive', 'expansion', 'extraction', 'screenshot', 'saving',
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class PhaseTimer:
+    """Times the phases of one search attempt"""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.durations = {}
+        self.phase = None
+        self.phase_start = None
+
+    def enter(self, phase):
+        """End the running phase, if any, and start timing `phase` (re-entered phases accumulate)"""
+        now = self.clock()
+        self._close(now)
+        self.phase, self.phase_start = phase, now
+
+    def _close(self, now):
+        if self.phase is not None:
+            self.durations[self.phase] = self.durations.get(self.phase, 0.0) + now - self.phase_start
+            self.phase = None
+
+    @contextmanager
+    def span(self, phase):
+        """Time a block as `phase`, then resume the phase that was running before it"""
+        outer = self.phase
+        self.enter(phase)
+        try:
+            yield
+        finally:
+            if outer is None:
+                self._close(self.clock())
+            else:
+                self.enter(outer)
+
+    def finish(self):
+        """Close the running phase and return {phase: seconds} plus the attempt's 'total'"""
+        now = self.clock()
+        self._close(now)
+        timings = {phase: round(seconds, 3) for phase, seconds in self.durations.items()}
+        timings['total'] = round(now - self.started, 3)
+        return timings
+
+
+class PhaseStats:
+    """Collects result['timings'] over a run and summarises each phase"""
+
+    def __init__(self):
+        self.samples = {}
+        self.attempts = 0
+
+    def add(self, timings):
+        if not timings:
+            return
+        self.attempts += 1
+        for phase, seconds in timings.items():
+            self.samples.setdefault(phase, []).append(seconds)
+
+    def phases(self):
+        known = [phase for phase in PHASE_ORDER if phase in self.samples]
+        extra = [phase for phase in self.samples if phase not in PHASE_ORDER and phase != 'total']
+        return known + extra + (['total'] if 'total' in self.samples else [])
+
+    def summary_lines(self):
+        if not self.samples:
+            return []
+        lines = [f"{'Phase':<14}{'p50':>9}{'p90':>9}{'p99':>9}{'total':>10}{'count':>7}"]
+        for phase in self.phases():
+            values = self.samples[phase]
+            lines.append(f"{phase:<14}{percentile(values, 50):>8.2f}s{percentile(values, 90):>8.2f}s"
+                         f"{percentile(values, 99):>8.2f}s{sum(values):>9.1f}s{len(values):>7}")
+        return lines
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Staleness-aware incremental re-crawl scheduler
+
+Builds a run's work set from the results history instead of re-running the
+whole term list. Each term gets a TTL that adapts to how often its overview
+actually changes: a change shrinks the TTL, an unchanged re-check grows it.
+Terms whose last successful check is older than their TTL are due; never
+checked terms come first, then the most overdue. A run-level budget (max
+terms and/or max minutes) caps how deep the run goes.
+
+max_minutes sizes the plan from the seconds_per_term estimate only; a run
+that takes longer per term than estimated would overshoot it, so scrapers
+also hold a RunDeadline and stop starting new terms once it has passed.
+Terms left over stay due and are picked first by the next run.
+"""
+
+import argparse
+import csv
+import os
+import time
+from datetime import datetime
+
+from overview_fingerprint import classify_change, fingerprint_result
+from results_store import iter_results, list_result_files
+from term_ingest import describe, normalize_term, read_term_groups
+
+DEFAULT_TTL_HOURS = 24
+MIN_TTL_HOURS = 12
+MAX_TTL_HOURS = 24 * 28
+SHRINK_FACTOR = 0.5
+GROW_FACTOR = 1.5
+# Reworded overviews above this MinHash similarity don't count as a change
+CHANGE_SIMILARITY = 0.8
+
+
+class TermHistory:
+    """Replayed check history of one normalized term"""
+
+    def __init__(self, key):
+        self.key = key
+        self.last_checked = None
+        self.ttl_hours = DEFAULT_TTL_HOURS
+        self.checks = 0
+        self.changes = 0
+        self._last_summary = None
+
+    def observe(self, checked_at, summary):
+        if self._last_summary is not None:
+            status, similarity = classify_change(self._last_summary, summary)
+            changed = status in ('overview_lost', 'overview_gained') or (
+                status == 'changed' and (similarity is None or similarity < CHANGE_SIMILARITY)
+            )
+            if changed:
+                self.changes += 1
+                self.ttl_hours = max(MIN_TTL_HOURS, self.ttl_hours * SHRINK_FACTOR)
+            else:
+                self.ttl_hours = min(MAX_TTL_HOURS, self.ttl_hours * GROW_FACTOR)
+        self.checks += 1
+        self.last_checked = checked_at
+        self._last_summary = summary
+
+    def overdue_ratio(self, now):
+        """Age divided by TTL; >= 1 means the term is due"""
+        if self.last_checked is None:
+            return float('inf')
+        return (now - self.last_checked).total_seconds() / 3600 / self.ttl_hours
+
+
+def _parse_timestamp(value, fallback):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return fallback
+
+
+def build_history(results_dir="."):
+    """Replay every results file into per-term histories keyed by normalized term"""
+    observations = {}
+    for path in list_result_files(results_dir):
+        file_time = datetime.fromtimestamp(os.path.getmtime(path))
+        try:
+            for result in iter_results(path):
+                # Failed checks say nothing about the overview
+                if 'error' in result or not result.get('search_term'):
+                    continue
+                checked_at = _parse_timestamp(result.get('timestamp'), file_time)
+                key = normalize_term(result['search_term'])
+                observations.setdefault(key, []).append((checked_at, fingerprint_result(result)))
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not read results file '{path}': {e}")
+
+    history = {}
+    for key, checks in observations.items():
+        term = history[key] = TermHistory(key)
+        seen = set()
+        for checked_at, summary in sorted(checks, key=lambda c: c[0]):
+            # Fanned-out duplicate rows repeat the same check
+            if checked_at in seen:
+                continue
+            seen.add(checked_at)
+            term.observe(checked_at, summary)
+    return history
+
+
+def plan_recrawl(term_groups, results_dir=".", max_terms=None, max_minutes=None, seconds_per_term=90, now=None):
+    """Pick the due terms for this run; returns (selected groups, report dict)"""
+    now = now or datetime.now()
+    history = build_history(results_dir)
+
+    due = []
+    fresh = 0
+    for position, group in enumerate(term_groups):
+        term = history.get(group.key) or TermHistory(group.key)
+        ratio = term.overdue_ratio(now)
+        if ratio >= 1:
+            due.append((-ratio, position, group))
+        else:
+            fresh += 1
+    due.sort(key=lambda item: (item[0], item[1]))
+
+    limit = len(due)
+    if max_terms is not None:
+        limit = min(limit, max_terms)
+    if max_minutes is not None:
+        limit = min(limit, int(max_minutes * 60 // seconds_per_term))
+    selected = [group for _, _, group in due[:limit]]
+
+    report = {
+        'total': len(term_groups),
+        'never_checked': sum(1 for group in term_groups if group.key not in history),
+        'due': len(due),
+        'fresh': fresh,
+        'selected': len(selected),
+        'deferred': len(due) - len(selected),
+        'estimated_minutes': len(selected) * seconds_per_term / 60,
+    }
+    return selected, report
+
+
+class RunDeadline:
+    """Wall-clock end of a run's max_minutes budget, counted from construction"""
+
+    def __init__(self, max_minutes, clock=time.monotonic):
+        self.max_minutes = max_minutes
+        self.clock = clock
+        self.started = clock()
+
+    def elapsed_minutes(self):
+        return (self.clock() - self.started) / 60
+
+    def expired(self):
+        return self.max_minutes is not None and self.elapsed_minutes() >= self.max_minutes
+
+
+def describe_plan(report):
+    return (f"{report['selected']} of {report['total']} terms selected "
+            f"({report['never_checked']} never checked, {report['due']} due, {report['fresh']} still fresh, "
+            f"{report['deferred']} deferred by budget, ~{report['estimated_minutes']:.0f} min)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build today's re-crawl work set from the results history")
+    parser.add_argument('csv_file', nargs='?', default="cra_search_terms.csv", help="Full search-term CSV")
+    parser.add_argument('-o', '--output', default="recrawl_terms.csv", help="CSV of terms to run (same format)")
+    parser.add_argument('--results-dir', default=".", help="Folder containing ai_overview_results_*.json")
+    parser.add_argument('--max-terms', type=int, default=None, help="Run budget in terms")
+    parser.add_argument('--max-minutes', type=float, default=None, help="Run budget in minutes (sizes the work set from --seconds-per-term; "
+                             "the international scraper also stops starting terms once it is spent)")
+    parser.add_argument('--seconds-per-term', type=float, default=90, help="Expected cost of one term")
+    args = parser.parse_args()
+
+    term_groups = read_term_groups(args.csv_file)
+    print(f"Loaded {describe(term_groups)}")
+    selected, report = plan_recrawl(term_groups, args.results_dir, args.max_terms, args.max_minutes,
+                                    args.seconds_per_term)
+    print(describe_plan(report))
+
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Search term'])
+        for group in selected:
+            writer.writerow([group.search_term])
+    print(f"Work set written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
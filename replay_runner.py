@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Replay archived SERPs through the current detection and extraction code
+
+Re-scores a historical run after a selector or extraction change without
+re-scraping: every page of a SerpArchive run is loaded into a headless page
+with page.set_content() (JavaScript and network disabled, since the archive
+already holds the rendered DOM) and passed to the chosen scraper variant's
+detect_ai_overview() and, where it has one, extract_ai_overview_content().
+--mode offline skips the browser and uses the fallback scraper's parser
+matcher instead, which is much faster but knows nothing about visibility.
+
+Pages are split across a process pool, one browser per worker, and the
+scrapers' human-like pauses are skipped. The output is a new result version
+of the run, ai_overview_results_<run_id>_replay<N>.json, whose results carry
+a 'replay' block (source run, version, variant, mode) and the archive
+reference of the page they were scored from. --compare reports the terms
+whose detection changed against the original results file.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from benchmark_scrapers import VARIANTS, WarpedTime
+from overview_fingerprint import normalize_overview_text, text_fingerprint
+from results_store import iter_results
+from serp_archive import SerpArchiveReader
+
+# The archived DOM is already complete, so a selector that is not there now never will be
+STATIC_WAIT_MS = 250
+
+
+class StaticPage:
+    """Page wrapper for set_content pages: waits for selectors are capped instead of running to 30s"""
+
+    def __init__(self, page):
+        self._page = page
+
+    def wait_for_selector(self, selector, **kwargs):
+        kwargs['timeout'] = min(kwargs.get('timeout') or STATIC_WAIT_MS, STATIC_WAIT_MS)
+        return self._page.wait_for_selector(selector, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._page, name)
+
+
+def result_version(output_dir, run_id):
+    """Next replay version number for a run (the original scrape counts as version 0)"""
+    existing = list(Path(output_dir).glob(f"ai_overview_results_{run_id}_replay*.json"))
+    versions = [int(p.stem.rsplit('_replay', 1)[1]) for p in existing if p.stem.rsplit('_replay', 1)[1].isdigit()]
+    return max(versions, default=0) + 1
+
+
+def _base_result(entry, archive_path):
+    return {
+        'search_term': entry['term'],
+        'has_ai_overview': False,
+        'selector_used': None,
+        'ai_content': None,
+        'timestamp': entry.get('timestamp'),
+        'archive_ref': {'archive': str(archive_path), 'offset': entry['offset'],
+                        'length': entry['length'], 'kind': entry.get('kind', 'serp')},
+    }
+
+
+def _replay_browser(reader, entries, variant):
+    from playwright.sync_api import sync_playwright
+
+    module = importlib.import_module(VARIANTS[variant])
+    module.time = WarpedTime(0.0)  # Worker process only: skip the pauses inside detect_ai_overview
+    workdir = Path(tempfile.mkdtemp(prefix=f"replay_{variant}_"))
+    os.chdir(workdir)  # Scraper constructors create cookies/ and screenshot dirs in the cwd
+    scraper = module.GoogleAIOverviewScraper(csv_file="unused.csv", output_dir=str(workdir / "shots"))
+    extract = getattr(scraper, 'extract_ai_overview_content', None)
+
+    results = []
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        context = browser.new_context(java_script_enabled=False, offline=True, viewport={'width': 1366, 'height': 900})
+        context.route("**/*", lambda route: route.abort())
+        page = context.new_page()
+        try:
+            with open(reader.archive_path, 'rb') as handle:
+                for entry in entries:
+                    result = _base_result(entry, reader.archive_path)
+                    try:
+                        page.set_content(reader.read_entry(entry, handle), wait_until='domcontentloaded')
+                        static = StaticPage(page)
+                        has_ai_overview, selector_used, _ = scraper.detect_ai_overview(static)
+                        result['has_ai_overview'] = bool(has_ai_overview)
+                        result['selector_used'] = selector_used
+                        if has_ai_overview and extract:
+                            result['ai_content'] = extract(static)
+                    except Exception as e:
+                        result['error'] = f"Replay failed: {e}"
+                    results.append(result)
+        finally:
+            context.close()
+            browser.close()
+    return results
+
+
+def _replay_offline(reader, entries, parser_backend=None):
+    from serp_parsers import AI_OVERVIEW_MATCHER, AI_OVERVIEW_SELECTORS, get_parser_backend
+
+    backend = get_parser_backend(parser_backend)
+    results = []
+    with open(reader.archive_path, 'rb') as handle:
+        for entry in entries:
+            result = _base_result(entry, reader.archive_path)
+            try:
+                if entry.get('status', 200) >= 400:
+                    result['error'] = f"Archived page has HTTP status {entry['status']}"
+                else:
+                    document = backend.parse(reader.read_entry(entry, handle).encode('utf-8'))
+                    index, node = AI_OVERVIEW_MATCHER.best_match(backend, document)
+                    if node is not None:
+                        ai_content = {'full_text': backend.node_text(node)}
+                        normalized_text = normalize_overview_text(ai_content)
+                        ai_content['fingerprint'] = text_fingerprint(normalized_text) if normalized_text else None
+                        result.update(has_ai_overview=True, selector_used=AI_OVERVIEW_SELECTORS[index],
+                                      ai_content=ai_content)
+            except Exception as e:
+                result['error'] = f"Replay failed: {e}"
+            results.append(result)
+    return results
+
+
+def replay_shard(archive_path, offsets, variant, mode, parser_backend=None):
+    """Worker entry point: replay the pages at `offsets` of one archive"""
+    reader = SerpArchiveReader(archive_path)
+    wanted = set(offsets)
+    entries = [entry for entry in reader.by_term.values() if entry['offset'] in wanted]
+    entries.sort(key=lambda entry: entry['offset'])
+    if mode == 'offline':
+        return _replay_offline(reader, entries, parser_backend)
+    return _replay_browser(reader, entries, variant)
+
+
+def replay_archive(archive_path, variant='international', mode='browser', workers=None, output_dir=".",
+                   parser_backend=None, kinds=('serp',)):
+    """Replay every (latest) page of an archive; returns (results, output path)"""
+    archive_path = Path(archive_path).resolve()
+    reader = SerpArchiveReader(archive_path)
+    entries = sorted((e for e in reader.by_term.values() if e.get('kind', 'serp') in kinds), key=lambda e: e['offset'])
+    workers = max(1, min(workers or os.cpu_count() or 1, len(entries)))
+    shards = [[entry['offset'] for entry in entries[index::workers]] for index in range(workers)]
+
+    print(f"Replaying {len(entries)} pages of run {reader.run_id} with {variant if mode == 'browser' else 'offline parser'} "
+          f"across {workers} workers...")
+    started = datetime.now()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(replay_shard, str(archive_path), shard, variant, mode, parser_backend)
+                   for shard in shards if shard]
+        for future in as_completed(futures):
+            results.extend(future.result())
+    elapsed = (datetime.now() - started).total_seconds()
+
+    # Back to archive order so the new version lines up with the original run
+    results.sort(key=lambda result: result['archive_ref']['offset'])
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    version = result_version(output_dir, reader.run_id)
+    replay = {
+        'source_run': reader.run_id,
+        'version': version,
+        'variant': variant if mode == 'browser' else None,
+        'mode': mode,
+        'replayed_at': started.isoformat(),
+    }
+    for result in results:
+        result['replay'] = replay
+
+    output_path = output_dir / f"ai_overview_results_{reader.run_id}_replay{version}.json"
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    rate = len(results) / elapsed * 60 if elapsed else 0.0
+    print(f"Replayed {len(results)} pages in {elapsed:.1f}s ({rate:.0f} pages/min) -> {output_path}")
+    return results, output_path
+
+
+def compare_results(original_path, replayed):
+    """Terms whose has_ai_overview differs from the original results file"""
+    original = {result['search_term']: result.get('has_ai_overview') for result in iter_results(original_path)}
+    changed = []
+    for result in replayed:
+        before = original.get(result['search_term'])
+        if before is not None and before != result['has_ai_overview']:
+            changed.append((result['search_term'], before, result['has_ai_overview']))
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run AI Overview detection over an archived run")
+    parser.add_argument('archive', help="Archive file written by SerpArchive (*.serp.gz / *.serp.zst)")
+    parser.add_argument('--variant', choices=sorted(VARIANTS), default='international',
+                        help="Scraper whose detect_ai_overview/extract_ai_overview_content is replayed")
+    parser.add_argument('--mode', choices=['browser', 'offline'], default='browser')
+    parser.add_argument('--parser-backend', help="Offline mode only: parser backend (default: fastest installed)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--output-dir', default=".")
+    parser.add_argument('--include-overview-pages', action='store_true',
+                        help="Also replay pages archived as the overview subtree only")
+    parser.add_argument('--compare', help="Original results JSON to diff detections against")
+    args = parser.parse_args()
+
+    kinds = ('serp', 'overview') if args.include_overview_pages else ('serp',)
+    results, _ = replay_archive(args.archive, args.variant, args.mode, args.workers, args.output_dir,
+                                args.parser_backend, kinds)
+    with_ai = sum(1 for result in results if result['has_ai_overview'])
+    errors = sum(1 for result in results if result.get('error'))
+    print(f"With AI Overview: {with_ai}/{len(results)}, errors: {errors}")
+
+    if args.compare:
+        changed = compare_results(args.compare, results)
+        print(f"{len(changed)} detections changed against {args.compare}")
+        for term, before, after in changed:
+            print(f"  {term}: {before} -> {after}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Background resource monitor that drives browser recycling
+
+Samples, every `interval` seconds, the RSS of the browser process tree (all
+child processes: the Playwright driver, Chromium and its renderers) and the
+RSS of this Python process. run_analysis asks over_ceiling() between terms
+and recycles the context and browser when the browser tree has outgrown
+`ceiling_mb`, instead of after a fixed number of terms. print_summary() adds
+the sampled timeline to the run summary.
+
+trace_python=True also records the Python heap (tracemalloc current and
+peak). It slows every allocation and holds a traceback per live block, so it
+is off unless a run is being investigated for a leak in the scraper itself.
+
+Child processes are found with psutil when it is installed, otherwise from
+/proc on Linux; elsewhere only this process is measured and no recycling is
+triggered.
+"""
+
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 2**20
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+HAS_PROC = os.path.exists(f"/proc/{os.getpid()}/task")
+
+
+def _proc_children(pid):
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def _proc_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree_rss(pid=None):
+    """(RSS of the process, summed RSS of all its descendants) in bytes; descendants are None if unmeasurable"""
+    pid = pid or os.getpid()
+    if psutil is not None:
+        process = psutil.Process(pid)
+        children = 0
+        for child in process.children(recursive=True):
+            try:
+                children += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return process.memory_info().rss, children
+    if HAS_PROC:
+        children, pending = 0, _proc_children(pid)
+        while pending:
+            child = pending.pop()
+            children += _proc_rss(child)
+            pending.extend(_proc_children(child))
+        return _proc_rss(pid), children
+    # ru_maxrss is the peak in KiB on Linux and bytes on macOS; the best there is without psutil
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, None
+
+
+class ResourceSample:
+    __slots__ = ('elapsed', 'browser_rss', 'python_rss', 'heap_current', 'heap_peak')
+
+    def __init__(self, elapsed, browser_rss, python_rss, heap_current, heap_peak):
+        self.elapsed = elapsed
+        self.browser_rss = browser_rss
+        self.python_rss = python_rss
+        self.heap_current = heap_current
+        self.heap_peak = heap_peak
+
+
+class ResourceMonitor:
+    """Samples memory in a background thread and tells the scraper when to recycle its browser"""
+
+    def __init__(self, ceiling_mb=1500, interval=5.0, trace_python=False, max_samples=2000):
+        self.ceiling = ceiling_mb * MB if ceiling_mb else None
+        self.interval = interval
+        self.trace_python = trace_python
+        self.max_samples = max_samples
+        self.samples = []
+        self.recycles = []  # (elapsed seconds, browser RSS that triggered it)
+        self.lock = threading.Lock()
+        self.started = None
+        self._started_tracemalloc = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        python_rss, browser_rss = process_tree_rss()
+        heap_current, heap_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        point = ResourceSample(time.monotonic() - self.started, browser_rss, python_rss, heap_current, heap_peak)
+        with self.lock:
+            self.samples.append(point)
+            if len(self.samples) > self.max_samples:
+                # Halve the resolution rather than forget the start of a long run
+                self.samples = self.samples[::2]
+        return point
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.started = time.monotonic()
+        if self.trace_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._stop.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="resource-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.sample()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def over_ceiling(self):
+        """True when the browser process tree has grown past the ceiling (measured now)"""
+        if self.ceiling is None or self.started is None:
+            return False
+        point = self.sample()
+        return point.browser_rss is not None and point.browser_rss > self.ceiling
+
+    def recycled(self):
+        """Record that the browser was recycled because of the ceiling"""
+        with self.lock:
+            last = self.samples[-1] if self.samples else None
+            self.recycles.append((last.elapsed if last else 0.0, last.browser_rss if last else None))
+
+    def describe_last(self):
+        last = self.samples[-1] if self.samples else None
+        if last is None or last.browser_rss is None:
+            return "browser RSS unknown"
+        return f"browser RSS {last.browser_rss / MB:.0f}MB > {self.ceiling / MB:.0f}MB ceiling"
+
+    def summary_lines(self, rows=12):
+        """Peak values, recycle events and a timeline of about `rows` evenly spaced samples"""
+        with self.lock:
+            samples = list(self.samples)
+            recycles = list(self.recycles)
+        if not samples:
+            return []
+
+        def mb(value):
+            return f"{value / MB:.0f}MB" if value is not None else "n/a"
+
+        browser = [s.browser_rss for s in samples if s.browser_rss is not None]
+        heap = [s.heap_peak for s in samples if s.heap_peak is not None]
+        lines = [
+            f"Peak browser tree RSS {mb(max(browser) if browser else None)}, Python RSS "
+            f"{mb(max(s.python_rss for s in samples))}, Python heap peak {mb(max(heap) if heap else None)}",
+            f"Memory-driven recycles: {len(recycles)} (ceiling {mb(self.ceiling)})",
+        ]
+        lines.extend(f"  at {elapsed / 60:.1f} min, browser RSS {mb(rss)}" for elapsed, rss in recycles)
+        lines.append(f"{'minute':>8}{'browser':>10}{'python':>10}{'heap':>10}")
+        step = max(1, len(samples) // rows)
+        picked = samples[::step]
+        if picked[-1] is not samples[-1]:
+            picked.append(samples[-1])
+        for s in picked:
+            lines.append(f"{s.elapsed / 60:>8.1f}{mb(s.browser_rss):>10}{mb(s.python_rss):>10}{mb(s.heap_current):>10}")
+        return lines
+
+    def print_summary(self, rows=12):
+        """Print summary_lines() under a heading, if anything was sampled"""
+        lines = self.summary_lines(rows)
+        if lines:
+            print("\n🧠 Memory over the run:")
+            for line in lines:
+                print(f"  {line}")
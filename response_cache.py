@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+TTL-bounded local response cache for the scrapers
+
+Results are stored in a small SQLite file keyed by (normalized term, locale
+parameters, engine). Entries older than the TTL are ignored and purged, and
+the least recently used entries are evicted once the cache grows past its
+entry or byte budget. A rerun inside the TTL is answered from disk without
+opening a browser or sending a request.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from term_ingest import normalize_term
+
+
+def cache_key(term, engine, locale=None):
+    payload = json.dumps([normalize_term(term), engine, sorted((locale or {}).items())], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _screenshot_exists(result):
+    # A deleted screenshot means the result has to be fetched again
+    screenshot = result.get('screenshot_path')
+    return not screenshot or os.path.exists(screenshot)
+
+
+class ResponseCache:
+    """Disk-backed TTL + LRU cache of per-term results"""
+
+    def __init__(self, db_path="response_cache.sqlite", ttl=6 * 3600, max_entries=10000, max_bytes=256 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stale': 0, 'stores': 0, 'evictions': 0}
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                engine TEXT NOT NULL,
+                term TEXT NOT NULL,
+                locale TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.conn.commit()
+        self.purge_expired()
+
+    def get(self, term, engine, locale=None, validate=None):
+        """Cached value for a term, or None on a miss, an expired entry or one failing validate()"""
+        key = cache_key(term, engine, locale)
+        row = self.conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+
+        value, created = row
+        now = time.time()
+        if now - created > self.ttl:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.conn.commit()
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        value = json.loads(value)
+        if validate is not None and not validate(value):
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.conn.commit()
+            self.stats['stale'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.stats['hits'] += 1
+        return value
+
+    def put(self, term, engine, value, locale=None):
+        """Store a JSON-serialisable value, then evict down to the size budget"""
+        key = cache_key(term, engine, locale)
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, engine, term, locale, value, size, created, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, engine, term, json.dumps(locale or {}, sort_keys=True), encoded, len(encoded), now, now)
+        )
+        self.stats['stores'] += 1
+        self.evict()
+        self.conn.commit()
+
+    def invalidate(self, term, engine, locale=None):
+        self.conn.execute("DELETE FROM responses WHERE key = ?", (cache_key(term, engine, locale),))
+        self.conn.commit()
+
+    def purge_expired(self):
+        cursor = self.conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        self.conn.commit()
+        return cursor.rowcount
+
+    def evict(self):
+        """Drop least recently used entries beyond max_entries / max_bytes"""
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and (not self.max_bytes or total <= self.max_bytes):
+            return
+
+        evicted = 0
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and (not self.max_bytes or total <= self.max_bytes):
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        self.stats['evictions'] += evicted
+
+    @property
+    def lookups(self):
+        return self.stats['hits'] + self.stats['misses']
+
+    @property
+    def hit_ratio(self):
+        return self.stats['hits'] / self.lookups if self.lookups else 0.0
+
+    def summary(self):
+        return (f"Cache: {self.stats['hits']}/{self.lookups} hits ({self.hit_ratio * 100:.1f}%), "
+                f"{self.stats['expired']} expired, {self.stats['stale']} stale, "
+                f"{self.stats['stores']} stored, {self.stats['evictions']} evicted")
+
+    def close(self):
+        self.conn.close()
+
+
+class ScraperCache:
+    """One Playwright scraper's view of the cache: whole result dicts under a fixed engine and locale
+
+    Built without a cache path it serves nothing and stores nothing, so the
+    scrapers call it unconditionally.
+    """
+
+    def __init__(self, cache_path, engine, locale=None, ttl=6 * 3600):
+        self.cache = ResponseCache(cache_path, ttl=ttl) if cache_path else None
+        self.engine = engine
+        self.locale = locale
+
+    def serve(self, search_terms, results):
+        """Append cached results for search_terms to results and return the terms still to fetch"""
+        if not self.cache:
+            return list(search_terms)
+        remaining = []
+        served = 0
+        for term in search_terms:
+            result = self.cache.get(term, self.engine, self.locale, validate=_screenshot_exists)
+            if result:
+                result['search_term'] = term
+                result['served_from_cache'] = True
+                results.append(result)
+                served += 1
+            else:
+                remaining.append(term)
+        print(f"Served {served} terms from cache, {len(remaining)} left to fetch")
+        return remaining
+
+    def store(self, result):
+        """Cache a finished result; errors, blocks and restarts are never cached"""
+        if not self.cache or not result or result.get('error') or result.get('restart_needed'):
+            return False
+        self.cache.put(result['search_term'], self.engine, result, self.locale)
+        return True
+
+    def summary(self):
+        return self.cache.summary() if self.cache else None
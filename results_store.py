@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Helpers for reading the ai_overview_results_*.json files written by the scrapers
+"""
+
+import glob
+import json
+import os
+
+RESULT_FILE_PATTERNS = [
+    "ai_overview_results_*.json",
+    "cra_ai_overview_results_*.json",
+]
+
+
+def list_result_files(results_dir="."):
+    """List result files in a directory, oldest first"""
+    paths = set()
+    for pattern in RESULT_FILE_PATTERNS:
+        paths.update(glob.glob(os.path.join(results_dir, pattern)))
+    return sorted(paths, key=lambda p: (os.path.getmtime(p), p))
+
+
+def iter_results(path, chunk_size=1 << 16):
+    """Stream result dicts out of a JSON array file without loading it whole"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            if not eof and len(buffer) < chunk_size:
+                chunk = f.read(chunk_size)
+                if chunk:
+                    buffer += chunk
+                else:
+                    eof = True
+
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    if eof:
+                        return
+                    continue
+                if buffer[0] != '[':
+                    raise ValueError(f"{path} does not contain a JSON array")
+                buffer = buffer[1:]
+                started = True
+                continue
+
+            if buffer.startswith(','):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith(']'):
+                return
+            if not buffer:
+                if eof:
+                    return
+                continue
+
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Object spans the chunk boundary - read more and try again
+                chunk = f.read(chunk_size)
+                if chunk:
+                    buffer += chunk
+                else:
+                    eof = True
+                continue
+
+            yield obj
+            buffer = buffer[end:]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Deferred retry queue for the scrapers
+
+A failed attempt no longer sleeps inside its retry loop (up to 5-10 minutes
+on a rate limit). The term goes back into the queue with a not-before time
+and the worker moves straight on to the next ready term. Each term keeps an
+attempt counter and is given up after max_attempts. A failure that is about
+the exit rather than the term (a 429, a block page) also carries a cooldown:
+the whole queue is paused for it, so the next term does not go straight back
+to the same IP. The worker only idles when every remaining term is backing
+off or the queue is paused, and that idle time is measured and reported.
+"""
+
+import heapq
+import itertools
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def retry_after_seconds(response):
+    """Seconds asked for by a response's Retry-After header (delta or HTTP date), or None"""
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryLater(Exception):
+    """Raised by a single search attempt that should be retried after `delay` seconds
+
+    `cooldown` holds every other term back for that many seconds as well (rate limits and blocks).
+    """
+
+    def __init__(self, delay, reason, cooldown=0):
+        super().__init__(reason)
+        self.delay = delay
+        self.reason = reason
+        self.cooldown = cooldown
+
+
+class RetryEntry:
+    """A term waiting in the queue"""
+
+    def __init__(self, term, not_before=0.0):
+        self.term = term
+        self.attempts = 0  # Attempts started so far; the current one once popped
+        self.not_before = not_before
+        self.last_error = None
+
+    def __repr__(self):
+        return f"RetryEntry({self.term!r}, attempts={self.attempts})"
+
+
+class RetryQueue:
+    """Terms ordered by not-before time; fresh terms keep their input order and run before retries"""
+
+    def __init__(self, terms=(), max_attempts=3, clock=None, sleep=None):
+        self.max_attempts = max_attempts
+        # Looked up at construction so a benchmark can swap this module's time for a scaled one
+        self.clock = clock or time.monotonic
+        self.sleep = sleep or time.sleep
+        self._heap = []
+        self._order = itertools.count()
+        self.total = 0
+        self.completed = 0
+        self.deferrals = 0
+        self.gave_up = []
+        self.idle_time = 0.0
+        self.paused_until = 0.0
+        self.cooldowns = 0
+        for term in terms:
+            self.add(term)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, term, delay=0.0):
+        entry = RetryEntry(term, self.clock() + delay if delay else 0.0)
+        self._push(entry)
+        self.total += 1
+        return entry
+
+    def _push(self, entry):
+        heapq.heappush(self._heap, (entry.not_before, next(self._order), entry))
+
+    def wait_time(self):
+        """Seconds until the next term is ready: 0 if one is ready now, None if the queue is empty"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self.clock(), self.paused_until - self.clock())
+
+    def pause(self, seconds):
+        """Hold every term, fresh or retried, for a while (e.g. after a 429)"""
+        if seconds > 0:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.cooldowns += 1
+
+    def next(self, wait=True):
+        """Pop the next ready entry and count the attempt
+
+        When every remaining term is backing off, or the queue is paused, this
+        sleeps until the next one is due (recorded as idle time), or returns
+        None if wait is False.
+        Returns None once the queue is empty.
+        """
+        delay = self.wait_time()
+        if delay is None:
+            return None
+        if delay > 0:
+            if not wait:
+                return None
+            start = self.clock()
+            self.sleep(delay)
+            self.idle_time += self.clock() - start
+        entry = heapq.heappop(self._heap)[2]
+        entry.attempts += 1
+        return entry
+
+    def defer(self, entry, delay, reason=None, cooldown=0):
+        """Put a failed term back with a not-before time; False once it has used up its attempts
+
+        A cooldown pauses the whole queue whether or not the term is retried.
+        """
+        entry.last_error = reason
+        self.pause(cooldown)
+        if entry.attempts >= self.max_attempts:
+            self.gave_up.append(entry)
+            return False
+        entry.not_before = self.clock() + delay
+        self._push(entry)
+        self.deferrals += 1
+        return True
+
+    def done(self, entry):
+        self.completed += 1
+
+    def summary(self):
+        return (f"Retry queue: {self.completed}/{self.total} terms finished, {self.deferrals} deferred retries, "
+                f"{len(self.gave_up)} given up, {self.cooldowns} cooldowns, "
+                f"{self.idle_time:.0f}s idle waiting on backoff")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Element screenshots for the Selenium scrapers via Chrome DevTools
+
+WebElement.screenshot() captures the viewport and crops it in the driver, so
+the element has to be scrolled into view first and anything taller than the
+window is cut off. capture_element() asks Chrome for exactly the element's
+rectangle with Page.captureScreenshot (clip + captureBeyondViewport), which
+works wherever the page is scrolled to and for elements of any height.
+
+The PNG comes back base64-encoded from the browser; decoding and writing it
+is left to a ScreenshotWriter thread so the scraping thread moves straight
+on to the next term. A submitted path is only queued: after close() the
+writer knows which paths were never written, and drop_failed() clears them
+from the results before they are saved.
+"""
+
+import base64
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Document coordinates of an element, in CSS pixels
+ELEMENT_RECT_SCRIPT = """
+const rect = arguments[0].getBoundingClientRect();
+return {
+    x: rect.left + window.scrollX,
+    y: rect.top + window.scrollY,
+    width: rect.width,
+    height: rect.height
+};
+"""
+
+
+def capture_element(driver, element, image_format='png'):
+    """Screenshot of one element as base64 text straight from the browser, or None if it has no size
+
+    Uses Page.captureScreenshot on Chromium drivers and falls back to the
+    WebDriver element screenshot (same base64 form) elsewhere.
+    """
+    if not hasattr(driver, 'execute_cdp_cmd'):
+        return element.screenshot_as_base64
+
+    rect = driver.execute_script(ELEMENT_RECT_SCRIPT, element)
+    if not rect or rect['width'] < 1 or rect['height'] < 1:
+        return None
+    clip = {
+        'x': rect['x'],
+        'y': rect['y'],
+        'width': rect['width'],
+        'height': rect['height'],
+        'scale': 1,
+    }
+    result = driver.execute_cdp_cmd('Page.captureScreenshot', {
+        'format': image_format,
+        'clip': clip,
+        'captureBeyondViewport': True,
+        'fromSurface': True,
+    })
+    return result['data']
+
+
+class ScreenshotWriter:
+    """Decodes and writes captured screenshots on a background thread"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.written = 0
+        self.failed = 0
+        self.failed_paths = {}  # path -> error, for screenshots that were queued but never written
+        self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path, data):
+        """Queue base64 image data to be written to path"""
+        self.queue.put((path, data))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path, data = item
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(base64.b64decode(data))
+                self.written += 1
+                self.failed_paths.pop(path, None)  # a retried term may rewrite a failed path
+            except Exception as e:
+                self.failed += 1
+                self.failed_paths[path] = str(e)
+                logger.error(f"Failed to write screenshot {path}: {e}")
+
+    def close(self):
+        """Write everything still queued, then stop the thread"""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+
+    def drop_failed(self, results, key='screenshot_path'):
+        """Clear screenshot paths that were never written from result dicts (call after close)
+
+        Returns the number of results changed.
+        """
+        dropped = 0
+        for result in results:
+            if result.get(key) in self.failed_paths:
+                logger.warning(f"Screenshot for '{result.get('search_term')}' was not written: "
+                               f"{self.failed_paths[result[key]]}")
+                result[key] = None
+                dropped += 1
+        return dropped
+
+    def summary(self):
+        return f"Screenshots written: {self.written} (failed: {self.failed})"
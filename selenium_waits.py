@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Combined selector waits for the Selenium scrapers
+
+Waiting on a list of selectors one WebDriverWait at a time costs the full
+timeout of every selector that is absent: 18 overview selectors at 3 s and 9
+featured-snippet selectors at 2 s come to about 70 s on a page without an
+overview. FirstSelectorPresent checks the whole list in priority order with
+a single execute_script per poll, so the wait ends within one poll interval
+of any selector matching, or after one overall timeout.
+"""
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Returns [index, element] for the first selector (in list order) with a match, or null
+FIRST_MATCH_SCRIPT = """
+const selectors = arguments[0];
+for (let i = 0; i < selectors.length; i++) {
+    let element = null;
+    try {
+        element = document.querySelector(selectors[i]);
+    } catch (e) {
+        continue;  // Invalid selector for this browser
+    }
+    if (element) {
+        return [i, element];
+    }
+}
+return null;
+"""
+
+
+class FirstSelectorPresent:
+    """Expected condition: (element, selector) for the highest-priority selector present in the DOM"""
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+
+    def __call__(self, driver):
+        match = driver.execute_script(FIRST_MATCH_SCRIPT, self.selectors)
+        if not match:
+            return False
+        index, element = match
+        return element, self.selectors[index]
+
+
+def wait_for_first_selector(driver, selectors, timeout, poll_frequency=0.25):
+    """Poll all selectors together; (element, selector), or (None, None) after `timeout` seconds"""
+    condition = FirstSelectorPresent(selectors)
+    if timeout <= 0:
+        return condition(driver) or (None, None)
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+    except TimeoutException:
+        return None, None
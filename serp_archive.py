@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Compressed raw SERP archive with an offset index
+
+Every fetched page (or just its AI Overview subtree) is appended to a single
+archive file per run as an independently compressed frame, and a sidecar
+JSON-lines index records term -> (offset, length). Any page can be read back
+later by seeking, so detectors and extractors can be re-run over a whole run
+without touching the network.
+
+Frames are zstd when the `zstandard` package is installed, gzip otherwise.
+"""
+
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_SUFFIXES = {'gzip': '.serp.gz', 'zstd': '.serp.zst'}
+
+
+def default_codec():
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def compress_frame(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress_frame(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Archive was written with zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ArchivedResponse:
+    """Minimal stand-in for a requests.Response built from an archived page"""
+
+    def __init__(self, text, url="", status_code=200, encoding='utf-8'):
+        self.text = text
+        self.url = url
+        self.status_code = status_code
+        self.encoding = encoding
+
+    @property
+    def content(self):
+        return self.text.encode(self.encoding or 'utf-8')
+
+
+class SerpArchive:
+    """Append-only writer: one compressed frame per page plus a sidecar index"""
+
+    def __init__(self, archive_dir="serp_archive", run_id=None, codec=None):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.codec = codec or default_codec()
+        self.archive_path = self.archive_dir / f"{self.run_id}{CODEC_SUFFIXES[self.codec]}"
+        self.index_path = self.archive_dir / f"{self.run_id}.idx.jsonl"
+        self._archive = open(self.archive_path, 'ab')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.pages_written = 0
+        self.bytes_written = 0
+
+    def append(self, search_term, html, url="", status=200, kind='serp', **meta):
+        """Append one page; returns a reference dict to store alongside the result"""
+        raw = html.encode('utf-8')
+        frame = compress_frame(raw, self.codec)
+
+        with self._lock:
+            offset = self._archive.seek(0, os.SEEK_END)
+            self._archive.write(frame)
+            self._archive.flush()
+
+            entry = {
+                'term': search_term,
+                'offset': offset,
+                'length': len(frame),
+                'codec': self.codec,
+                'kind': kind,
+                'url': url,
+                'status': status,
+                'raw_size': len(raw),  # bytes, so compression ratios hold for non-ASCII pages
+                'timestamp': datetime.now().isoformat(),
+            }
+            entry.update(meta)
+            self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._index.flush()
+
+            self.pages_written += 1
+            self.bytes_written += len(frame)
+
+        return {'archive': str(self.archive_path), 'offset': offset, 'length': len(frame), 'kind': kind}
+
+    def close(self):
+        with self._lock:
+            if not self._archive.closed:
+                self._archive.close()
+                self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SerpArchiveReader:
+    """Random-access reader over an archive written by SerpArchive"""
+
+    def __init__(self, archive_path, index_path=None):
+        self.archive_path = Path(archive_path)
+        if index_path is None:
+            run_id = self.archive_path.name.split('.serp.')[0]
+            index_path = self.archive_path.with_name(f"{run_id}.idx.jsonl")
+        self.index_path = Path(index_path)
+        self.run_id = self.index_path.name[:-len('.idx.jsonl')]
+        self.entries = []
+        self.by_term = {}
+
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Truncated last line from an interrupted run
+                    continue
+                self.entries.append(entry)
+                # Later entries (retries) replace earlier ones for the same term
+                self.by_term[entry['term']] = entry
+
+    def __len__(self):
+        return len(self.by_term)
+
+    def terms(self):
+        return list(self.by_term)
+
+    def read_entry(self, entry, handle=None):
+        """Decompress the page referenced by an index entry"""
+        if handle is None:
+            with open(self.archive_path, 'rb') as f:
+                return self.read_entry(entry, f)
+        handle.seek(entry['offset'])
+        data = handle.read(entry['length'])
+        return decompress_frame(data, entry.get('codec', 'gzip')).decode('utf-8')
+
+    def get(self, search_term):
+        """Latest archived page for a term, or None"""
+        entry = self.by_term.get(search_term)
+        if entry is None:
+            return None
+        return self.read_entry(entry)
+
+    def get_response(self, search_term):
+        """Latest archived page for a term wrapped as a response-like object"""
+        entry = self.by_term.get(search_term)
+        if entry is None:
+            return None
+        return ArchivedResponse(self.read_entry(entry), entry.get('url', ''), entry.get('status', 200))
+
+    def iter_pages(self, latest_only=True):
+        """Yield (entry, html) in archive order with a single open file handle"""
+        entries = self.entries
+        if latest_only:
+            entries = sorted(self.by_term.values(), key=lambda e: e['offset'])
+        with open(self.archive_path, 'rb') as f:
+            for entry in entries:
+                yield entry, self.read_entry(entry, f)
+
+
+def find_archives(archive_dir="serp_archive"):
+    """Archive files in a directory, oldest first"""
+    archive_dir = Path(archive_dir)
+    if not archive_dir.exists():
+        return []
+    paths = [p for suffix in CODEC_SUFFIXES.values() for p in archive_dir.glob(f"*{suffix}")]
+    return sorted(paths)
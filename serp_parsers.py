@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Pluggable HTML parser backends for the plain-HTTP fallback path
+
+All backends expose the same small surface used by the extractors:
+parse(html), select_first(document, selector), node_text(node), node_html(node).
+Text follows BeautifulSoup's get_text(strip=True) convention (stripped text
+nodes joined without a separator) so results match across backends.
+
+The default is the backend benchmark_parsers.py measured as the fastest one
+passing extraction parity against html.parser, which it records in
+serp_parser.json next to this module. Without that file the first installed
+backend in the order below is used; SERP_PARSER overrides both.
+"""
+
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+
+PARSER_PREFERENCE = ['selectolax', 'lxml', 'bs4-lxml', 'html.parser']
+
+# Written by benchmark_parsers.py: the measured winner on this machine's corpus
+PARSER_CHOICE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serp_parser.json')
+
+# AI overview selectors, in priority order (first match wins)
+AI_OVERVIEW_SELECTORS = [
+    '[data-attrid="wa:/description"]',
+    '[data-async-context*="ai_overview"]',
+    '.AI-overview',
+    '[data-ved*="AI"]',
+    '.g-blk',
+    '[jsname*="AI"]',
+    '.kp-blk',
+    '[data-attrid*="description"]',
+    '.xpdopen .LGOjhe',
+    '.kno-rdesc',
+    '.yp',
+    '[data-md="50"]',
+    '.ULSxyf',
+    '.hgKElc',
+    '.kno-fb-ctx',
+    '.Z0LcW',
+    '.IZ6rdc',
+    '.ayRjaf',
+    '.g-section-with-header',
+    '.knowledge-panel',
+    '.kp-wholepage'
+]
+
+
+def _to_text(html):
+    if isinstance(html, bytes):
+        return html.decode('utf-8', errors='replace')
+    return html
+
+
+class ParserBackend(ABC):
+    name = None
+
+    @classmethod
+    @abstractmethod
+    def available(cls):
+        """Whether the backend's libraries are installed"""
+
+    @abstractmethod
+    def parse(self, html):
+        """Parse a document (str or bytes)"""
+
+    @abstractmethod
+    def select_first(self, document, selector):
+        """First element matching a CSS selector, or None"""
+
+    @abstractmethod
+    def node_text(self, node):
+        """Stripped text nodes in document order, joined without a separator"""
+
+    @abstractmethod
+    def node_html(self, node):
+        """Outer HTML of an element"""
+
+    # Tree-walk primitives used by SelectorMatcher
+
+    def root(self, document):
+        return document
+
+    @abstractmethod
+    def children(self, node):
+        """Child elements only (no text or comments)"""
+
+    @abstractmethod
+    def attributes(self, node):
+        """Attribute dict with string values"""
+
+
+class HtmlParserBackend(ParserBackend):
+    """BeautifulSoup with the pure-Python html.parser (the original behaviour)"""
+    name = 'html.parser'
+    bs4_features = 'html.parser'
+
+    @classmethod
+    def available(cls):
+        try:
+            import bs4  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def parse(self, html):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(html, self.bs4_features)
+
+    def select_first(self, document, selector):
+        return document.select_one(selector)
+
+    def node_text(self, node):
+        return node.get_text(strip=True)
+
+    def node_html(self, node):
+        return str(node)
+
+    def children(self, node):
+        from bs4 import Tag
+        return [child for child in node.children if isinstance(child, Tag)]
+
+    def attributes(self, node):
+        # Multi-valued attributes (class, rel...) come back as lists
+        return {key: ' '.join(value) if isinstance(value, list) else value
+                for key, value in node.attrs.items()}
+
+
+class Bs4LxmlBackend(HtmlParserBackend):
+    """BeautifulSoup tree built by lxml's C parser"""
+    name = 'bs4-lxml'
+    bs4_features = 'lxml'
+
+    @classmethod
+    def available(cls):
+        try:
+            import bs4  # noqa: F401
+            import lxml  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+
+class LxmlBackend(ParserBackend):
+    """lxml.html with cssselect-compiled XPath"""
+    name = 'lxml'
+
+    def __init__(self):
+        self._compiled = {}
+
+    @classmethod
+    def available(cls):
+        try:
+            import lxml.html  # noqa: F401
+            import cssselect  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def parse(self, html):
+        import lxml.html
+        return lxml.html.document_fromstring(html)
+
+    def select_first(self, document, selector):
+        compiled = self._compiled.get(selector)
+        if compiled is None:
+            from lxml.cssselect import CSSSelector
+            compiled = self._compiled[selector] = CSSSelector(selector)
+        matches = compiled(document)
+        return matches[0] if matches else None
+
+    def node_text(self, node):
+        # An element's text, then each child's subtree followed by that child's tail.
+        # node.iter() would emit a child's tail before its descendants' text.
+        parts = []
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item.strip())
+                continue
+            if isinstance(item.tag, str) and item.text:
+                # Comments and processing instructions contribute only their tail
+                parts.append(item.text.strip())
+            for child in reversed(item):
+                if child.tail:
+                    stack.append(child.tail)
+                stack.append(child)
+        return ''.join(parts)
+
+    def node_html(self, node):
+        import lxml.html
+        return lxml.html.tostring(node, encoding='unicode', with_tail=False)
+
+    def children(self, node):
+        return [child for child in node if isinstance(child.tag, str)]
+
+    def attributes(self, node):
+        return node.attrib
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax on the lexbor engine (falls back to modest)"""
+    name = 'selectolax'
+
+    @classmethod
+    def available(cls):
+        try:
+            import selectolax  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def parse(self, html):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as Parser
+        except ImportError:
+            from selectolax.parser import HTMLParser as Parser
+        return Parser(_to_text(html))
+
+    def select_first(self, document, selector):
+        return document.css_first(selector)
+
+    def node_text(self, node):
+        return node.text(deep=True, separator='', strip=True)
+
+    def node_html(self, node):
+        return node.html
+
+    def root(self, document):
+        return document.root
+
+    def children(self, node):
+        return [child for child in node.iter(include_text=False) if not child.tag.startswith('_')]
+
+    def attributes(self, node):
+        return {key: value or '' for key, value in node.attributes.items()}
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (SelectolaxBackend, LxmlBackend, Bs4LxmlBackend, HtmlParserBackend)
+}
+
+
+def available_backends():
+    """Names of installed backends, fastest first"""
+    return [name for name in PARSER_PREFERENCE if BACKENDS[name].available()]
+
+
+def saved_parser_choice(path=None):
+    """Backend name recorded by benchmark_parsers.py, or None"""
+    try:
+        with open(path or PARSER_CHOICE_PATH, encoding='utf-8') as f:
+            return json.load(f).get('backend')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def save_parser_choice(name, path=None, **details):
+    """Record the benchmark's winner so get_parser_backend() defaults to it"""
+    with open(path or PARSER_CHOICE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(dict(details, backend=name), f, indent=2)
+
+
+def get_parser_backend(name=None):
+    """Instantiate a backend by name, or the measured / fastest installed one"""
+    name = name or os.environ.get('SERP_PARSER')
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown parser backend '{name}' (choose from {', '.join(PARSER_PREFERENCE)})")
+        if not BACKENDS[name].available():
+            raise ImportError(f"Parser backend '{name}' is not installed")
+        return BACKENDS[name]()
+
+    # A recorded choice for a backend that has since been uninstalled is skipped
+    saved = saved_parser_choice()
+    if saved in BACKENDS and BACKENDS[saved].available():
+        return BACKENDS[saved]()
+
+    installed = available_backends()
+    if not installed:
+        raise ImportError("No HTML parser backend installed (need bs4, lxml or selectolax)")
+    return BACKENDS[installed[0]]()
+
+
+_COMPOUND_RE = re.compile(
+    r'\.(?P<cls>[\w-]+)'
+    r'|\[(?P<attr>[\w:-]+)(?:(?P<op>[*^$~]?=)"(?P<value>[^"]*)")?\]'
+)
+
+
+def _compile_compound(text):
+    """Compile '.cls' / '[attr]' / '[attr*="v"]' chains into a list of tests"""
+    tests = []
+    pos = 0
+    while pos < len(text):
+        m = _COMPOUND_RE.match(text, pos)
+        if not m:
+            raise ValueError(f"Unsupported selector syntax: '{text}'")
+        if m.group('cls'):
+            tests.append(('class', m.group('cls'), None))
+        else:
+            tests.append((m.group('op') or 'has', m.group('attr'), m.group('value')))
+        pos = m.end()
+    if not tests:
+        raise ValueError("Empty selector")
+    return tests
+
+
+def _compound_matches(tests, attrs):
+    for op, name, value in tests:
+        if op == 'class':
+            if name not in attrs.get('class', '').split():
+                return False
+            continue
+        actual = attrs.get(name)
+        if actual is None:
+            return False
+        if op == '=' and actual != value:
+            return False
+        if op == '*=' and value not in actual:
+            return False
+        if op == '^=' and not actual.startswith(value):
+            return False
+        if op == '$=' and not actual.endswith(value):
+            return False
+        if op == '~=' and value not in actual.split():
+            return False
+    return True
+
+
+class SelectorMatcher:
+    """Match a priority-ordered selector list in a single tree walk
+
+    Supports the class/attribute selectors used on SERPs plus one descendant
+    combinator ('.a .b'). Every element is visited once; only selectors that
+    rank above the best match found so far are tested, and the walk stops as
+    soon as the top-priority selector matches. The result is the same as
+    calling select_first for each selector in turn and keeping the first hit.
+    """
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self._compiled = []
+        for selector in self.selectors:
+            parts = selector.split()
+            if len(parts) == 1:
+                self._compiled.append((None, _compile_compound(parts[0])))
+            elif len(parts) == 2:
+                self._compiled.append((_compile_compound(parts[0]), _compile_compound(parts[1])))
+            else:
+                raise ValueError(f"Unsupported selector syntax: '{selector}'")
+        self._ancestor_tests = [(i, ancestor) for i, (ancestor, _) in enumerate(self._compiled) if ancestor]
+
+    def first_matches(self, backend, document, prune=True):
+        """First element (document order) matching each selector, None where nothing matched
+
+        With prune=True only the best match is guaranteed: lower-priority
+        selectors stop being tested once something above them has matched.
+        """
+        count = len(self._compiled)
+        found = [None] * count
+        best = count
+        inside = [0] * count  # open ancestors matching each descendant selector's left side
+        stack = [(backend.root(document), None)]
+
+        while stack:
+            node, leaving = stack.pop()
+            if leaving is not None:
+                for i in leaving:
+                    inside[i] -= 1
+                continue
+
+            attrs = backend.attributes(node)
+            for i in range(best if prune else count):
+                if found[i] is not None:
+                    continue
+                ancestor, tests = self._compiled[i]
+                if ancestor is not None and not inside[i]:
+                    continue
+                if _compound_matches(tests, attrs):
+                    found[i] = node
+                    best = min(best, i)
+                    if prune:
+                        break
+
+            if prune and best == 0:
+                break
+
+            opened = [i for i, ancestor in self._ancestor_tests
+                      if (not prune or i < best) and _compound_matches(ancestor, attrs)]
+            if opened:
+                for i in opened:
+                    inside[i] += 1
+                stack.append((node, opened))
+            stack.extend((child, None) for child in reversed(backend.children(node)))
+
+        return found
+
+    def best_match(self, backend, document):
+        """(selector index, element) for the highest-priority match, or (None, None)"""
+        for i, node in enumerate(self.first_matches(backend, document)):
+            if node is not None:
+                return i, node
+        return None, None
+
+
+AI_OVERVIEW_MATCHER = SelectorMatcher(AI_OVERVIEW_SELECTORS)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Streaming early-exit SERP download for the plain-HTTP fallback path
+
+The response body is read in chunks and fed to an incremental stdlib
+HTMLParser that runs the same compiled selectors as extract_ai_overview.
+Reading stops, and the connection is closed, as soon as the outcome is
+settled:
+
+  * the top-priority AI Overview selector (index 0) has matched and its
+    element has closed, or
+  * the footer is reached. It follows both the result column and the
+    right-hand knowledge panel, so no candidate container can still follow.
+
+A match on any lower-priority selector does not stop the read: a container
+that outranks it could still come later in the page, so such pages (and
+pages without an overview) are read up to the footer.
+
+The prefix read so far is then parsed with the regular parser backend; it
+contains every element the full-page extraction could have picked.
+"""
+
+import codecs
+import time
+from html.parser import HTMLParser
+
+from serp_parsers import AI_OVERVIEW_MATCHER, _compound_matches
+
+# Footer elements; #botstuff is not used because the right-hand panel comes after it
+STOP_MARKER_IDS = ('footcnt', 'fbar')
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+])
+
+
+class EarlyExitScanner(HTMLParser):
+    """Incremental tag scanner that decides when the rest of a SERP is irrelevant"""
+
+    def __init__(self, matcher=AI_OVERVIEW_MATCHER, stop_ids=STOP_MARKER_IDS):
+        super().__init__(convert_charrefs=False)
+        self.matcher = matcher
+        self.stop_ids = frozenset(stop_ids)
+        self.stack = []  # (tag, selector indexes this element opened as an ancestor, matched index)
+        self.inside = [0] * len(matcher._compiled)
+        self.best = len(matcher._compiled)
+        self.best_closed = False
+        self.stop_reason = None
+
+    @property
+    def done(self):
+        return self.stop_reason is not None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = {name: value or '' for name, value in attrs}
+
+        if attrs.get('id') in self.stop_ids:
+            self.stop_reason = f"marker:{attrs['id']}"
+            return
+
+        matched = None
+        for i in range(self.best):
+            ancestor, tests = self.matcher._compiled[i]
+            if ancestor is not None and not self.inside[i]:
+                continue
+            if _compound_matches(tests, attrs):
+                matched = self.best = i
+                self.best_closed = False
+                break
+
+        if tag in VOID_ELEMENTS:
+            if matched == 0:
+                self.stop_reason = "top_match"
+            return
+
+        opened = [i for i, ancestor in self.matcher._ancestor_tests
+                  if i < self.best and _compound_matches(ancestor, attrs)]
+        for i in opened:
+            self.inside[i] += 1
+        self.stack.append((tag, opened, matched))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self.stack and self.stack[-1][0] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        # Tolerate unclosed children: pop back to the matching open tag
+        if not any(open_tag == tag for open_tag, _, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, opened, matched = self.stack.pop()
+            for i in opened:
+                self.inside[i] -= 1
+            if matched is not None and matched == self.best:
+                self.best_closed = True
+            if open_tag == tag:
+                break
+        if self.best == 0 and self.best_closed:
+            self.stop_reason = "top_match"
+
+
+class StreamResult:
+    """Outcome of a streamed fetch; mimics the parts of requests.Response the scraper uses"""
+
+    def __init__(self, response, text, complete, stop_reason, bytes_read, bytes_decoded, read_time):
+        self.url = response.url
+        self.status_code = response.status_code
+        self.encoding = response.encoding or 'utf-8'
+        self.text = text
+        self.complete = complete
+        self.stop_reason = stop_reason
+        self.bytes_read = bytes_read
+        self.bytes_decoded = bytes_decoded
+        self.read_time = read_time
+
+    @property
+    def content(self):
+        return self.text.encode(self.encoding)
+
+
+def wire_bytes(response, fallback):
+    """Bytes read off the socket (before gzip/br decoding) when urllib3 exposes it"""
+    try:
+        return response.raw.tell()
+    except Exception:
+        return fallback
+
+
+def fetch_streaming(session, url, chunk_size=16384, scanner=None, **request_kwargs):
+    """GET a SERP with stream=True and stop reading once the overview outcome is settled"""
+    scanner = scanner or EarlyExitScanner()
+    start = time.perf_counter()
+    response = session.get(url, stream=True, **request_kwargs)
+    parts = []
+    bytes_decoded = 0
+
+    try:
+        if response.status_code != 200:
+            # Error and block pages are small; read them whole for detection
+            text = response.text
+            return StreamResult(response, text, True, None, wire_bytes(response, len(response.content)),
+                                len(response.content), time.perf_counter() - start)
+
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        for chunk in response.iter_content(chunk_size):
+            bytes_decoded += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            scanner.feed(text)
+            if scanner.done:
+                break
+        else:
+            parts.append(decoder.decode(b'', final=True))
+
+        return StreamResult(response, ''.join(parts), not scanner.done, scanner.stop_reason,
+                            wire_bytes(response, bytes_decoded), bytes_decoded,
+                            time.perf_counter() - start)
+    finally:
+        # Closing an unfinished streamed response drops the connection instead of draining it
+        response.close()
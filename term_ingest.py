@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Term ingestion: normalization, deduplication and canonical term IDs
+
+Rows from the search-term CSV are normalized (Unicode NFKC, whitespace
+collapsed, case folded) and collapsed into unique terms, each with a stable
+64-bit ID derived from its normalized form. Only unique terms are searched;
+fan_out() copies each result back to every original CSV row.
+"""
+
+import csv
+import hashlib
+import re
+import unicodedata
+
+
+def clean_term(term):
+    """Display form: NFKC with whitespace collapsed, original case kept"""
+    term = unicodedata.normalize('NFKC', term)
+    return re.sub(r'\s+', ' ', term).strip()
+
+
+def normalize_term(term):
+    """Identity form used for deduplication, IDs and cache keys"""
+    return clean_term(term).casefold()
+
+
+def term_id(term):
+    """Stable 64-bit ID (hex) of a term's normalized form"""
+    return _key_id(normalize_term(term))
+
+
+def _key_id(key):
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class TermGroup:
+    """One unique term and the CSV rows that collapse into it"""
+
+    def __init__(self, search_term, key):
+        self.search_term = search_term  # First spelling seen; this is what gets searched
+        self.key = key
+        self.term_id = _key_id(key)
+        self.rows = []  # (row number, original text)
+
+    def __repr__(self):
+        return f"TermGroup({self.search_term!r}, id={self.term_id}, rows={len(self.rows)})"
+
+
+def ingest_terms(raw_terms, first_row=1, row_numbers=None):
+    """Collapse raw term strings into TermGroups, in first-seen order
+
+    Rows are numbered consecutively from first_row unless row_numbers gives each term's own number.
+    """
+    groups = {}
+    numbered = zip(row_numbers, raw_terms) if row_numbers is not None else enumerate(raw_terms, first_row)
+    for row_number, raw in numbered:
+        display = clean_term(raw)
+        if not display:
+            continue
+        key = display.casefold()
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = TermGroup(display, key)
+        group.rows.append((row_number, raw))
+    return list(groups.values())
+
+
+def read_term_groups(csv_file, skip_header=True):
+    """Read the first column of a search-term CSV into TermGroups"""
+    # Row numbers are 1-based CSV line numbers (the header is row 1), counted past blank lines
+    row_numbers, raw_terms = [], []
+    with open(csv_file, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file)
+        if skip_header:
+            next(reader, None)
+        last_line = reader.line_num
+        for row in reader:
+            if row:
+                # A record starts on the line after the previous one ended (quoted fields can span lines)
+                row_numbers.append(last_line + 1)
+                raw_terms.append(row[0])
+            last_line = reader.line_num
+    return ingest_terms(raw_terms, row_numbers=row_numbers)
+
+
+def describe(groups):
+    rows = sum(len(group.rows) for group in groups)
+    return f"{rows} rows, {len(groups)} unique terms ({rows - len(groups)} duplicates collapsed)"
+
+
+def fan_out(results, groups):
+    """Copy each unique term's result to every CSV row it came from
+
+    Results are matched by normalized search term; rows whose term has no
+    result (e.g. an interrupted run) are left out.
+    """
+    by_key = {}
+    for result in results:
+        by_key[normalize_term(result['search_term'])] = result
+
+    expanded = []
+    for group in groups:
+        result = by_key.get(group.key)
+        if result is None:
+            continue
+        for row_number, raw in group.rows:
+            row_result = dict(result)
+            row_result['search_term'] = raw.strip()
+            row_result['term_id'] = group.term_id
+            row_result['csv_row'] = row_number
+            if len(group.rows) > 1:
+                row_result['searched_as'] = group.search_term
+            expanded.append(row_result)
+    return expanded
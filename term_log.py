@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Non-blocking structured logging with a per-term ring buffer
+
+Log records are handed to a QueueHandler on the scraping thread and written
+by a QueueListener thread, so slow console or disk I/O never stalls the
+browser loop. While a term is being searched, records below INFO (the
+verbose "Trying selector ..." detail) are only appended to a bounded ring
+buffer. If the term fails the buffer is written out, so the detail is there
+when it is needed; if it succeeds the buffer is dropped without any I/O.
+
+The log file is JSON lines (time, level, logger, term, message) so failed
+terms can be filtered and grepped; the console gets plain INFO+ messages.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from collections import deque
+from datetime import datetime
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'term': getattr(record, 'term', None),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TermRingHandler(logging.Handler):
+    """Tags records with the current term and holds back the verbose ones until the term's outcome is known"""
+
+    def __init__(self, target, capacity=200, flush_level=logging.INFO):
+        super().__init__(logging.DEBUG)
+        self.target = target
+        self.flush_level = flush_level
+        self.buffer = deque(maxlen=capacity)
+        self.term = None
+        self.dropped = 0
+
+    def emit(self, record):
+        record.term = self.term
+        if self.term is not None and record.levelno < self.flush_level:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(record)
+        else:
+            self.target.handle(record)
+
+    def begin(self, term):
+        self.buffer.clear()
+        self.dropped = 0
+        self.term = term
+
+    def end(self, failed=False):
+        """Write the held-back records if the term failed, otherwise forget them; returns how many were written"""
+        written = 0
+        if failed:
+            for record in self.buffer:
+                self.target.handle(record)
+            written = len(self.buffer)
+        self.buffer.clear()
+        self.term = None
+        return written
+
+
+class TermLog:
+    """Queue-backed logging setup for one scraper logger"""
+
+    def __init__(self, logger, log_file=None, ring_size=200, console_level=logging.INFO):
+        self.logger = logger if isinstance(logger, logging.Logger) else logging.getLogger(logger)
+        self.log_file = log_file
+        self.queue = queue.SimpleQueue()
+
+        handlers = []
+        console = logging.StreamHandler(sys.stdout)
+        console.setLevel(console_level)
+        console.setFormatter(logging.Formatter("  %(message)s"))
+        handlers.append(console)
+        if log_file:
+            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+            file_handler.setLevel(logging.DEBUG)
+            file_handler.setFormatter(JsonLineFormatter())
+            handlers.append(file_handler)
+        self.handlers = handlers
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.ring = TermRingHandler(logging.handlers.QueueHandler(self.queue), ring_size)
+        self.failed_terms = 0
+
+    def start(self):
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.ring)
+        self.logger.propagate = False
+        self.listener.start()
+        return self
+
+    def stop(self):
+        """Detach from the logger, drain the queue and close the handlers"""
+        self.logger.removeHandler(self.ring)
+        self.logger.propagate = True
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def begin(self, term):
+        self.ring.begin(term)
+
+    def end(self, failed=False):
+        """Close the term; on failure its buffered detail goes to the log file"""
+        dropped = self.ring.dropped
+        written = self.ring.end(failed)
+        if failed:
+            self.failed_terms += 1
+            if written and self.log_file:
+                note = f", oldest {dropped} dropped" if dropped else ""
+                self.logger.info("%d debug lines for the failed term written to %s%s", written, self.log_file, note)
+        return written
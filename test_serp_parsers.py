@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Text extraction parity across the HTML parser backends
+"""
+
+import pytest
+
+import serp_parsers
+from serp_parsers import (BACKENDS, PARSER_PREFERENCE, available_backends, get_parser_backend, save_parser_choice,
+                          saved_parser_choice)
+
+NESTED_INLINE = [
+    ('<div id="t">a<b>x<i>y</i>z</b>t</div>', 'axyzt'),
+    ('<div id="t"> a <p>b<span>c</span><span>d<em>e</em>f</span>g</p>h </div>', 'abcdefgh'),
+    ('<div id="t"><span>one</span> <span>two<b>three</b></span>four</div>', 'onetwothreefour'),
+]
+
+
+@pytest.mark.parametrize('name', PARSER_PREFERENCE)
+@pytest.mark.parametrize('html,expected', NESTED_INLINE)
+def test_node_text_keeps_document_order(name, html, expected):
+    if not BACKENDS[name].available():
+        pytest.skip(f"{name} is not installed")
+    backend = BACKENDS[name]()
+    document = backend.parse(f"<html><body>{html}</body></html>")
+    assert backend.node_text(backend.select_first(document, '#t')) == expected
+
+
+def test_default_backend_follows_the_benchmark_choice(tmp_path, monkeypatch):
+    installed = [name for name in PARSER_PREFERENCE if BACKENDS[name].available()]
+    if len(installed) < 2:
+        pytest.skip("needs two installed backends")
+    monkeypatch.delenv('SERP_PARSER', raising=False)
+    monkeypatch.setattr(serp_parsers, 'PARSER_CHOICE_PATH', str(tmp_path / 'serp_parser.json'))
+    assert get_parser_backend().name == installed[0]
+
+    save_parser_choice(installed[-1], pages=3)
+    assert saved_parser_choice() == installed[-1]
+    assert get_parser_backend().name == installed[-1]
+
+    monkeypatch.setenv('SERP_PARSER', installed[0])
+    assert get_parser_backend().name == installed[0]
+
+
+def test_unusable_saved_choice_falls_back_to_preference(tmp_path, monkeypatch):
+    monkeypatch.delenv('SERP_PARSER', raising=False)
+    path = tmp_path / 'serp_parser.json'
+    monkeypatch.setattr(serp_parsers, 'PARSER_CHOICE_PATH', str(path))
+    path.write_text('{"backend": "no-such-parser"}', encoding='utf-8')
+    assert get_parser_backend().name == available_backends()[0]
+    path.write_text('not json', encoding='utf-8')
+    assert saved_parser_choice() is None
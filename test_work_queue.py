@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Lease, heartbeat, expiry and reclaim behaviour of the work queues
+"""
+
+import threading
+import time
+
+import pytest
+
+from work_queue import DONE, FAILED, LEASED, PENDING, InMemoryStore, SQLiteWorkQueue, StoreWorkQueue
+
+SHORT_LEASE = 0.2
+
+
+@pytest.fixture(params=['store', 'sqlite'])
+def queue(request, tmp_path):
+    if request.param == 'store':
+        return StoreWorkQueue(InMemoryStore(), run_id='test', max_attempts=2)
+    return SQLiteWorkQueue(tmp_path / 'queue.sqlite', run_id='test', max_attempts=2)
+
+
+def fill(queue, *terms):
+    return queue.enqueue((f"id-{i}", term) for i, term in enumerate(terms))
+
+
+def test_enqueue_ignores_items_already_in_the_run(queue):
+    assert fill(queue, 'a', 'b') == 2
+    assert fill(queue, 'a', 'b', 'c') == 1
+    assert queue.counts() == {PENDING: 3}
+
+
+def test_claims_lease_items_in_order_without_double_claiming(queue):
+    fill(queue, 'a', 'b')
+    first = queue.claim('w1')
+    second = queue.claim('w2')
+    assert (first.search_term, second.search_term) == ('a', 'b')
+    assert first.attempts == second.attempts == 1
+    assert queue.claim('w3') is None
+    assert queue.counts() == {LEASED: 2}
+    assert queue.has_pending()
+
+
+def test_ack_marks_done_and_keeps_the_result(queue):
+    fill(queue, 'a')
+    item = queue.claim('w1')
+    assert queue.ack(item, {'search_term': 'a', 'has_ai_overview': True})
+    assert queue.counts() == {DONE: 1}
+    assert not queue.has_pending()
+    assert queue.results() == [{'search_term': 'a', 'has_ai_overview': True}]
+
+
+def test_heartbeat_extends_the_lease(queue):
+    fill(queue, 'a')
+    item = queue.claim('w1', lease_seconds=SHORT_LEASE)
+    expires = item.lease_expires
+    assert queue.heartbeat(item, lease_seconds=60)
+    assert item.lease_expires > expires
+    time.sleep(SHORT_LEASE * 1.5)
+    assert queue.claim('w2') is None
+
+
+def test_expired_lease_is_reclaimed_and_the_old_owner_loses_it(queue):
+    fill(queue, 'a')
+    stale = queue.claim('w1', lease_seconds=SHORT_LEASE)
+    time.sleep(SHORT_LEASE * 1.5)
+    assert queue.counts() == {PENDING: 1}
+
+    fresh = queue.claim('w2')
+    assert fresh.search_term == 'a'
+    assert fresh.attempts == 2
+    assert fresh.lease_token != stale.lease_token
+    assert not queue.heartbeat(stale)
+    assert not queue.ack(stale, {'search_term': 'a'})
+    assert queue.ack(fresh, {'search_term': 'a'})
+
+
+def test_item_fails_after_max_attempts_expiries(queue):
+    fill(queue, 'a')
+    for _ in range(queue.max_attempts):
+        assert queue.claim('w1', lease_seconds=SHORT_LEASE) is not None
+        time.sleep(SHORT_LEASE * 1.5)
+    assert queue.claim('w1') is None
+    assert queue.counts() == {FAILED: 1}
+    assert not queue.has_pending()
+
+
+def test_release_hands_the_item_back_without_spending_an_attempt(queue):
+    fill(queue, 'a')
+    item = queue.claim('w1')
+    assert queue.release(item)
+    assert not queue.ack(item)
+    again = queue.claim('w2')
+    assert again.search_term == 'a'
+    assert again.attempts == 1
+
+
+def test_keep_alive_renews_a_lease_that_would_otherwise_expire(queue):
+    fill(queue, 'a')
+    item = queue.claim('w1', lease_seconds=SHORT_LEASE)
+    with queue.keep_alive(item, lease_seconds=SHORT_LEASE, interval=SHORT_LEASE / 4):
+        time.sleep(SHORT_LEASE * 3)
+        assert queue.claim('w2') is None
+    assert queue.ack(item)
+
+
+def test_claim_next_waits_for_another_workers_lease(queue):
+    fill(queue, 'a')
+    queue.claim('crashed', lease_seconds=SHORT_LEASE)
+    item = queue.claim_next('w2', poll_seconds=SHORT_LEASE / 4)
+    assert item.search_term == 'a'
+    assert item.attempts == 2
+
+
+def test_claim_next_returns_none_once_the_run_is_finished(queue):
+    fill(queue, 'a')
+    item = queue.claim('w1', lease_seconds=60)
+    threading.Timer(SHORT_LEASE, queue.ack, args=(item,)).start()
+    assert queue.claim_next('w2', poll_seconds=SHORT_LEASE / 4) is None
+    assert queue.counts() == {DONE: 1}
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Tiered engine: cheap HTTP probe first, browser only when the page needs rendering
+
+Every term is first fetched once with GoogleAIFallbackScraper. The plain HTML
+is classified as
+
+  yes          - an AI Overview container is present in the served HTML
+  no           - a complete results page with no overview and no sign of one
+                 being filled in by JavaScript
+  needs_render - anything else (blocked, JS shell, deferred overview, only a
+                 generic SERP feature matched)
+
+and only the last group is escalated to the Playwright scraper. Per-tier
+counts and latencies are reported, together with an estimate of the browser
+time saved.
+"""
+
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from datetime import datetime
+
+from google_ai_fallback_scraper import GoogleAIFallbackScraper, read_search_terms_from_csv
+from phase_timer import percentile
+from serp_parsers import AI_OVERVIEW_MATCHER, AI_OVERVIEW_SELECTORS
+
+# Selectors that only ever match an AI Overview; other matches are generic SERP features
+DEFINITIVE_SELECTORS = {
+    '[data-async-context*="ai_overview"]',
+    '.AI-overview',
+}
+
+# Markers of a fully served results page
+COMPLETE_PAGE_RE = re.compile(r'id="(?:rso|search)"')
+FOOTER_RE = re.compile(r'id="(?:footcnt|fbar)"')
+
+# The empty overview container (or its body's class) that JavaScript later fills in. Bare
+# "ai_overview" / "AI Overview" strings are not enough: they sit in the inline scripts of most SERPs.
+DEFERRED_OVERVIEW_RE = re.compile(r'data-subtree=["\']aimc["\']|class=["\'][^"\']*\bFzsovc\b')
+
+
+def classify_serp(html, selector):
+    """Classify a plain-HTTP SERP given the best matching overview selector (or None)"""
+    if selector in DEFINITIVE_SELECTORS:
+        return 'yes', f"matched {selector}"
+    if selector is not None:
+        return 'needs_render', f"only generic feature {selector}"
+    if DEFERRED_OVERVIEW_RE.search(html):
+        return 'needs_render', "deferred overview placeholder"
+    if COMPLETE_PAGE_RE.search(html) and FOOTER_RE.search(html):
+        return 'no', "complete page without overview"
+    return 'needs_render', "incomplete or script-rendered page"
+
+
+class BrowserTier:
+    """Runs escalated terms through a Playwright scraper, starting the browser only when first needed"""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.playwright_manager = None
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.proxy_hash = None
+
+    def _start(self):
+        from playwright.sync_api import sync_playwright
+        self.playwright_manager = sync_playwright()
+        self.playwright = self.playwright_manager.start()
+        self._open_context()
+
+    def _open_context(self):
+        proxy = self.scraper.get_next_proxy() if self.scraper.proxies else None
+        opened = self.scraper.setup_browser_context(self.playwright, proxy)
+        # The international scraper also returns the proxy identity for its cookie store
+        self.browser, self.context = opened[0], opened[1]
+        self.proxy_hash = opened[2] if len(opened) > 2 else None
+
+    def search(self, search_term, max_restarts=2):
+        if self.playwright is None:
+            self._start()
+
+        for _ in range(max_restarts + 1):
+            if self.proxy_hash is not None:
+                result = self.scraper.search_and_screenshot(search_term, self.browser, self.context, self.proxy_hash)
+            else:
+                result = self.scraper.search_and_screenshot(search_term, self.browser, self.context)
+            if not result or not result.get('restart_needed'):
+                return result
+            if hasattr(self.scraper, 'handle_captcha_restart'):
+                self.browser, self.context, self.proxy_hash = self.scraper.handle_captcha_restart(
+                    self.browser, self.context, self.playwright
+                )
+            else:
+                self.close_context()
+                self._open_context()
+        return result
+
+    def close_context(self):
+        if self.browser is None:
+            return
+        if hasattr(self.scraper, 'close_browser_context'):
+            self.scraper.close_browser_context(self.browser, self.context, self.proxy_hash)
+        else:
+            self.context.close()
+            self.browser.close()
+        self.browser = self.context = None
+
+    def close(self):
+        self.close_context()
+        if self.playwright_manager is not None:
+            self.playwright_manager.__exit__(None, None, None)
+            self.playwright_manager = self.playwright = None
+
+
+class TieredDispatcher:
+    """HTTP probe for every term, browser escalation only for 'needs_render'"""
+
+    def __init__(self, http_scraper, browser_scraper, http_delay=(5, 15), browser_delay=(10, 20)):
+        self.http = http_scraper
+        self.browser = BrowserTier(browser_scraper)
+        self.http_delay = http_delay
+        self.browser_delay = browser_delay
+        self.results = []
+        self.counts = {'yes': 0, 'no': 0, 'needs_render': 0, 'http_error': 0}
+        self.latency = {'http': [], 'browser': []}
+
+    def probe(self, search_term):
+        """One HTTP attempt; returns (classification, reason)"""
+        response = self.http.fetch_serp(search_term, pre_delay=None)
+
+        is_blocked, blocking_type = self.http.detect_blocking(response)
+        if is_blocked:
+            return 'needs_render', f"blocked: {blocking_type}"
+        if response.status_code != 200:
+            return 'needs_render', f"HTTP {response.status_code}"
+
+        document = self.http.parse_html(response.content)
+        index, _ = AI_OVERVIEW_MATCHER.best_match(self.http.parser, document)
+        selector = AI_OVERVIEW_SELECTORS[index] if index is not None else None
+        classification, reason = classify_serp(response.text, selector)
+        if classification == 'yes':
+            # Keep the overview text just as the fallback scraper does
+            self.http.extract_ai_overview(document, search_term)
+        return classification, reason
+
+    def process(self, search_term):
+        start = time.perf_counter()
+        try:
+            classification, reason = self.probe(search_term)
+        except Exception as e:
+            classification, reason = 'needs_render', f"probe failed: {e}"
+            self.counts['http_error'] += 1
+        http_time = time.perf_counter() - start
+        self.latency['http'].append(http_time)
+        self.counts[classification] += 1
+        print(f"  HTTP probe: {classification} ({reason}) in {http_time:.2f}s")
+
+        if classification != 'needs_render':
+            return {
+                'search_term': search_term,
+                'has_ai_overview': classification == 'yes',
+                'tier': 'http',
+                'probe': classification,
+                'probe_reason': reason,
+                'timestamp': datetime.now().isoformat(),
+                'screenshot_path': None,
+            }
+
+        print("  Escalating to browser")
+        start = time.perf_counter()
+        result = self.browser.search(search_term) or {
+            'search_term': search_term,
+            'has_ai_overview': False,
+            'timestamp': datetime.now().isoformat(),
+            'error': 'Browser search returned no result'
+        }
+        self.latency['browser'].append(time.perf_counter() - start)
+        result.update({'tier': 'browser', 'probe': classification, 'probe_reason': reason})
+        return result
+
+    def run(self, search_terms):
+        try:
+            for i, term in enumerate(search_terms, 1):
+                print(f"\nTerm {i}/{len(search_terms)}: '{term}'")
+                result = self.process(term)
+                self.results.append(result)
+
+                if i < len(search_terms):
+                    delay_range = self.browser_delay if result['tier'] == 'browser' else self.http_delay
+                    time.sleep(random.uniform(*delay_range))
+        finally:
+            self.browser.close()
+            self.http.session.close()
+        return self.results
+
+    def save_results(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        json_file = f"ai_overview_results_{timestamp}.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(self.results, f, indent=2, ensure_ascii=False)
+        print(f"\nResults saved to {json_file}")
+        return json_file
+
+    def print_summary(self):
+        total = len(self.results)
+        with_ai = sum(1 for r in self.results if r['has_ai_overview'])
+        http_times, browser_times = self.latency['http'], self.latency['browser']
+        resolved = self.counts['yes'] + self.counts['no']
+
+        print("\nSUMMARY")
+        print(f"{'='*30}")
+        print(f"Total: {total}")
+        print(f"With AI Overview: {with_ai} ({(with_ai/total)*100:.1f}%)" if total > 0 else "N/A")
+        print(f"HTTP tier:    {self.counts['yes']} yes, {self.counts['no']} no, "
+              f"{self.counts['needs_render']} escalated ({self.counts['http_error']} probe errors)")
+        for tier, times in (('HTTP', http_times), ('Browser', browser_times)):
+            if times:
+                print(f"{tier + ' latency:':<14}mean {statistics.mean(times):.2f}s, "
+                      f"p50 {percentile(times, 50):.2f}s, p90 {percentile(times, 90):.2f}s ({len(times)} terms)")
+        if browser_times:
+            saved = resolved * statistics.mean(browser_times)
+            print(f"Browser time saved: ~{saved:.0f}s ({resolved} terms resolved without a browser)")
+
+
+def main():
+    from google_ai_playwright_international import GoogleAIOverviewScraper
+
+    parser = argparse.ArgumentParser(description="Probe terms over HTTP and escalate to a browser only when needed")
+    parser.add_argument('csv_file', nargs='?', default="cra_search_terms.csv", help="CSV of search terms")
+    parser.add_argument('--output-dir', default="ai_overview_screenshots", help="Screenshot folder for browser results")
+    args = parser.parse_args()
+
+    # First row is the header, as in the Playwright scrapers
+    search_terms = [t.strip() for t in read_search_terms_from_csv(args.csv_file)[1:] if t.strip()]
+    if not search_terms:
+        print("No search terms found")
+        return
+
+    dispatcher = TieredDispatcher(
+        GoogleAIFallbackScraper(),
+        GoogleAIOverviewScraper(csv_file=args.csv_file, output_dir=args.output_dir)
+    )
+    dispatcher.run(search_terms)
+    dispatcher.save_results()
+    dispatcher.print_summary()
+
+
+if __name__ == "__main__":
+    main()
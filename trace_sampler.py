@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Sampled Playwright tracing with on-failure capture
+
+Tracing is started once per browser context and every term is recorded as
+its own trace chunk. When the term finishes the chunk is either written to
+the trace directory or discarded in the browser (stop_chunk without a path),
+so nothing touches the disk for an ordinary term. A chunk is kept when:
+
+  * the term failed (an error, a block page, or an exception),
+  * it took longer than the running p99 of recent terms, or
+  * it was picked by the random sample (sample_rate).
+
+The directory is capped at max_bytes by deleting the oldest traces. Open a
+kept trace with `playwright show-trace <file>.zip`.
+"""
+
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from phase_timer import percentile
+
+
+class TraceChunk:
+    """One term being traced"""
+
+    def __init__(self, context, term, sampled, started):
+        self.context = context
+        self.term = term
+        self.sampled = sampled
+        self.started = started
+        self.path = None
+        self.reason = None
+
+
+class TraceSampler:
+    """Decides per term whether its Playwright trace is worth keeping"""
+
+    def __init__(self, trace_dir="traces", sample_rate=0.02, max_bytes=500 * 2**20, slow_percentile=99,
+                 min_history=20, history=500, screenshots=True, snapshots=True, clock=time.monotonic):
+        self.trace_dir = Path(trace_dir)
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.slow_percentile = slow_percentile
+        self.min_history = min_history  # No "slow" verdicts until the percentile means something
+        self.durations = deque(maxlen=history)
+        self.screenshots = screenshots
+        self.snapshots = snapshots
+        self.clock = clock
+        self.kept = {'failed': 0, 'slow': 0, 'sampled': 0}
+        self.discarded = 0
+        self.pruned = 0
+        self._tracing = set()
+
+    def attach(self, context):
+        """Start tracing a browser context; terms are then recorded as chunks of it"""
+        try:
+            context.tracing.start(screenshots=self.screenshots, snapshots=self.snapshots)
+            self._tracing.add(id(context))
+        except Exception as e:
+            print(f"  WARNING: Could not start tracing: {e}")
+
+    def detach(self, context):
+        """Stop tracing before the context is closed"""
+        if id(context) in self._tracing:
+            self._tracing.discard(id(context))
+            try:
+                context.tracing.stop()
+            except Exception:
+                pass
+
+    def begin(self, context, term):
+        if id(context) not in self._tracing:
+            return None
+        try:
+            context.tracing.start_chunk(title=term)
+        except Exception as e:
+            print(f"  WARNING: Could not start trace chunk: {e}")
+            return None
+        return TraceChunk(context, term, random.random() < self.sample_rate, self.clock())
+
+    def slow_threshold(self):
+        if len(self.durations) < self.min_history:
+            return None
+        return percentile(list(self.durations), self.slow_percentile)
+
+    def verdict(self, chunk, result, duration):
+        """Why the chunk is kept, or None to discard it"""
+        if result is None or result.get('error') or result.get('restart_needed'):
+            return 'failed'
+        threshold = self.slow_threshold()
+        if threshold is not None and duration > threshold:
+            return 'slow'
+        if chunk.sampled:
+            return 'sampled'
+        return None
+
+    def end(self, chunk, result=None):
+        """Finish a term's chunk: write it if it is worth keeping, else drop it. Returns the path or None"""
+        if chunk is None:
+            return None
+        duration = self.clock() - chunk.started
+        if result and result.get('timings'):
+            duration = result['timings'].get('total', duration)
+        chunk.reason = self.verdict(chunk, result, duration)
+        self.durations.append(duration)
+
+        try:
+            if chunk.reason is None:
+                chunk.context.tracing.stop_chunk()
+                self.discarded += 1
+                return None
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            slug = re.sub(r'[^\w-]+', '_', chunk.term)[:60]
+            chunk.path = self.trace_dir / f"{stamp}_{chunk.reason}_{slug}.zip"
+            chunk.context.tracing.stop_chunk(path=str(chunk.path))
+        except Exception as e:
+            print(f"  WARNING: Could not finish trace chunk: {e}")
+            return None
+
+        self.kept[chunk.reason] += 1
+        print(f"  Trace kept ({chunk.reason}, {duration:.1f}s): {chunk.path}")
+        self.enforce_cap()
+        return str(chunk.path)
+
+    def enforce_cap(self):
+        """Delete the oldest traces until the directory fits in max_bytes"""
+        traces = sorted(self.trace_dir.glob("*.zip"), key=lambda path: path.stat().st_mtime)
+        total = sum(path.stat().st_size for path in traces)
+        while traces and total > self.max_bytes:
+            oldest = traces.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink()
+            self.pruned += 1
+
+    def summary(self):
+        kept = ", ".join(f"{count} {reason}" for reason, count in self.kept.items())
+        return (f"Traces: kept {kept}; discarded {self.discarded}; "
+                f"{self.pruned} pruned to stay under {self.max_bytes / 2**20:.0f}MB in {self.trace_dir}")
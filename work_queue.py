@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Lease-based work queue so several workers (processes or machines) can split a run
+
+Workers claim one term at a time with a lease, heartbeat while they work on
+it and ack it with the result. A lease that is not renewed in time (crashed
+worker, lost machine) expires and the term is handed to the next claimant;
+after max_attempts expiries the term is marked failed.
+
+Implementations:
+  SQLiteWorkQueue  - one SQLite file, safe for many processes on one host
+  StoreWorkQueue   - any key-value store with compare-and-set (KeyValueStore),
+                     e.g. a network store shared by several machines
+  InMemoryStore    - local stand-in for a network store (tests, dry runs)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+
+def default_run_id():
+    # Workers started on the same day share a run unless told otherwise
+    return datetime.now().strftime("%Y%m%d")
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkItem:
+    """A claimed term; the lease token proves ownership on heartbeat/ack"""
+
+    def __init__(self, item_id, search_term, attempts, lease_token, lease_expires):
+        self.item_id = item_id
+        self.search_term = search_term
+        self.attempts = attempts
+        self.lease_token = lease_token
+        self.lease_expires = lease_expires
+
+    def __repr__(self):
+        return f"WorkItem({self.search_term!r}, attempt={self.attempts})"
+
+
+class WorkQueue:
+    """Interface shared by all queue implementations"""
+
+    def __init__(self, run_id=None, max_attempts=3):
+        self.run_id = run_id or default_run_id()
+        self.max_attempts = max_attempts
+
+    def enqueue(self, items):
+        """Add (item_id, search_term) pairs; items already in the run are left alone"""
+        raise NotImplementedError
+
+    def claim(self, worker_id, lease_seconds=300):
+        """Lease the next ready item, or return None when nothing is claimable"""
+        raise NotImplementedError
+
+    def heartbeat(self, item, lease_seconds=300):
+        """Extend a lease; False means it was lost (expired and re-claimed)"""
+        raise NotImplementedError
+
+    def ack(self, item, result=None):
+        """Mark an item done; False if the lease was lost"""
+        raise NotImplementedError
+
+    def release(self, item):
+        """Give an item back without counting it as done"""
+        raise NotImplementedError
+
+    def counts(self):
+        """Number of items per status"""
+        raise NotImplementedError
+
+    def has_pending(self):
+        counts = self.counts()
+        return counts.get(PENDING, 0) + counts.get(LEASED, 0) > 0
+
+    def claim_next(self, worker_id, lease_seconds=300, poll_seconds=15):
+        """Claim the next item, polling while other workers still hold leases; None once nothing is left
+
+        A lease held by a crashed worker expires and becomes claimable again,
+        so an idle worker keeps polling until the run has no pending or
+        leased items instead of stopping at the first empty claim().
+        """
+        while True:
+            item = self.claim(worker_id, lease_seconds)
+            if item is not None or not self.has_pending():
+                return item
+            time.sleep(poll_seconds)
+
+    def describe(self):
+        counts = self.counts()
+        return ", ".join(f"{counts.get(status, 0)} {status}" for status in (PENDING, LEASED, DONE, FAILED))
+
+    @contextmanager
+    def keep_alive(self, item, lease_seconds=300, interval=None):
+        """Heartbeat an item from a background thread while the body runs"""
+        interval = interval or lease_seconds / 3
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    if not self.heartbeat(item, lease_seconds):
+                        print(f"  Lease lost for '{item.search_term}'")
+                        return
+                except Exception as e:
+                    print(f"  Heartbeat failed for '{item.search_term}': {e}")
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield item
+        finally:
+            stop.set()
+            thread.join()
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Queue in a SQLite file; claims run in an IMMEDIATE transaction so processes never double-claim"""
+
+    def __init__(self, db_path="work_queue.sqlite", run_id=None, max_attempts=3):
+        super().__init__(run_id, max_attempts)
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_items (
+                    run_id TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    search_term TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_token TEXT,
+                    lease_expires REAL,
+                    result TEXT,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY (run_id, item_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS work_items_status ON work_items (run_id, status, position)")
+
+    @contextmanager
+    def _connect(self):
+        # A fresh connection per operation keeps this usable from heartbeat threads and forked workers
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, items):
+        added = 0
+        with self._connect() as conn:
+            position = conn.execute("SELECT COALESCE(MAX(position), 0) FROM work_items WHERE run_id = ?",
+                                    (self.run_id,)).fetchone()[0]
+            for item_id, search_term in items:
+                position += 1
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO work_items (run_id, item_id, search_term, status, position) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.run_id, item_id, search_term, PENDING, position)
+                )
+                added += cursor.rowcount
+        return added
+
+    def _requeue_expired(self, conn, now):
+        conn.execute(
+            "UPDATE work_items SET status = ?, lease_owner = NULL, lease_token = NULL "
+            "WHERE run_id = ? AND status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, self.run_id, LEASED, now, self.max_attempts)
+        )
+        cursor = conn.execute(
+            "UPDATE work_items SET status = ?, lease_owner = NULL, lease_token = NULL "
+            "WHERE run_id = ? AND status = ? AND lease_expires < ?",
+            (PENDING, self.run_id, LEASED, now)
+        )
+        return cursor.rowcount
+
+    def requeue_expired(self):
+        with self._connect() as conn:
+            return self._requeue_expired(conn, time.time())
+
+    def claim(self, worker_id, lease_seconds=300):
+        now = time.time()
+        with self._connect() as conn:
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT item_id, search_term, attempts FROM work_items "
+                "WHERE run_id = ? AND status = ? ORDER BY position LIMIT 1",
+                (self.run_id, PENDING)
+            ).fetchone()
+            if row is None:
+                return None
+            item_id, search_term, attempts = row
+            token = uuid.uuid4().hex
+            expires = now + lease_seconds
+            conn.execute(
+                "UPDATE work_items SET status = ?, attempts = ?, lease_owner = ?, lease_token = ?, lease_expires = ? "
+                "WHERE run_id = ? AND item_id = ?",
+                (LEASED, attempts + 1, worker_id, token, expires, self.run_id, item_id)
+            )
+        return WorkItem(item_id, search_term, attempts + 1, token, expires)
+
+    def heartbeat(self, item, lease_seconds=300):
+        expires = time.time() + lease_seconds
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE work_items SET lease_expires = ? WHERE run_id = ? AND item_id = ? AND lease_token = ? "
+                "AND status = ?",
+                (expires, self.run_id, item.item_id, item.lease_token, LEASED)
+            )
+        if cursor.rowcount:
+            item.lease_expires = expires
+        return cursor.rowcount == 1
+
+    def ack(self, item, result=None):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE work_items SET status = ?, result = ?, lease_token = NULL "
+                "WHERE run_id = ? AND item_id = ? AND lease_token = ?",
+                (DONE, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 self.run_id, item.item_id, item.lease_token)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, item):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE work_items SET status = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                "lease_token = NULL WHERE run_id = ? AND item_id = ? AND lease_token = ?",
+                (PENDING, self.run_id, item.item_id, item.lease_token)
+            )
+        return cursor.rowcount == 1
+
+    def counts(self):
+        with self._connect() as conn:
+            self._requeue_expired(conn, time.time())
+            rows = conn.execute("SELECT status, COUNT(*) FROM work_items WHERE run_id = ? GROUP BY status",
+                                (self.run_id,)).fetchall()
+        return dict(rows)
+
+    def results(self):
+        """Acked results of the whole run, across all workers"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT result FROM work_items WHERE run_id = ? AND status = ? AND result IS NOT NULL "
+                                "ORDER BY position", (self.run_id, DONE)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+class KeyValueStore:
+    """Minimal interface a shared store must offer to back StoreWorkQueue
+
+    Values are JSON-serialisable dicts; versions are opaque and change on
+    every successful write.
+    """
+
+    def get(self, key):
+        """Return (value, version), or (None, None) if the key is missing"""
+        raise NotImplementedError
+
+    def compare_and_set(self, key, value, expected_version):
+        """Write only if the current version matches (None = key must not exist)"""
+        raise NotImplementedError
+
+    def scan(self, prefix):
+        """Yield (key, value, version) for keys starting with prefix, in insertion order"""
+        raise NotImplementedError
+
+
+class InMemoryStore(KeyValueStore):
+    """Thread-safe in-process stand-in for a network key-value store"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None, None
+            version, value = self._data[key]
+            return json.loads(value), version
+
+    def compare_and_set(self, key, value, expected_version):
+        with self._lock:
+            current = self._data.get(key)
+            if (current[0] if current else None) != expected_version:
+                return False
+            self._data[key] = ((current[0] if current else 0) + 1, json.dumps(value))
+            return True
+
+    def scan(self, prefix):
+        with self._lock:
+            items = [(key, version, value) for key, (version, value) in self._data.items() if key.startswith(prefix)]
+        for key, version, value in items:
+            yield key, json.loads(value), version
+
+
+class StoreWorkQueue(WorkQueue):
+    """Queue over any KeyValueStore using optimistic compare-and-set for every transition"""
+
+    def __init__(self, store, run_id=None, max_attempts=3):
+        super().__init__(run_id, max_attempts)
+        self.store = store
+
+    def _key(self, item_id):
+        return f"work/{self.run_id}/{item_id}"
+
+    def enqueue(self, items):
+        added = 0
+        for item_id, search_term in items:
+            record = {'item_id': item_id, 'search_term': search_term, 'status': PENDING, 'attempts': 0,
+                      'lease_owner': None, 'lease_token': None, 'lease_expires': None, 'result': None}
+            if self.store.compare_and_set(self._key(item_id), record, None):
+                added += 1
+        return added
+
+    def _claimable(self, record, now):
+        if record['status'] == PENDING:
+            return True
+        return record['status'] == LEASED and record['lease_expires'] < now
+
+    def claim(self, worker_id, lease_seconds=300):
+        now = time.time()
+        for key, record, version in self.store.scan(f"work/{self.run_id}/"):
+            if not self._claimable(record, now):
+                continue
+            if record['status'] == LEASED and record['attempts'] >= self.max_attempts:
+                record.update(status=FAILED, lease_owner=None, lease_token=None)
+                self.store.compare_and_set(key, record, version)
+                continue
+            token = uuid.uuid4().hex
+            record.update(status=LEASED, attempts=record['attempts'] + 1, lease_owner=worker_id,
+                          lease_token=token, lease_expires=now + lease_seconds)
+            # Another worker may have won the race; just try the next item
+            if self.store.compare_and_set(key, record, version):
+                return WorkItem(record['item_id'], record['search_term'], record['attempts'],
+                                token, record['lease_expires'])
+        return None
+
+    def _update_owned(self, item, **changes):
+        key = self._key(item.item_id)
+        while True:
+            record, version = self.store.get(key)
+            if record is None or record['lease_token'] != item.lease_token:
+                return None
+            record.update(changes)
+            if self.store.compare_and_set(key, record, version):
+                return record
+
+    def heartbeat(self, item, lease_seconds=300):
+        expires = time.time() + lease_seconds
+        record = self._update_owned(item, lease_expires=expires)
+        if record:
+            item.lease_expires = expires
+        return record is not None
+
+    def ack(self, item, result=None):
+        return self._update_owned(item, status=DONE, result=result, lease_token=None) is not None
+
+    def release(self, item):
+        return self._update_owned(item, status=PENDING, attempts=max(item.attempts - 1, 0),
+                                  lease_owner=None, lease_token=None) is not None
+
+    def counts(self):
+        now = time.time()
+        counts = {}
+        for _, record, _ in self.store.scan(f"work/{self.run_id}/"):
+            status = record['status']
+            if status == LEASED and record['lease_expires'] < now:
+                # Expired leases are re-queued lazily on the next claim
+                status = FAILED if record['attempts'] >= self.max_attempts else PENDING
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def results(self):
+        return [record['result'] for _, record, _ in self.store.scan(f"work/{self.run_id}/")
+                if record['status'] == DONE and record['result'] is not None]